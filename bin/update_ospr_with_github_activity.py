@@ -1,5 +1,9 @@
 #!/usr/bin/env python
 
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import arrow
 import click
 from functools import lru_cache
@@ -8,14 +12,22 @@ from jira import JIRAError
 from openedx_webhooks.jira.tasks import update_latest_github_activity
 from openedx_webhooks.lib.edx_repo_tools_data.utils import get_people
 from openedx_webhooks.lib.exceptions import NotFoundError
-from openedx_webhooks.lib.github.client import github_client as gh
-from openedx_webhooks.lib.jira.client import jira_client as jira
-from openedx_webhooks.lib.jira.utils import make_fields_lookup
+from openedx_webhooks.lib.github.client import make_github_client
+from openedx_webhooks.lib.jira.client import jira_client as jira, make_jira_client
+from openedx_webhooks.lib.jira.utils import (
+    iter_search_issues, make_fields_lookup
+)
 
 click.disable_unicode_literals_warning = True
 
 EXCLUDED = ['Merged', 'Rejected']
 
+# GitHub lists at most this many commits of a pull request.
+MAX_LISTED_PR_COMMITS = 250
+
+# Each worker thread's own GitHub and JIRA clients.
+_thread_clients = threading.local()
+
 
 @lru_cache()
 def _get_people(gh):
@@ -30,27 +42,91 @@ def _is_edx_user(gh, login):
     return is_edx_user
 
 
+@lru_cache()
 def _get_github_fields(jira, field_names):
     fields = make_fields_lookup(jira, field_names)
-    for f in field_names:
-        yield fields[f]
+    return [fields[f] for f in field_names]
 
 
 def _get_github_values(jira, issue):
-    field_names = ['Repo', 'PR Number']
+    field_names = ('Repo', 'PR Number')
     for k in _get_github_fields(jira, field_names):
         yield getattr(issue.fields, k)
 
 
+def _get_newest_item(gh, url, count, **params):
+    """
+    Get the newest item from a GitHub list, with one request.
+
+    Lists of commits and comments are oldest first, so fetching pages of one
+    item, the page numbered `count` has the newest. `params` can instead sort
+    the list newest first, then `count` just says whether the list is empty.
+    If the list has fewer items than `count`, the last page is fetched.
+
+    Arguments:
+        gh (github3.GitHub): An authenticated GitHub API client session
+        url (str): The API URL of the list
+        count (int): The number of items in the list
+        params: Extra query parameters for the request
+
+    Returns:
+        Optional[Dict[str, Any]]: The parsed JSON of the item
+    """
+    if not count:
+        return None
+    page = 1 if params else count
+    resp = gh.session.get(url, params=dict(params, per_page=1, page=page))
+    resp.raise_for_status()
+    items = resp.json()
+    if not items and page > 1:
+        # Pages past the end are empty, but the first page links to the last.
+        resp = gh.session.get(url, params=dict(params, per_page=1))
+        resp.raise_for_status()
+        if 'last' not in resp.links:
+            items = resp.json()
+        else:
+            resp = gh.session.get(resp.links['last']['url'])
+            resp.raise_for_status()
+            items = resp.json()
+    return items[0] if items else None
+
+
+def _get_newest_pr_commit(gh, pull_request):
+    """
+    Get the newest commit of a pull request.
+
+    GitHub only lists the first 250 commits of a pull request, so for longer
+    ones the head commit is fetched from the repo instead.
+
+    Returns:
+        Optional[Dict[str, Any]]: The parsed JSON of the commit
+    """
+    if pull_request.commits_count <= MAX_LISTED_PR_COMMITS:
+        return _get_newest_item(
+            gh, pull_request.commits_url, pull_request.commits_count
+        )
+    resp = gh.session.get('{}/commits/{}'.format(
+        pull_request.base.repository.url, pull_request.head.sha
+    ))
+    resp.raise_for_status()
+    return resp.json()
+
+
 def _get_last_pr_commit_info(gh, pull_request):
-    commit = list(pull_request.commits())[-1]
-    login = commit.committer_as_User().login
+    commit = _get_newest_pr_commit(gh, pull_request)
+    if commit is None:
+        return None
+    if commit['committer']:
+        login = commit['committer']['login']
+    else:
+        # The commit's email isn't associated with a GitHub user.
+        login = commit['commit']['committer']['name']
 
     info = {
         'description': 'pull_request: synchronize',
         'login': login,
         'updated_at': arrow.get(
-            commit.to_json()['commit']['committer']['date']
+            commit['commit']['committer']['date']
         ).datetime,
         'is_edx_user': _is_edx_user(gh, login),
     }
@@ -58,23 +134,35 @@ def _get_last_pr_commit_info(gh, pull_request):
 
 
 def _get_last_pr_activity_info(gh, pull_request):
-    activities = (
-        list(pull_request.review_comments()) +
-        list(pull_request.issue_comments())
-    )
-    last_activity = sorted(activities, key=lambda x: x.updated_at)[-1]
-    login = last_activity.user.login
+    """
+    Find the latest activity on a pull request.
 
-    info = {
-        'description': 'issue_comment: created',
-        'login': last_activity.user.login,
-        'updated_at': last_activity.updated_at,
-        'is_edx_user': _is_edx_user(gh, login),
-    }
+    Only the newest commit, review comment and issue comment are fetched.
+    Review comments are sorted by when they were updated, but issue comments
+    can only be had in the order they were created.
+    """
+    activities = [
+        _get_newest_item(
+            gh, pull_request.review_comments_url,
+            pull_request.review_comments_count,
+            sort='updated', direction='desc',
+        ),
+        _get_newest_item(
+            gh, pull_request.comments_url, pull_request.comments_count
+        ),
+    ]
+    infos = [_get_last_pr_commit_info(gh, pull_request)]
+    for activity in filter(None, activities):
+        login = activity['user']['login']
+        infos.append({
+            'description': 'issue_comment: created',
+            'login': login,
+            'updated_at': arrow.get(activity['updated_at']).datetime,
+            'is_edx_user': _is_edx_user(gh, login),
+        })
 
     response = max(
-        _get_last_pr_commit_info(gh, pull_request),
-        info,
+        filter(None, infos),
         key=lambda x: x['updated_at']
     )
     return response
@@ -104,23 +192,19 @@ def retrieve_osprs(jira):
     """
     Retrieve active OSPRs.
 
+    Only the fields needed to find the pull request are fetched, and issues
+    are yielded while later pages of the search are still loading.
+
     Arguments:
         jira (jira.JIRA): An authenticated JIRA API client session
 
     Returns:
-        List[jira.resources.Issue]
+        Iterator[jira.resources.Issue]
     """
-    issues = []
-    start_at = 0
     statuses = ','.join(['"{}"'.format(s) for s in EXCLUDED])
     jql = "project=OSPR AND status NOT IN ({})".format(statuses)
-    results = jira.search_issues(jql)
-
-    while results:
-        issues.extend(results)
-        start_at += len(issues)
-        results = jira.search_issues(jql, startAt=start_at)
-    return issues
+    fields = _get_github_fields(jira, ('Repo', 'PR Number'))
+    return iter_search_issues(jira, jql, fields=fields)
 
 
 def get_update_info(gh, jira, issue):
@@ -137,13 +221,77 @@ def get_update_info(gh, jira, issue):
     return _get_last_pr_activity_info(gh, pr)
 
 
+def _read_checkpoint(path):
+    """
+    Read the keys of the issues already done by an interrupted run.
+
+    Arguments:
+        path (Optional[str]): The checkpoint file
+
+    Returns:
+        Set[str]
+    """
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def update_issue(gh, jira, issue, dry_run):
+    """
+    Update one JIRA issue with latest GitHub activity.
+
+    Returns:
+        Dict[str, Any]: The activity info
+    """
+    update_info = get_update_info(gh, jira, issue)
+    if not dry_run:
+        update_latest_github_activity(jira, issue.id, **update_info)
+    return update_info
+
+
+def _clients():
+    """
+    Get this thread's GitHub and JIRA clients, making them the first time.
+
+    The clients' requests sessions aren't safe to share between threads, so
+    each worker thread has its own.
+
+    Returns:
+        Tuple[github3.GitHub, jira.JIRA]
+    """
+    if not hasattr(_thread_clients, 'gh'):
+        _thread_clients.gh = make_github_client()
+        _thread_clients.jira = make_jira_client()
+    return _thread_clients.gh, _thread_clients.jira
+
+
+def _update_issue_in_thread(issue, dry_run):
+    """
+    Update one JIRA issue from a worker thread, with the thread's clients.
+    """
+    thread_gh, thread_jira = _clients()
+    return update_issue(thread_gh, thread_jira, issue, dry_run)
+
+
 @click.command()
 @click.option(
     '--issue', multiple=True, type=int,
     help='OSPR issue number, leave out `OSPR-` prefix.'
 )
 @click.option('--dry-run', is_flag=True)
-def cli(issue, dry_run):
+@click.option(
+    '--concurrency', default=8, show_default=True,
+    help='How many issues to process at once.'
+)
+@click.option(
+    '--checkpoint', type=click.Path(dir_okay=False),
+    help=(
+        'File recording the issues that are done. An interrupted run can '
+        'be resumed by running again with the same file.'
+    ),
+)
+def cli(issue, dry_run, concurrency, checkpoint):
     """
     Update JIRA OSPRs with latest GitHub activity.
 
@@ -161,12 +309,48 @@ def cli(issue, dry_run):
         click.echo(
             '**Dry run only** The following actions would have been performed:'
         )
-    click.echo("Updating {} JIRA issues:".format(len(issues)))
-    for issue in issues:
-        update_info = get_update_info(gh, jira, issue)
-        click.echo("Updating {} with {}.".format(issue.key, update_info))
-        if not dry_run:
-            update_latest_github_activity(jira, issue.id, **update_info)
+        # A dry run doesn't do anything to record.
+        checkpoint = None
+
+    done = _read_checkpoint(checkpoint)
+    if done:
+        click.echo("Skipping {} issues already done.".format(len(done)))
+
+    click.echo("Updating JIRA issues:")
+    failures = 0
+    checkpoint_file = open(checkpoint, 'a') if checkpoint else None
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            # Issues are submitted as the search finds them.
+            futures = {
+                executor.submit(_update_issue_in_thread, i, dry_run): i
+                for i in issues
+                if i.key not in done
+            }
+            click.echo("Found {} JIRA issues to update.".format(len(futures)))
+            for future in as_completed(futures):
+                key = futures[future].key
+                try:
+                    update_info = future.result()
+                except Exception as exc:  # pylint: disable=broad-except
+                    failures += 1
+                    click.echo("Couldn't update {}: {!r}".format(key, exc), err=True)
+                    continue
+                click.echo("Updating {} with {}.".format(key, update_info))
+                if checkpoint_file:
+                    checkpoint_file.write(key + '\n')
+                    checkpoint_file.flush()
+    finally:
+        if checkpoint_file:
+            checkpoint_file.close()
+
+    if failures:
+        raise click.ClickException(
+            "{} issues couldn't be updated, run again to retry them.".format(failures)
+        )
+    if checkpoint and os.path.exists(checkpoint):
+        # Everything is done, the next run should start from scratch.
+        os.remove(checkpoint)
 
 
 if __name__ == '__main__':
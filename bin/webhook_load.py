@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+"""
+Drive /github/hook-receiver with signed webhook deliveries, and report how
+fast it accepts them.
+
+By default the Flask app runs in this process, with the RQ queue in a fake
+Redis (or --redis-url) and Celery using an in-memory broker, so only the
+cost of receiving an event is measured, not the work it queues.  With --url,
+the deliveries are sent to a running server instead.
+"""
+
+import hashlib
+import hmac
+import itertools
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+import requests
+
+click.disable_unicode_literals_warning = True
+
+PAYLOADS_DIR = os.path.join(os.path.dirname(__file__), "..", "tests", "payloads")
+DEFAULT_PAYLOADS = [
+    os.path.join(PAYLOADS_DIR, "github.json"),
+    os.path.join(PAYLOADS_DIR, "github_2.json"),
+]
+HOOK_PATH = "/github/hook-receiver"
+BASE_URL = "https://openedx-webhooks.herokuapp.com"
+
+
+def sign(secret, body):
+    """
+    Compute the X-Hub-Signature header GitHub would send for `body`.
+    """
+    return "sha1=" + hmac.new(secret.encode(), msg=body, digestmod=hashlib.sha1).hexdigest()
+
+
+def make_deliveries(payload_files, secret, event_type):
+    """
+    Make an endless supply of signed deliveries from the recorded payloads.
+
+    Each delivery gets its own pull request number, so that they aren't all
+    the same event.
+
+    Returns:
+        Iterator[Tuple[bytes, Dict[str, str]]]: bodies and their headers
+    """
+    payloads = []
+    for payload_file in payload_files:
+        with open(payload_file) as f:
+            payloads.append(json.load(f))
+    for number, payload in zip(itertools.count(1), itertools.cycle(payloads)):
+        if "pull_request" in payload:
+            payload = dict(payload, number=number, pull_request=dict(payload["pull_request"], number=number))
+        body = json.dumps(payload).encode()
+        headers = {
+            "Content-Type": "application/json",
+            "X-GitHub-Event": event_type,
+            "X-GitHub-Delivery": f"load-{number}",
+            "X-Hub-Signature": sign(secret, body),
+        }
+        yield body, headers
+
+
+def in_process_sender(secret, redis_url):
+    """
+    Make a function that posts deliveries to an app in this process.
+    """
+    from rq import Queue
+
+    import openedx_webhooks
+    from openedx_webhooks import github_views
+
+    if redis_url:
+        import redis
+        connection = redis.from_url(redis_url)
+    else:
+        import fakeredis
+
+        class FakeRedis(fakeredis.FakeStrictRedis):
+            def info(self, section=None):
+                # fakeredis has no INFO, but RQ asks for the server version.
+                return {"redis_version": "6.0.0"}
+
+        connection = FakeRedis()
+    github_views.q = Queue(connection=connection)
+
+    app = openedx_webhooks.create_app(config="testing")
+    app.config["GITHUB_WEBHOOKS_SECRET"] = secret
+    openedx_webhooks.create_celery_app(app)
+    openedx_webhooks.celery.conf.update(
+        BROKER_URL="memory://",
+        CELERY_RESULT_BACKEND="cache+memory://",
+    )
+
+    local = threading.local()
+
+    def _send(body, headers):
+        if not hasattr(local, "client"):
+            local.client = app.test_client()
+        resp = local.client.post(HOOK_PATH, data=body, headers=headers, base_url=BASE_URL)
+        return resp.status_code
+
+    return _send
+
+
+def remote_sender(url):
+    """
+    Make a function that posts deliveries to a running server at `url`.
+    """
+    local = threading.local()
+
+    def _send(body, headers):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        return local.session.post(url.rstrip("/") + HOOK_PATH, data=body, headers=headers).status_code
+
+    return _send
+
+
+def percentile(sorted_values, pct):
+    """
+    The value at `pct` percent of the way through `sorted_values`.
+    """
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+@click.command()
+@click.option(
+    '--payload', 'payload_files', multiple=True, type=click.Path(exists=True),
+    help='A recorded webhook payload to send. Can be repeated.',
+)
+@click.option('--event-type', default='pull_request', help='The X-GitHub-Event header to send.')
+@click.option('--count', default=500, help='How many deliveries to send.')
+@click.option('--rate', default=0.0, help='Deliveries per second to start, or 0 for as fast as possible.')
+@click.option('--concurrency', default=8, help='How many deliveries can be in flight at once.')
+@click.option('--secret', envvar='GITHUB_WEBHOOKS_SECRET', default='load-test-secret',
+              help='The webhook secret to sign with.')
+@click.option('--url', help='A running server to send to, instead of an app in this process.')
+@click.option('--redis-url', help='A Redis for the in-process app to queue RQ jobs in, instead of a fake one.')
+def cli(payload_files, event_type, count, rate, concurrency, secret, url, redis_url):
+    """
+    Send signed webhook deliveries to hook-receiver, and report latency and throughput.
+    """
+    if url:
+        send = remote_sender(url)
+    else:
+        send = in_process_sender(secret, redis_url)
+
+    deliveries = make_deliveries(payload_files or DEFAULT_PAYLOADS, secret, event_type)
+    work = [next(deliveries) for _ in range(count)]
+    lock = threading.Lock()
+    latencies = []
+    statuses = {}
+
+    start = time.perf_counter()
+
+    def _deliver(index):
+        if rate:
+            # An open loop: each delivery has its start time, whether or not
+            # earlier ones have finished.
+            delay = start + index / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        body, headers = work[index]
+        sent = time.perf_counter()
+        try:
+            status = send(body, headers)
+        except requests.RequestException as exc:
+            status = type(exc).__name__
+        latency = time.perf_counter() - sent
+        with lock:
+            latencies.append(latency)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(_deliver, range(count)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    click.echo(f"Sent {count} deliveries in {elapsed:.2f}s: {count / elapsed:.1f}/s")
+    click.echo("Statuses: " + ", ".join(f"{s}: {n}" for s, n in sorted(statuses.items(), key=str)))
+    for pct in [50, 90, 99]:
+        click.echo(f"p{pct}: {percentile(latencies, pct) * 1000:.1f}ms")
+    click.echo(f"max: {latencies[-1] * 1000:.1f}ms")
+
+    accepted = sum(n for s, n in statuses.items() if s in (200, 202))
+    if accepted != count:
+        raise click.ClickException(f"{count - accepted} deliveries were not accepted")
+
+
+if __name__ == '__main__':
+    cli()
@@ -74,6 +74,8 @@ def create_celery_app(app=None, config="worker"):
     if os.environ.get("SENTRY_DSN", ""):
         sentry_sdk.init(integrations=[CeleryIntegration(), FlaskIntegration()])
 
+    from .tracing import continue_trace
+
     app = app or create_app(config=config)
     celery.main = app.import_name
     celery.conf["BROKER_URL"] = app.config["CELERY_BROKER_URL"]
@@ -86,7 +88,8 @@ def create_celery_app(app=None, config="worker"):
                 wsgi_environ = kwargs.pop("wsgi_environ")
             else:
                 wsgi_environ = None
-            with app.app_context():
+            trace = kwargs.pop("trace", None)
+            with app.app_context(), continue_trace(trace, self.name):
                 if wsgi_environ:
                     with app.request_context(wsgi_environ):
                         return TaskBase.__call__(self, *args, **kwargs)
@@ -15,7 +15,6 @@ from openedx_webhooks.info import (
     is_draft_pull_request,
     pull_request_has_cla,
 )
-from openedx_webhooks.oauth import get_jira_session
 from openedx_webhooks.types import JiraDict, PrDict
 from openedx_webhooks.utils import get_jira_custom_fields
 
@@ -150,7 +149,7 @@ def github_blended_pr_comment(
     """
     Create a Blended PR comment.
     """
-    custom_fields = get_jira_custom_fields(get_jira_session())
+    custom_fields = get_jira_custom_fields()
     if blended_epic is not None:
         project_name = blended_epic["fields"].get(custom_fields["Blended Project ID"])
         project_page = blended_epic["fields"].get(custom_fields["Blended Project Status Page"])
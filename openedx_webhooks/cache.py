@@ -0,0 +1,531 @@
+"""
+Caching of function values, in each process and shared between processes.
+
+Values are kept in an in-process LRU cache.  If a shared backend is
+configured (with the CACHE_REDIS_URL environment variable), values are also
+stored in Redis, so that other processes don't have to compute them again.
+This matters most for RQ, which forks a new process for every job.
+
+The hit and miss stats of each function are added up in the shared backend
+too, so that they describe all the processes, not just the one asked.
+"""
+
+import collections
+import dataclasses
+import hashlib
+import os
+import pickle
+import threading
+import time
+import uuid
+from functools import update_wrapper
+
+import cachetools.keys
+import redis
+from celery.signals import task_postrun
+
+from openedx_webhooks import logger
+
+# Change this when the values of memoized functions change shape, so that
+# processes running different code don't read each other's values.
+CACHE_VERSION = 1
+
+# How long a shared value from @memoize lives in Redis, in seconds.
+SHARED_FOREVER_SECONDS = 24 * 60 * 60
+
+# A list of all the memoized functions, so that `clear_memoized_values` can
+# clear them all.
+_memoized_functions = []
+
+# How long one process can hold the lock for computing a single-flight value,
+# and how often other processes check whether the value is ready.
+SINGLE_FLIGHT_LOCK_SECONDS = 30
+SINGLE_FLIGHT_POLL_SECONDS = 0.1
+
+# How often each process adds its stats to the shared backend, in seconds.
+# They are also added at the end of each Celery task and RQ job.
+STATS_SHARE_SECONDS = 10
+
+_MISSING = object()
+_MISSING_ENTRY = (None, _MISSING)
+
+
+class RedisCacheBackend:
+    """
+    A shared cache backend storing values in Redis.
+    """
+
+    def __init__(self, redis_client):
+        self.redis = redis_client
+
+    def get(self, key):
+        return self.redis.get(key)
+
+    def set(self, key, data, ttl):
+        self.redis.set(key, data, ex=ttl)
+
+    def delete(self, key):
+        self.redis.delete(key)
+
+    def delete_prefix(self, prefix):
+        for key in self.redis.scan_iter(prefix + "*"):
+            self.redis.delete(key)
+
+    def acquire_lock(self, key, ttl):
+        """
+        Try to take a lock, returning a token for releasing it, or False if
+        someone else has it.
+        """
+        token = uuid.uuid4().hex
+        if self.redis.set(key, token, nx=True, ex=ttl):
+            return token
+        return False
+
+    def release_lock(self, key, token):
+        # Only release the lock if it's still ours, it might have expired and
+        # been taken by someone else.
+        if self.redis.get(key) == token.encode():
+            self.redis.delete(key)
+
+    def add_stats(self, key, counts):
+        """Add a dict of counts to the totals stored at `key`."""
+        pipe = self.redis.pipeline(transaction=False)
+        for name, amount in counts.items():
+            if isinstance(amount, float):
+                pipe.hincrbyfloat(key, name, amount)
+            else:
+                pipe.hincrby(key, name, amount)
+        pipe.execute()
+
+    def get_stats(self, key):
+        """Get the totals stored at `key`, as a dict of strings."""
+        return {name.decode(): value.decode() for name, value in self.redis.hgetall(key).items()}
+
+
+_shared_backend = None
+
+def set_shared_backend(backend):
+    """
+    Set the backend shared by all processes, or None to only cache in-process.
+    """
+    global _shared_backend
+    _shared_backend = backend
+
+if os.environ.get("CACHE_REDIS_URL"):
+    set_shared_backend(RedisCacheBackend(redis.from_url(os.environ["CACHE_REDIS_URL"])))
+
+
+def _is_shareable(value):
+    """Can `value` be part of a shared cache key?"""
+    if value is None or isinstance(value, (str, bytes, int, float, bool)):
+        return True
+    if isinstance(value, (tuple, frozenset)):
+        return all(_is_shareable(v) for v in value)
+    return False
+
+
+@dataclasses.dataclass
+class CacheStats:
+    """
+    Counts of what happened in calls to a memoized function.
+    """
+    hits: int = 0           # Found in-process.
+    shared_hits: int = 0    # Found in the shared backend.
+    stale_hits: int = 0     # An expired value was used, while another caller computed a new one.
+    misses: int = 0         # The function was called.
+    evictions: int = 0      # Values discarded to keep the in-process cache under maxsize.
+    load_seconds: float = 0.0   # Total time spent in the function.
+
+    def hit_rate(self):
+        calls = self.hits + self.shared_hits + self.stale_hits + self.misses
+        if not calls:
+            return None
+        return (calls - self.misses) / calls
+
+    def add(self, stat, amount=1):
+        setattr(self, stat, getattr(self, stat) + amount)
+
+    def counts(self):
+        """The stats that aren't zero, as a dict."""
+        return {name: value for name, value in dataclasses.asdict(self).items() if value}
+
+    @classmethod
+    def from_strings(cls, strings):
+        """Make stats from a dict of strings, as `RedisCacheBackend.get_stats` returns."""
+        return cls(**{
+            f.name: f.type(strings[f.name])
+            for f in dataclasses.fields(cls)
+            if f.name in strings
+        })
+
+
+def _is_fresh(entry):
+    """Is a cache entry a value that hasn't expired?"""
+    expires_at, value = entry
+    if value is _MISSING:
+        return False
+    return expires_at is None or expires_at > time.time()
+
+
+class MemoizedFunction:
+    """
+    A function whose values are cached.
+
+    `ttl` is the number of seconds to keep values, or None to keep them
+    forever.  At most `maxsize` values are kept in-process, the least recently
+    used are discarded.
+
+    Values are only shared through the shared backend if the arguments are
+    simple values, and if the value can be serialized with `serializer`.
+
+    `stats` counts what happened in this process.  Every STATS_SHARE_SECONDS,
+    the new counts are added to the totals in the shared backend.
+
+    With `single_flight`, only one caller at a time computes a value: others
+    use the expired value meanwhile, or wait for the new value if there is no
+    expired value to use.  Threads are coordinated with a lock for each key,
+    and processes with a lock in the shared backend.
+    """
+
+    def __init__(self, func, ttl=None, maxsize=128, serializer=pickle, single_flight=False):
+        update_wrapper(self, func)
+        self.func = func
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.serializer = serializer
+        self.single_flight = single_flight
+        self._values = collections.OrderedDict()    # key -> (expires_at, value)
+        self._lock = threading.RLock()
+        # Locks for computing single-flight values: key -> [lock, number of users].
+        self._key_locks = {}
+        self.stats = CacheStats()
+        # Counts not yet added to the shared totals, and when they last were.
+        self._unshared_stats = CacheStats()
+        self._stats_shared_at = time.monotonic()
+        self._shared_prefix = "memoize:{}:{}.{}:".format(
+            CACHE_VERSION, func.__module__, func.__qualname__,
+        )
+        self._stats_key = "memoize-stats:{}.{}".format(func.__module__, func.__qualname__)
+
+    def __call__(self, *args, **kwargs):
+        key = cachetools.keys.hashkey(*args, **kwargs)
+        entry = self._get_local(key)
+        if _is_fresh(entry):
+            self._count("hits")
+            return entry[1]
+        if not self.single_flight:
+            return self._load(key, args, kwargs, stale=_MISSING_ENTRY)
+
+        stale = entry
+        key_lock = self._use_key_lock(key)
+        try:
+            if not key_lock.acquire(blocking=stale[1] is _MISSING):
+                # Another thread is computing the value, use the expired one.
+                self._count("stale_hits")
+                return stale[1]
+            try:
+                # Another thread might have computed the value while we waited.
+                entry = self._get_local(key)
+                if _is_fresh(entry):
+                    self._count("hits")
+                    return entry[1]
+                return self._load(key, args, kwargs, stale)
+            finally:
+                key_lock.release()
+        finally:
+            self._unuse_key_lock(key)
+
+    def _use_key_lock(self, key):
+        """Get the lock for computing the value for `key`."""
+        with self._lock:
+            lock_users = self._key_locks.setdefault(key, [threading.RLock(), 0])
+            lock_users[1] += 1
+            return lock_users[0]
+
+    def _unuse_key_lock(self, key):
+        """Done with the lock for `key`: forget it if no one else is using it."""
+        with self._lock:
+            lock_users = self._key_locks[key]
+            lock_users[1] -= 1
+            if lock_users[1] == 0:
+                del self._key_locks[key]
+
+    def cache_clear(self, shared=False):
+        """
+        Forget all the values in this process.  The stats are kept.
+
+        With `shared`, the shared values are deleted too.  That scans all of
+        Redis, so it's only for tests and admin use: to forget a value
+        everywhere, use `cache_invalidate`.
+        """
+        with self._lock:
+            self._values.clear()
+        if shared and _shared_backend is not None:
+            self._shared_call(_shared_backend.delete_prefix, self._shared_prefix)
+
+    def cache_invalidate(self, *args, **kwargs):
+        """
+        Forget the value for particular arguments, for when we know we've
+        changed the underlying data.
+        """
+        with self._lock:
+            self._values.pop(cachetools.keys.hashkey(*args, **kwargs), None)
+        shared_key = self._shared_key(args, kwargs)
+        if shared_key is not None:
+            self._shared_call(_shared_backend.delete, shared_key)
+
+    def _load(self, key, args, kwargs, stale):
+        """
+        Get a value from the shared backend, or compute it, and keep it in-process.
+        """
+        shared_key = self._shared_key(args, kwargs)
+        entry = self._get_shared(shared_key)
+        if _is_fresh(entry):
+            self._count("shared_hits")
+        else:
+            if stale[1] is _MISSING:
+                stale = entry
+            entry = self._compute(shared_key, args, kwargs, stale)
+        self._set_local(key, *entry)
+        return entry[1]
+
+    def _compute(self, shared_key, args, kwargs, stale):
+        """
+        Compute a value and share it, unless another process is computing it.
+
+        Returns the (expires_at, value) entry.
+        """
+        lock_key = token = None
+        if self.single_flight and shared_key is not None:
+            lock_key = shared_key + ":lock"
+            token = self._shared_call(_shared_backend.acquire_lock, lock_key, SINGLE_FLIGHT_LOCK_SECONDS)
+            if token is False:
+                # Another process is computing the value.
+                if stale[1] is not _MISSING:
+                    self._count("stale_hits")
+                    return stale
+                for _ in range(int(SINGLE_FLIGHT_LOCK_SECONDS / SINGLE_FLIGHT_POLL_SECONDS)):
+                    time.sleep(SINGLE_FLIGHT_POLL_SECONDS)
+                    entry = self._get_shared(shared_key)
+                    if _is_fresh(entry):
+                        self._count("shared_hits")
+                        return entry
+                # It's taking too long, compute it ourselves.
+
+        self._count("misses")
+        start = time.perf_counter()
+        try:
+            value = self.func(*args, **kwargs)
+            self._count("load_seconds", time.perf_counter() - start)
+            expires_at = None if self.ttl is None else time.time() + self.ttl
+            self._set_shared(shared_key, expires_at, value)
+        finally:
+            if token:
+                self._shared_call(_shared_backend.release_lock, lock_key, token)
+        return expires_at, value
+
+    def _get_local(self, key):
+        """Get the in-process entry for `key`, which might have expired."""
+        with self._lock:
+            entry = self._values.get(key, _MISSING_ENTRY)
+            if _is_fresh(entry):
+                self._values.move_to_end(key)
+            return entry
+
+    def _set_local(self, key, expires_at, value):
+        with self._lock:
+            self._values[key] = (expires_at, value)
+            self._values.move_to_end(key)
+            while len(self._values) > self.maxsize:
+                self._values.popitem(last=False)
+                self.stats.add("evictions")
+                self._unshared_stats.add("evictions")
+
+    def _count(self, stat, amount=1):
+        with self._lock:
+            self.stats.add(stat, amount)
+            self._unshared_stats.add(stat, amount)
+            share_due = time.monotonic() - self._stats_shared_at >= STATS_SHARE_SECONDS
+        if share_due:
+            self.share_stats()
+
+    def share_stats(self):
+        """Add the stats counted since the last time to the shared totals."""
+        with self._lock:
+            counts = self._unshared_stats.counts()
+            self._unshared_stats = CacheStats()
+            self._stats_shared_at = time.monotonic()
+        if counts and _shared_backend is not None:
+            self._shared_call(_shared_backend.add_stats, self._stats_key, counts)
+
+    def reset_stats(self):
+        """Forget the stats, in this process and shared."""
+        with self._lock:
+            self.stats = CacheStats()
+            self._unshared_stats = CacheStats()
+        if _shared_backend is not None:
+            self._shared_call(_shared_backend.delete, self._stats_key)
+
+    def total_stats(self):
+        """
+        Get the stats of all the processes, from the shared backend, or just
+        this process's stats if there is no shared backend.
+        """
+        if _shared_backend is not None:
+            self.share_stats()
+            strings = self._shared_call(_shared_backend.get_stats, self._stats_key)
+            if strings is not None:
+                return CacheStats.from_strings(strings)
+        with self._lock:
+            return dataclasses.replace(self.stats)
+
+    def stats_info(self):
+        """
+        Get the stats and settings of this function, as a JSON-friendly dict.
+        The stats are the totals of all the processes, if there is a shared
+        backend.
+        """
+        total = self.total_stats()
+        stats = dataclasses.asdict(total)
+        stats["hit_rate"] = total.hit_rate()
+        with self._lock:
+            size = len(self._values)
+        return {
+            "name": "{}.{}".format(self.func.__module__, self.func.__qualname__),
+            "ttl": self.ttl,
+            "maxsize": self.maxsize,
+            "size": size,
+            "single_flight": self.single_flight,
+            "shared": _shared_backend is not None,
+            **stats,
+        }
+
+    def _shared_key(self, args, kwargs):
+        """The key for the shared value, or None if it shouldn't be shared."""
+        if _shared_backend is None:
+            return None
+        key_args = (args, tuple(sorted(kwargs.items())))
+        if not _is_shareable(key_args):
+            return None
+        digest = hashlib.sha1(repr(key_args).encode("utf8")).hexdigest()
+        return self._shared_prefix + digest
+
+    def _get_shared(self, shared_key):
+        """Get the shared entry for `shared_key`, which might have expired."""
+        if shared_key is None:
+            return _MISSING_ENTRY
+        data = self._shared_call(_shared_backend.get, shared_key)
+        if data is None:
+            return _MISSING_ENTRY
+        try:
+            expires_at, value = self.serializer.loads(data)
+        except Exception as exc:    # pylint: disable=broad-except
+            logger.warning(f"Couldn't load shared cache value {shared_key}: {exc!r}")
+            return _MISSING_ENTRY
+        return expires_at, value
+
+    def _set_shared(self, shared_key, expires_at, value):
+        if shared_key is None:
+            return
+        try:
+            data = self.serializer.dumps((expires_at, value))
+        except Exception:   # pylint: disable=broad-except
+            # Some values can't be serialized, they are only cached in-process.
+            return
+        if self.ttl is None:
+            ttl = SHARED_FOREVER_SECONDS
+        elif self.single_flight:
+            # Keep expired values as long again, to use while computing new ones.
+            ttl = 2 * int(self.ttl) + 1
+        else:
+            ttl = int(self.ttl) + 1
+        self._shared_call(_shared_backend.set, shared_key, data, ttl)
+
+    def _shared_call(self, method, *args):
+        """Call a shared backend method, treating Redis problems as cache misses."""
+        try:
+            return method(*args)
+        except redis.RedisError as exc:
+            logger.warning(f"Shared cache error: {exc!r}")
+            return None
+
+
+def memoize(func):
+    """Cache the value returned by a function call forever."""
+    func = MemoizedFunction(func)
+    _memoized_functions.append(func)
+    return func
+
+def memoize_timed(minutes, maxsize=128, single_flight=False):
+    """
+    Cache the value of a function for `minutes` minutes.
+
+    At most `maxsize` values are kept, the least recently used are discarded.
+
+    With `single_flight`, when a value expires, only one caller computes the
+    new value, and others use the expired value until it's ready.  Use it for
+    values that many callers need at once and are slow to compute: it costs a
+    lock in the shared backend for every miss.
+
+    The decorated function has a `cache_invalidate` method to forget the value
+    for particular arguments, for when we know we've changed the underlying data.
+    """
+    def _timed(func):
+        func = MemoizedFunction(
+            func, ttl=60 * minutes, maxsize=maxsize, single_flight=single_flight,
+        )
+        _memoized_functions.append(func)
+        return func
+    return _timed
+
+def clear_memoized_values():
+    """
+    Clear all the values saved by @memoize and @memoize_timed, in this process
+    and shared, to ensure isolated tests.
+    """
+    for func in _memoized_functions:
+        func.cache_clear(shared=True)
+        func.reset_stats()
+
+def share_cache_stats():
+    """Add the stats counted in this process to the shared totals."""
+    for func in _memoized_functions:
+        func.share_stats()
+
+@task_postrun.connect
+def _share_stats_after_task(**kwargs):
+    share_cache_stats()
+
+def cache_stats():
+    """
+    Get the stats of all the memoized functions, totalled over all the
+    processes if there is a shared backend.
+
+    Returns:
+        List[Dict]: The `MemoizedFunction.stats_info` of each function, by name.
+    """
+    return sorted((f.stats_info() for f in _memoized_functions), key=lambda i: i["name"])
+
+def cache_metrics():
+    """
+    Get the stats of all the memoized functions, in the Prometheus text format.
+    """
+    lines = [
+        "# HELP memoize_calls_total Calls to memoized functions, by where the value came from.",
+        "# TYPE memoize_calls_total counter",
+    ]
+    infos = cache_stats()
+    for info in infos:
+        for result, stat in [("hit", "hits"), ("shared_hit", "shared_hits"), ("stale_hit", "stale_hits"), ("miss", "misses")]:
+            count = info[stat]
+            lines.append(f'memoize_calls_total{{function="{info["name"]}",result="{result}"}} {count}')
+    for metric, stat, kind, help_text in [
+        ("memoize_evictions_total", "evictions", "counter", "Values evicted to stay under maxsize."),
+        ("memoize_load_seconds_total", "load_seconds", "counter", "Time spent computing values."),
+        ("memoize_size", "size", "gauge", "Values cached in-process."),
+    ]:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for info in infos:
+            lines.append(f'{metric}{{function="{info["name"]}"}} {info[stat]}')
+    return "\n".join(lines) + "\n"
@@ -16,11 +16,19 @@ class DefaultConfig:
     CELERY_EAGER_PROPAGATES_EXCEPTIONS = True
     CELERY_BROKER_URL = os.environ.get("REDIS_URL", "redis://")
     CELERY_RESULT_BACKEND = os.environ.get("REDIS_URL", "redis://")
+    # How many Jira issues the rescan task processes at once.
+    JIRA_RESCAN_CONCURRENCY = int(os.environ.get("JIRA_RESCAN_CONCURRENCY", 8))
+    # How long to remember Jira webhook events, to drop the duplicates Jira sends.
+    JIRA_WEBHOOK_DEDUPE_SECONDS = int(os.environ.get("JIRA_WEBHOOK_DEDUPE_SECONDS", 60 * 60))
+    # The most often, in seconds, that the latest GitHub activity is written to
+    # a Jira issue.  Zero writes every activity as it happens.
+    JIRA_ACTIVITY_FLUSH_SECONDS = int(os.environ.get("JIRA_ACTIVITY_FLUSH_SECONDS", 60))
 
 
 class WorkerConfig(DefaultConfig):
     CELERY_IMPORTS = (
         'openedx_webhooks.tasks.github',
+        'openedx_webhooks.tasks.jira',
         'openedx_webhooks.tasks.example',
     )
 
@@ -0,0 +1,74 @@
+"""
+A context shared by the actions processing one webhook event.
+"""
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+# ContextVar[Optional[EventContext]]: The context of the event being dispatched
+_current_context = ContextVar('event_context', default=None)
+
+
+class EventContext:
+    """
+    Values looked up while processing one webhook event.
+
+    Actions processing the same event often need the same data, like the JIRA
+    issues for a pull request. Lookups wrapped with `memoize_for_event` are
+    done once per event, even if actions are running in different threads.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, func):
+        """
+        Get the value for `key`, calling `func()` to compute it the first time.
+
+        Arguments:
+            key (Hashable): Identifies the value
+            func (Callable[[], Any]): Computes the value
+
+        Returns:
+            Any
+        """
+        with self._lock:
+            key_lock = self._locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if key not in self._values:
+                self._values[key] = func()
+            return self._values[key]
+
+
+@contextmanager
+def event_context():
+    """
+    Make a new `EventContext` current for the duration of a ``with`` block.
+
+    Threads started with ``contextvars.copy_context().run`` share it.
+    """
+    token = _current_context.set(EventContext())
+    try:
+        yield _current_context.get()
+    finally:
+        _current_context.reset(token)
+
+
+def memoize_for_event(f):
+    """
+    Memoize a function's values for the current event.
+
+    Outside of `event_context`, the function is simply called. The arguments
+    must be hashable.
+    """
+    @wraps(f)
+    def wrapper(*args):
+        ctx = _current_context.get()
+        if ctx is None:
+            return f(*args)
+        return ctx.get((f, args), lambda: f(*args))
+    return wrapper
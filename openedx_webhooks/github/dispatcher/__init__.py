@@ -2,20 +2,66 @@
 Dispatch incoming webhook events to matching actions.
 """
 
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
 from ...lib.github.models import GithubWebHookRequestHeader
 from .actions import ACTIONS
+from ..context import event_context
 
 
 def dispatch(raw_headers, event, actions=ACTIONS):
     """
     Determine how an event needs to be processed.
 
+    The actions that want the event run at the same time, sharing an
+    `EventContext` so that lookups they have in common are only done once.
+    If any action fails, the first exception is re-raised after they have all
+    finished.
+
     Arguments:
         raw_headers (flask.Request.headers)
         event (Dict[str, Any]): The parsed event payload
         actions (List[Module, ...]): A list of actions to process, in order
     """
     event_type = GithubWebHookRequestHeader(raw_headers).event_type
+    wanted = [a for a in actions if wants_event(a, event_type, event)]
+
+    with event_context():
+        if len(wanted) <= 1:
+            for action in wanted:
+                action.run(event_type, event)
+            return
+
+        with ThreadPoolExecutor(max_workers=len(wanted)) as executor:
+            futures = [
+                executor.submit(copy_context().run, action.run, event_type, event)
+                for action in wanted
+            ]
+        for future in futures:
+            future.result()
+
+
+def wants_event(action, event_type, event):
+    """
+    Check whether an action's declared predicates accept an event.
+
+    The predicates only look at the event payload, so they are much cheaper
+    than the GitHub and JIRA queries an action makes once it runs.
+
+    Arguments:
+        action (Module): The action to check
+        event_type (str): GitHub event type
+        event (Dict[str, Any]): The parsed event payload
+
+    Returns:
+        bool
+    """
+    if event_type not in action.EVENT_TYPES:
+        return False
+
+    event_actions = getattr(action, 'EVENT_ACTIONS', None)
+    if event_actions is not None and event.get('action') not in event_actions:
+        return False
 
-    for action in [a for a in actions if event_type in a.EVENT_TYPES]:
-        action.run(event_type, event)
+    return True
@@ -13,6 +13,17 @@ Inputs
 
 -  event is the event payload parsed into a Python ``dict``.
 
+Predicates
+----------
+
+Before running an action, the dispatcher checks these module attributes,
+which only look at the event payload:
+
+-  ``EVENT_TYPES`` (required): the event types the action handles.
+
+-  ``EVENT_ACTIONS`` (optional): the values of the payload's ``action``
+   field the action handles, for example ``('closed',)``.
+
 .. _event\_type: https://developer.github.com/v3/activity/events/types/
 """
 
@@ -13,6 +13,10 @@ EVENT_TYPES = (
     'pull_request',
 )
 
+EVENT_ACTIONS = (
+    'closed',
+)
+
 SURVEY_URL = (
     'https://docs.google.com/forms/d/e'
     '/1FAIpQLSceJOyGJ6JOzfy6lyR3T7EW_71OWUnNQXp68Fymsk3MkNoSDg/viewform'
@@ -50,8 +54,7 @@ def run(gh, jira, event_type, raw_event):
     """
     event = GithubEvent(gh, event_type, raw_event)
     has_jira_issue = bool(find_issues_for_pull_request(jira, event.html_url))
-
-    if event.action != 'closed' or not has_jira_issue:
+    if not has_jira_issue:
         return
 
     msg = _create_pr_comment(event)
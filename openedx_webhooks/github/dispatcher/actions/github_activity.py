@@ -2,7 +2,7 @@
 Update JIRA issue with latest GitHub activity.
 """
 
-from ....jira.tasks import update_latest_github_activity
+from ....jira.tasks import buffer_latest_github_activity
 from ....lib.github.decorators import inject_gh
 from ....lib.jira.decorators import inject_jira
 from ...models import GithubEvent
@@ -38,8 +38,7 @@ def run(gh, jira, event_type, raw_event):
 
     issues = find_issues_for_pull_request(jira, event.html_url)
     for issue in issues:
-        update_latest_github_activity(
-            jira,
+        buffer_latest_github_activity(
             issue.id,
             event.description,
             event.sender_login,
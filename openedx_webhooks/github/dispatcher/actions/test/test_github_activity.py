@@ -19,10 +19,10 @@ def patch_find_issues(mocker):
 
 
 @pytest.fixture(autouse=True)
-def patch_update_latest_github_activity(mocker):
+def patch_buffer_latest_github_activity(mocker):
     mocker.patch(
         'openedx_webhooks.github.dispatcher.actions.github_activity'
-        '.update_latest_github_activity'
+        '.buffer_latest_github_activity'
     )
 
 
@@ -44,11 +44,11 @@ class TestProcess:
 
         func = (
             openedx_webhooks.github.dispatcher.actions.github_activity
-            .update_latest_github_activity
+            .buffer_latest_github_activity
         )
         dt = pytz.UTC.localize(datetime(2016, 10, 24, 18, 53, 10))
         func.assert_called_once_with(
-            jira_client, '123', 'issue_comment: edited', login, dt, is_edx_user
+            '123', 'issue_comment: edited', login, dt, is_edx_user
         )
 
     def test_robot(self, github_client, jira_client):
@@ -66,7 +66,7 @@ class TestProcess:
 
         func = (
             openedx_webhooks.github.dispatcher.actions.github_activity
-            .update_latest_github_activity)
+            .buffer_latest_github_activity)
         func.assert_not_called()
 
     def test_unknown_user(
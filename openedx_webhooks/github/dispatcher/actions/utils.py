@@ -2,10 +2,16 @@
 Utilities for GitHub webhook handler actions.
 """
 
+from ...context import memoize_for_event
+
+
+@memoize_for_event
 def find_issues_for_pull_request(jira, pull_request_url):
     """
     Find corresponding JIRA issues for a given GitHub pull request.
 
+    The search is only done once per dispatched event.
+
     Arguments:
         jira (jira.JIRA): An authenticated JIRA API client session
         pull_request_url (str)
@@ -1,5 +1,6 @@
 import pytest
 
+from openedx_webhooks.github.context import memoize_for_event
 from openedx_webhooks.github.dispatcher import dispatch
 
 
@@ -20,6 +21,11 @@ class DummyAction3(BaseDummyAction):
     EVENT_TYPES = ('type2',)
 
 
+class ClosedAction(BaseDummyAction):
+    EVENT_TYPES = ('event_type',)
+    EVENT_ACTIONS = ('closed',)
+
+
 @pytest.fixture(autouse=True)
 def patch_event_type(mocker):
     mocker.patch(
@@ -52,3 +58,56 @@ class TestDispatch:
 
         for a in actions:
             assert a.run.call_count == 0
+
+    @pytest.mark.parametrize('event_action, called', [
+        ('closed', 1),
+        ('opened', 0),
+        (None, 0),
+    ])
+    def test_match_event_action(self, mocker, event_action, called):
+        action = ClosedAction()
+        mocker.spy(action, 'run')
+        event = {'action': event_action}
+
+        dispatch('header', event, [action])
+
+        assert action.run.call_count == called
+
+    def test_actions_share_lookups(self):
+        lookups = []
+
+        @memoize_for_event
+        def lookup(url):
+            lookups.append(url)
+            return url.upper()
+
+        class LookupAction(BaseDummyAction):
+            EVENT_TYPES = ('event_type',)
+
+            def __init__(self):
+                self.found = None
+
+            def run(self, event_type, event):
+                self.found = lookup(event['url'])
+
+        actions = [LookupAction(), LookupAction()]
+        dispatch('header', {'url': 'http://pr'}, actions)
+        dispatch('header', {'url': 'http://pr'}, actions)
+
+        assert [a.found for a in actions] == ['HTTP://PR', 'HTTP://PR']
+        # Looked up once per dispatched event.
+        assert lookups == ['http://pr', 'http://pr']
+
+    def test_failures_are_raised(self):
+        class FailingAction(BaseDummyAction):
+            EVENT_TYPES = ('event_type',)
+
+            def run(self, event_type, event):
+                raise ValueError('Oops')
+
+        other = DummyAction1()
+        other.run = lambda event_type, event: setattr(other, 'ran', True)
+
+        with pytest.raises(ValueError, match='Oops'):
+            dispatch('header', 'event', [FailingAction(), other])
+        assert other.ran
@@ -7,10 +7,20 @@ from functools import lru_cache
 from ..lib.edx_repo_tools_data.utils import get_people as _get_people
 from ..lib.exceptions import NotFoundError
 from ..lib.github.models import GithubWebHookEvent
+from .context import memoize_for_event
 
 get_people = lru_cache()(_get_people)
 
 
+@memoize_for_event
+def _get_openedx_user(gh, login):
+    people = get_people(gh)
+    try:
+        return people.get(login)
+    except NotFoundError:
+        return None
+
+
 class GithubEvent(GithubWebHookEvent):
     """
     A GitHub webhook event.
@@ -39,8 +49,4 @@ class GithubEvent(GithubWebHookEvent):
         Optional(openedx_webhooks.lib.edx_repo_tools_data.models.Person):
             Activity user.
         """
-        people = get_people(self.gh)
-        try:
-            return people.get(self.sender_login)
-        except NotFoundError:
-            return None
+        return _get_openedx_user(self.gh, self.sender_login)
@@ -0,0 +1,60 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+
+from openedx_webhooks.github.context import event_context, memoize_for_event
+
+
+def make_counted():
+    calls = []
+
+    @memoize_for_event
+    def double(x):
+        calls.append(x)
+        return x * 2
+
+    return double, calls
+
+
+def test_memoized_within_context():
+    double, calls = make_counted()
+    with event_context():
+        assert double(1) == 2
+        assert double(1) == 2
+        assert double(2) == 4
+    assert calls == [1, 2]
+
+
+def test_not_memoized_across_contexts():
+    double, calls = make_counted()
+    with event_context():
+        assert double(1) == 2
+    with event_context():
+        assert double(1) == 2
+    assert calls == [1, 1]
+
+
+def test_not_memoized_without_context():
+    double, calls = make_counted()
+    assert double(1) == 2
+    assert double(1) == 2
+    assert calls == [1, 1]
+
+
+def test_shared_with_threads():
+    calls = []
+    lock = threading.Lock()
+
+    @memoize_for_event
+    def slow_double(x):
+        with lock:
+            calls.append(x)
+        time.sleep(0.05)
+        return x * 2
+
+    with event_context():
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(copy_context().run, slow_double, 5) for _ in range(4)]
+        assert [f.result() for f in futures] == [10] * 4
+    assert calls == [5]
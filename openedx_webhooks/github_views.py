@@ -15,6 +15,7 @@ from openedx_webhooks.debug import is_debug, print_long_json
 from openedx_webhooks.lib.github.models import GithubWebHookRequestHeader
 from openedx_webhooks.lib.rq import q
 from openedx_webhooks.tasks.github import pull_request_changed_task, rescan_repository
+from openedx_webhooks.tracing import start_trace, trace_context
 from openedx_webhooks.utils import (
     is_valid_payload, minimal_wsgi_environ, paginated_get,
     sentry_extra_context
@@ -25,6 +26,7 @@ logger = logging.getLogger(__name__)
 
 
 @github_bp.route('/hook-receiver', methods=('POST',))
+@start_trace("hook_receiver")
 def hook_receiver():
     """
     Process incoming GitHub webhook events.
@@ -60,6 +62,7 @@ def hook_receiver():
         'openedx_webhooks.github.dispatcher.dispatch',
         dict(request.headers),
         event,
+        meta={"trace": trace_context()},
     )
 
     # There used to be two webhook endpoints.  This is the two of them
@@ -86,7 +89,9 @@ def hook_receiver():
     pr_activity = f"{repo} #{pr_number} {action!r}"
     if action in ["opened", "edited", "closed", "synchronize", "ready_for_review", "converted_to_draft"]:
         logger.info(f"{pr_activity}, processing...")
-        result = pull_request_changed_task.delay(pr, wsgi_environ=minimal_wsgi_environ())
+        result = pull_request_changed_task.delay(
+            pr, wsgi_environ=minimal_wsgi_environ(), trace=trace_context(),
+        )
     else:
         logger.info(f"{pr_activity}, ignoring...")
         return "Nothing for me to do", 200
@@ -19,7 +19,7 @@ from openedx_webhooks.utils import (
 )
 
 
-@memoize_timed(minutes=15)
+@memoize_timed(minutes=15, single_flight=True)
 def _read_repotools_yaml_file(filename):
     """Read a YAML file from the repo-tools-data repo."""
     return yaml.safe_load(_read_repotools_file(filename))
@@ -185,6 +185,34 @@ def get_blended_project_id(pull_request: PrDict) -> Optional[int]:
         return None
 
 
+@memoize_timed(minutes=60)
+def get_github_user(login: str) -> Optional[Dict]:
+    """
+    Get GitHub's data about a user, or None if there is no such user.
+
+    Missing users are remembered too, so they aren't re-requested (with all of
+    retry_get's retries) for every pull request they make.  Other errors raise,
+    so that they aren't remembered.
+    """
+    resp = retry_get(get_github_session(), f"/users/{login}")
+    if resp.status_code == 404:
+        return None
+    resp.raise_for_status()
+    return resp.json()
+
+
+@memoize_timed(minutes=30)
+def get_repo_labels(repo: str) -> Dict[str, Dict]:
+    """
+    Get the labels defined in a GitHub repo, as a dict mapping names to label data.
+
+    Anything that changes the labels in a repo should call
+    `get_repo_labels.cache_invalidate(repo)` afterward.
+    """
+    url = f"/repos/{repo}/labels"
+    return {lbl["name"]: lbl for lbl in paginated_get(url, session=get_github_session())}
+
+
 @memoize
 def github_whoami():
     self_resp = retry_get(get_github_session(), "/user")
@@ -206,9 +234,18 @@ def get_bot_comments(pull_request: PrDict) -> Iterable[PrCommentDict]:
             yield comment
 
 
-def get_jira_issue_key(pull_request: PrDict) -> Optional[str]:
-    """Find mention of a Jira issue number in bot-authored comments."""
-    for comment in get_bot_comments(pull_request):
+def get_jira_issue_key(
+    pull_request: PrDict,
+    bot_comments: Optional[Iterable[PrCommentDict]] = None,
+) -> Optional[str]:
+    """
+    Find mention of a Jira issue number in bot-authored comments.
+
+    Pass `bot_comments` if they've already been fetched with `get_bot_comments`.
+    """
+    if bot_comments is None:
+        bot_comments = get_bot_comments(pull_request)
+    for comment in bot_comments:
         # search for the first occurrence of a JIRA ticket key in the comment body
         match = re.search(r"\b([A-Z]{2,}-\d+)\b", comment["body"])
         if match:
@@ -2,17 +2,27 @@
 Tasks that update JIRA in some way.
 """
 
+import datetime
+import json
 import logging
 
+import arrow
+from flask import current_app, has_app_context
 from jira import JIRAError
 
 from ..lib.jira.decorators import inject_jira
 from ..lib.jira.utils import (
     convert_to_jira_datetime_string, find_allowed_values, make_fields_lookup
 )
+from ..config import DefaultConfig
+from ..lib.rq import q, store
 
 logger = logging.getLogger(__name__)
 
+# Redis keys for the buffered activity, and the scheduled flush, of an issue.
+PENDING_ACTIVITY_KEY = 'jira-activity:pending:{issue_id}'
+ACTIVITY_FLUSH_KEY = 'jira-activity:flush:{issue_id}'
+
 LAST_UPDATED_AT = 'Github PR Last Updated At'
 LAST_UPDATED_BY = 'Github PR Last Updated By'
 LATEST_ACTION = 'Github Latest Action'
@@ -80,3 +90,106 @@ def update_latest_github_activity(
     except JIRAError as err:
         # We made our best attempt. It's OK for the update to fail.
         logger.info(f"Couldn't update Jira issue {issue_id} with latest GitHub activity: {err}")
+
+
+def _activity_flush_seconds():
+    """
+    The JIRA_ACTIVITY_FLUSH_SECONDS setting.
+
+    RQ jobs run outside of the Flask app, so they use the default config.
+    """
+    if has_app_context():
+        return current_app.config['JIRA_ACTIVITY_FLUSH_SECONDS']
+    return DefaultConfig.JIRA_ACTIVITY_FLUSH_SECONDS
+
+
+def buffer_latest_github_activity(
+        issue_id, description, login, updated_at, is_edx_user
+):
+    """
+    Arrange for a JIRA issue to be updated with the latest GitHub activity.
+
+    Busy pull requests produce lots of activity, so rather than writing each
+    one to JIRA, the newest activity for each issue is kept in Redis.  A flush
+    is scheduled to write it at most once every JIRA_ACTIVITY_FLUSH_SECONDS.
+
+    Arguments:
+        issue_id (str): The JIRA issue ID
+        description (str): Description of GitHub activity
+        login (str): GitHub login of user who generated the activity
+        updated_at (datetime.datetime): Datetime of when the activity happened
+        is_edx_user (bool): Is the user associated with edX?
+    """
+    flush_seconds = _activity_flush_seconds()
+    if flush_seconds <= 0:
+        update_latest_github_activity(
+            issue_id, description, login, updated_at, is_edx_user
+        )
+        return
+
+    activity = {
+        'description': description,
+        'login': login,
+        'updated_at': arrow.get(updated_at).isoformat(),
+        'is_edx_user': is_edx_user,
+    }
+    pending_key = PENDING_ACTIVITY_KEY.format(issue_id=issue_id)
+
+    def keep_newest(pipe):
+        pending = pipe.get(pending_key)
+        if pending is not None:
+            pending_at = arrow.get(json.loads(pending)['updated_at'])
+            if pending_at > arrow.get(updated_at):
+                return
+        pipe.multi()
+        pipe.set(pending_key, json.dumps(activity))
+
+    store.transaction(keep_newest, pending_key)
+
+    # The flush deletes this key, so the expiration is only a safety net in
+    # case the flush job is lost.
+    flush_key = ACTIVITY_FLUSH_KEY.format(issue_id=issue_id)
+    if store.set(flush_key, 1, nx=True, ex=2 * flush_seconds):
+        q.enqueue_in(
+            datetime.timedelta(seconds=flush_seconds),
+            flush_latest_github_activity,
+            issue_id,
+        )
+
+
+def flush_latest_github_activity(issue_id):
+    """
+    Write the buffered GitHub activity for a JIRA issue, if there is any.
+
+    Arguments:
+        issue_id (str): The JIRA issue ID
+    """
+    # Activity arriving after this will schedule another flush.
+    store.delete(ACTIVITY_FLUSH_KEY.format(issue_id=issue_id))
+
+    pending_key = PENDING_ACTIVITY_KEY.format(issue_id=issue_id)
+    pipe = store.pipeline()
+    pipe.get(pending_key)
+    pipe.delete(pending_key)
+    pending, _ = pipe.execute()
+    if pending is None:
+        return
+
+    activity = json.loads(pending)
+    update_latest_github_activity(
+        issue_id,
+        activity['description'],
+        activity['login'],
+        arrow.get(activity['updated_at']).datetime,
+        activity['is_edx_user'],
+    )
+
+
+def flush_all_latest_github_activity():
+    """
+    Write all of the buffered GitHub activity, for when a worker shuts down.
+    """
+    pattern = PENDING_ACTIVITY_KEY.format(issue_id='*')
+    for key in store.scan_iter(pattern):
+        issue_id = key.decode().rpartition(':')[2]
+        flush_latest_github_activity(issue_id)
@@ -1,6 +1,17 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
 from jira import JIRA
+from rq import Queue
 
-from openedx_webhooks.jira.tasks import _make_edx_action_choices
+from openedx_webhooks.config import DefaultConfig
+from openedx_webhooks.jira.tasks import (
+    _make_edx_action_choices,
+    buffer_latest_github_activity,
+    flush_all_latest_github_activity,
+    flush_latest_github_activity,
+)
 
 RESULT1 = {'key': True, 'value': 'Yes'}
 RESULT2 = {'key': False, 'value': 'No'}
@@ -15,3 +26,65 @@ def test_make_edx_action_choices(mocker):
     expected = {True: RESULT1, False: RESULT2}
     choices = _make_edx_action_choices(jira)
     assert choices == expected
+
+
+@pytest.fixture
+def activity_buffer(mocker, fake_redis):
+    queue = mocker.patch('openedx_webhooks.jira.tasks.q', spec_set=Queue)
+    mocker.patch.object(DefaultConfig, 'JIRA_ACTIVITY_FLUSH_SECONDS', 60)
+    update = mocker.patch('openedx_webhooks.jira.tasks.update_latest_github_activity')
+    return queue, update
+
+
+def _at(minute):
+    return pytz.UTC.localize(datetime(2020, 11, 2, 9, minute))
+
+
+def test_buffer_keeps_newest_activity(activity_buffer, mocker):
+    queue, update = activity_buffer
+    buffer_latest_github_activity('123', 'comment 1', 'someone', _at(1), False)
+    buffer_latest_github_activity('123', 'comment 3', 'edx-person', _at(3), True)
+    buffer_latest_github_activity('123', 'comment 2', 'someone', _at(2), False)
+    buffer_latest_github_activity('456', 'other', 'someone', _at(2), False)
+
+    update.assert_not_called()
+    # One flush is scheduled for each issue.
+    assert queue.enqueue_in.call_args_list == [
+        mocker.call(timedelta(seconds=60), flush_latest_github_activity, '123'),
+        mocker.call(timedelta(seconds=60), flush_latest_github_activity, '456'),
+    ]
+
+    flush_latest_github_activity('123')
+    update.assert_called_once_with('123', 'comment 3', 'edx-person', _at(3), True)
+
+    # Nothing is left to write.
+    update.reset_mock()
+    flush_latest_github_activity('123')
+    update.assert_not_called()
+
+
+def test_activity_after_flush_schedules_another(activity_buffer):
+    queue, update = activity_buffer
+    buffer_latest_github_activity('123', 'comment 1', 'someone', _at(1), False)
+    flush_latest_github_activity('123')
+    buffer_latest_github_activity('123', 'comment 2', 'someone', _at(2), False)
+    assert queue.enqueue_in.call_count == 2
+
+
+def test_flush_all(activity_buffer):
+    _, update = activity_buffer
+    buffer_latest_github_activity('123', 'comment 1', 'someone', _at(1), False)
+    buffer_latest_github_activity('456', 'comment 2', 'someone', _at(2), False)
+
+    flush_all_latest_github_activity()
+
+    assert sorted(c.args[0] for c in update.call_args_list) == ['123', '456']
+
+
+def test_no_buffering(activity_buffer, mocker):
+    queue, update = activity_buffer
+    mocker.patch.object(DefaultConfig, 'JIRA_ACTIVITY_FLUSH_SECONDS', 0)
+    buffer_latest_github_activity('123', 'comment 1', 'someone', _at(1), False)
+    update.assert_called_once_with('123', 'comment 1', 'someone', _at(1), False)
+    queue.enqueue_in.assert_not_called()
+
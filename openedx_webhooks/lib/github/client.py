@@ -6,6 +6,8 @@ import os
 
 from github3 import GitHub
 
+from openedx_webhooks.metrics import instrument_session
+
 try:
     from dotenv import find_dotenv, load_dotenv
     load_dotenv(find_dotenv())
@@ -14,5 +16,18 @@ except ImportError:  # pragma: no cover
 
 _token = os.environ.get('GITHUB_PERSONAL_TOKEN')
 
+
+def make_github_client():
+    """
+    Make a new GitHub client, with its own session.
+
+    Returns:
+        github3.GitHub: An authenticated GitHub API client session
+    """
+    client = GitHub(token=_token)
+    instrument_session(client.session)
+    return client
+
+
 # (github3.GitHub): An authenticated GitHub API client session
-github_client = GitHub(token=_token)
+github_client = make_github_client()
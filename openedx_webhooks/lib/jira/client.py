@@ -7,6 +7,8 @@ from base64 import b64decode
 
 from jira import JIRA
 
+from openedx_webhooks.metrics import instrument_session
+
 try:
     from dotenv import find_dotenv, load_dotenv
     load_dotenv(find_dotenv())
@@ -22,5 +24,18 @@ _oauth_info = dict(
     key_cert=b64decode(os.environ.get('JIRA_OAUTH_PRIVATE_KEY')),
 )
 
+
+def make_jira_client():
+    """
+    Make a new JIRA client, with its own session.
+
+    Returns:
+        jira.JIRA: An authenticated JIRA API client session
+    """
+    client = JIRA(_server, oauth=_oauth_info)
+    instrument_session(client._session)  # pylint: disable=protected-access
+    return client
+
+
 # (jira.JIRA): An authenticated JIRA API client session
-jira_client = JIRA(_server, oauth=_oauth_info)
+jira_client = make_jira_client()
@@ -1,11 +1,12 @@
 from datetime import datetime
 
 import pytest
+from jira.client import ResultList
 from pytz import timezone
 
 from openedx_webhooks.lib.exceptions import NotFoundError
 from openedx_webhooks.lib.jira.utils import (
-    convert_to_jira_datetime_string, make_fields_lookup
+    convert_to_jira_datetime_string, iter_search_issues, make_fields_lookup
 )
 
 
@@ -42,3 +43,40 @@ class TestMakeFieldsLookup:
     def test_no_lookup(self, jira_client):
         with pytest.raises(NotFoundError):
             make_fields_lookup(jira_client, ['foo', 'bar'])
+
+
+class TestIterSearchIssues:
+    def _search(self, total, max_page):
+        """Make a fake search_issues, returning at most `max_page` results."""
+        def search_issues(jql, startAt, maxResults, fields):
+            end = min(startAt + maxResults, startAt + max_page, total)
+            issues = ['ISSUE-{}'.format(i) for i in range(startAt, end)]
+            return ResultList(issues, startAt, maxResults, total)
+        return search_issues
+
+    def test_all_pages(self, jira_client):
+        jira_client.search_issues.side_effect = self._search(total=25, max_page=100)
+        result = list(iter_search_issues(jira_client, 'project=OSPR', page_size=10))
+        assert result == ['ISSUE-{}'.format(i) for i in range(25)]
+        starts = [c[1]['startAt'] for c in jira_client.search_issues.call_args_list]
+        assert starts == [0, 10, 20]
+
+    def test_short_pages(self, jira_client):
+        # JIRA can return fewer results than we ask for.
+        jira_client.search_issues.side_effect = self._search(total=250, max_page=100)
+        result = list(iter_search_issues(jira_client, 'project=OSPR'))
+        assert result == ['ISSUE-{}'.format(i) for i in range(250)]
+        starts = [c[1]['startAt'] for c in jira_client.search_issues.call_args_list]
+        assert starts == [0, 100, 200]
+
+    def test_no_results(self, jira_client):
+        jira_client.search_issues.side_effect = self._search(total=0, max_page=100)
+        assert list(iter_search_issues(jira_client, 'project=OSPR')) == []
+        assert jira_client.search_issues.call_count == 1
+
+    def test_fields(self, jira_client):
+        jira_client.search_issues.side_effect = self._search(total=1, max_page=100)
+        list(iter_search_issues(jira_client, 'project=OSPR', fields=['id_test01']))
+        list(iter_search_issues(jira_client, 'project=OSPR'))
+        fields = [c[1]['fields'] for c in jira_client.search_issues.call_args_list]
+        assert fields == [['id_test01'], '*all']
@@ -2,6 +2,8 @@
 Utilities for working with JIRA.
 """
 
+from concurrent.futures import ThreadPoolExecutor
+
 import arrow
 
 from .decorators import inject_jira
@@ -72,3 +74,43 @@ def make_fields_lookup(jira, names=()):
         field = fields.get_by_name(name)
         lookup[field.name] = field.id
     return lookup
+
+
+@inject_jira
+def iter_search_issues(jira, jql, fields=None, page_size=1000):
+    """
+    Iterate over all of the JIRA issues found by a JQL search.
+
+    Pages of results are fetched in a background thread, one page ahead, so
+    the caller can work on one page of issues while the next is loading.
+
+    Arguments:
+        jira (jira.JIRA): An authenticated JIRA API client session
+        jql (str): The JQL query
+        fields (Optional[List[str]]): The IDs of the fields to fetch, or None
+            for all of them. Fetching fewer fields makes the search faster.
+        page_size (int): How many issues to ask for in each request. JIRA
+            may return fewer.
+
+    Yields:
+        jira.resources.Issue
+    """
+    def fetch(start_at):
+        return jira.search_issues(
+            jql,
+            startAt=start_at,
+            maxResults=page_size,
+            fields=fields if fields is not None else '*all',
+        )
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        start_at = 0
+        next_page = executor.submit(fetch, start_at)
+        while next_page is not None:
+            results = next_page.result()
+            start_at += len(results)
+            if results and start_at < results.total:
+                next_page = executor.submit(fetch, start_at)
+            else:
+                next_page = None
+            yield from results
@@ -6,6 +6,11 @@ import os
 
 import redis
 from rq import Queue
+from rq.job import Job
+
+from openedx_webhooks.cache import share_cache_stats
+from openedx_webhooks.metrics import share_metrics, task_name
+from openedx_webhooks.tracing import continue_trace, flush_spans
 
 _redis_url = os.environ.get('REDIS_URL', 'redis://')
 
@@ -14,3 +19,22 @@ store = redis.from_url(_redis_url)
 
 # rq.Queue: Instance of RQ queue
 q = Queue(connection=store)
+
+
+class InstrumentedJob(Job):
+    """
+    A job that labels the HTTP requests it makes with its function name, and
+    continues the trace in its "trace" meta, if any.
+
+    RQ runs each job in a forked process that exits when the job is done, so
+    the job's cache stats and HTTP metrics are added to the shared totals,
+    and its spans are exported, before then.
+    """
+    def perform(self):
+        try:
+            with task_name(self.func_name), continue_trace(self.meta.get("trace"), self.func_name):
+                return super().perform()
+        finally:
+            share_cache_stats()
+            share_metrics()
+            flush_spans()
@@ -0,0 +1,348 @@
+"""
+Counts and timings of the HTTP requests we make to GitHub and Jira.
+
+Sessions are instrumented with `instrument_session`, which adds a response
+hook.  Each response is recorded under its service, method, route template,
+status code, and the name of the task that made it.  The route template is
+the path with its variable parts replaced, like
+``/repos/{owner}/{repo}/issues/{number}``, so that the numbers can be
+compared across repos and issues.
+
+`http_metrics` renders everything in the Prometheus text format.
+
+Most requests are made by Celery workers and RQ jobs, which don't serve
+/metrics, so with a shared store (set METRICS_REDIS_URL), each process adds
+its numbers to totals in Redis.  It does this every SHARE_SECONDS, and at the
+end of each Celery task and RQ job.  Without a shared store, the metrics are
+per-process.
+"""
+
+import collections
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import re
+import threading
+import time
+import urllib.parse
+
+import redis
+from celery.signals import task_postrun, task_prerun
+from flask import has_request_context, request
+
+from openedx_webhooks.tracing import record_http_span
+
+
+logger = logging.getLogger(__name__)
+
+
+# The upper bounds of the latency histogram buckets, in seconds.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+# The name of the task running in this thread, for labelling the requests it
+# makes.  Web requests are labelled with their endpoint instead.
+_current_task = contextvars.ContextVar("current_task", default=None)
+
+_lock = threading.Lock()
+# (service, method, route, status, task) -> count
+_request_counts = collections.Counter()
+# (service, method, route, task) -> [bucket counts..., sum of seconds]
+_latencies = {}
+# (service, header name) -> last value seen
+_rate_limits = {}
+
+# With a shared store, the dicts above hold what hasn't been added to the
+# shared totals yet.  These are the Redis hashes of the totals, with the
+# labels of each number as a JSON list for its field.
+REQUEST_COUNTS_KEY = "http-metrics:requests"
+LATENCIES_KEY = "http-metrics:latencies"
+RATE_LIMITS_KEY = "http-metrics:rate-limits"
+
+# How often each process adds its metrics to the shared totals, in seconds.
+SHARE_SECONDS = 10
+
+# The Redis client for the shared totals, or None.
+_store = None
+_shared_at = time.monotonic()
+
+
+def set_metrics_store(redis_client):
+    """
+    Set the Redis client for totalling the metrics of all the processes, or
+    None to keep them per-process.
+    """
+    global _store   # pylint: disable=global-statement
+    _store = redis_client
+
+if os.environ.get("METRICS_REDIS_URL"):
+    set_metrics_store(redis.from_url(os.environ["METRICS_REDIS_URL"]))
+
+_RATE_LIMIT_HEADERS = {
+    "X-RateLimit-Limit": "limit",
+    "X-RateLimit-Remaining": "remaining",
+    "X-RateLimit-Reset": "reset",
+}
+
+# Patterns for the variable parts of paths, tried in order.  The first that
+# matches the whole path is replaced by its template.
+_ROUTE_PATTERNS = [
+    (re.compile(r"/repos/[^/]+/[^/]+(/labels)/[^/]+"), r"/repos/{owner}/{repo}\1/{name}"),
+    (re.compile(r"/repos/[^/]+/[^/]+(/issues/\d+/labels)/[^/]+"), r"/repos/{owner}/{repo}\1/{name}"),
+    (re.compile(r"/repos/[^/]+/[^/]+(/contents)/.+"), r"/repos/{owner}/{repo}\1/{path}"),
+    (re.compile(r"/repos/[^/]+/[^/]+(/.*)?"), r"/repos/{owner}/{repo}\1"),
+    (re.compile(r"/users/[^/]+(/.*)?"), r"/users/{login}\1"),
+    (re.compile(r"/orgs/[^/]+(/.*)?"), r"/orgs/{org}\1"),
+    (re.compile(r"(/rest/api/2/issue)/[A-Z][A-Z0-9]*-\d+(/.*)?"), r"\1/{key}\2"),
+]
+
+# Numeric ids, but not API versions like /rest/api/2.
+_NUMBER = re.compile(r"(?<!/api)/\d+(?=/|$)")
+
+
+def route_template(path):
+    """
+    Replace the variable parts of an API path, to group similar requests.
+
+    >>> route_template("/repos/edx/edx-platform/pulls/1234/files")
+    '/repos/{owner}/{repo}/pulls/{number}/files'
+    """
+    for pattern, template in _ROUTE_PATTERNS:
+        match = pattern.fullmatch(path)
+        if match:
+            path = match.expand(template)
+            break
+    return _NUMBER.sub("/{number}", path)
+
+
+def service_name(host):
+    """
+    Get the name of the service at `host`, for labelling metrics.
+    """
+    if host == "github.com" or host.endswith(".github.com"):
+        return "github"
+    if host.endswith(".atlassian.net"):
+        return "jira"
+    return host
+
+
+def current_task_name():
+    """
+    Get the name of the task or view making requests, or "" if there isn't one.
+    """
+    name = _current_task.get()
+    if name is None and has_request_context():
+        name = request.endpoint
+    return name or ""
+
+
+@contextlib.contextmanager
+def task_name(name):
+    """
+    Label the requests made in this context with the task `name`.
+    """
+    token = _current_task.set(name)
+    try:
+        yield
+    finally:
+        _current_task.reset(token)
+
+
+_celery_tokens = {}
+
+@task_prerun.connect
+def _celery_task_started(task_id=None, task=None, **kwargs):
+    _celery_tokens[task_id] = _current_task.set(task.name)
+
+@task_postrun.connect
+def _celery_task_finished(task_id=None, **kwargs):
+    token = _celery_tokens.pop(task_id, None)
+    if token is not None:
+        _current_task.reset(token)
+    share_metrics()
+
+
+def record_response(response, *args, **kwargs):
+    """
+    A requests response hook that records the response in the metrics.
+    """
+    url = urllib.parse.urlsplit(response.request.url)
+    service = service_name(url.hostname or "")
+    route = route_template(url.path)
+    method = response.request.method
+    task = current_task_name()
+    seconds = response.elapsed.total_seconds()
+    with _lock:
+        _request_counts[service, method, route, str(response.status_code), task] += 1
+        buckets = _latencies.setdefault((service, method, route, task), [0] * (len(LATENCY_BUCKETS) + 1))
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                buckets[i] += 1
+        buckets[-1] += seconds
+        for header, name in _RATE_LIMIT_HEADERS.items():
+            value = response.headers.get(header)
+            if value is not None and value.isdigit():
+                _rate_limits[service, name] = int(value)
+        share_due = _store is not None and time.monotonic() - _shared_at >= SHARE_SECONDS
+    if share_due:
+        share_metrics()
+    return response
+
+
+def _field(labels):
+    return json.dumps(list(labels))
+
+
+def share_metrics():
+    """
+    Add the metrics recorded in this process to the shared totals, if there
+    is a shared store.
+    """
+    global _shared_at   # pylint: disable=global-statement
+    if _store is None:
+        return
+    with _lock:
+        counts = dict(_request_counts)
+        latencies = dict(_latencies)
+        rate_limits = dict(_rate_limits)
+        _request_counts.clear()
+        _latencies.clear()
+        _rate_limits.clear()
+        _shared_at = time.monotonic()
+    if not (counts or latencies or rate_limits):
+        return
+
+    pipe = _store.pipeline(transaction=False)
+    for labels, count in counts.items():
+        pipe.hincrby(REQUEST_COUNTS_KEY, _field(labels), count)
+    for labels, buckets in latencies.items():
+        for i, count in enumerate(buckets[:-1]):
+            if count:
+                pipe.hincrby(LATENCIES_KEY, _field(labels + (i,)), count)
+        pipe.hincrbyfloat(LATENCIES_KEY, _field(labels + ("sum",)), buckets[-1])
+    for labels, value in rate_limits.items():
+        pipe.hset(RATE_LIMITS_KEY, _field(labels), value)
+    try:
+        pipe.execute()
+    except redis.RedisError as exc:
+        logger.warning(f"Couldn't share HTTP metrics: {exc!r}")
+
+
+def _shared_totals():
+    """
+    Read the totals from the shared store.
+
+    Returns:
+        The request counts, latencies, and rate limits, in the shapes of
+        _request_counts, _latencies, and _rate_limits.
+    """
+    pipe = _store.pipeline(transaction=False)
+    for key in [REQUEST_COUNTS_KEY, LATENCIES_KEY, RATE_LIMITS_KEY]:
+        pipe.hgetall(key)
+    counts, latency_fields, rate_limits = pipe.execute()
+
+    latencies = {}
+    for field, value in latency_fields.items():
+        *labels, index = json.loads(field)
+        buckets = latencies.setdefault(tuple(labels), [0] * (len(LATENCY_BUCKETS) + 1))
+        if index == "sum":
+            buckets[-1] = float(value)
+        else:
+            buckets[index] = int(value)
+    return (
+        {tuple(json.loads(field)): int(value) for field, value in counts.items()},
+        latencies,
+        {tuple(json.loads(field)): int(value) for field, value in rate_limits.items()},
+    )
+
+
+def instrument_session(session):
+    """
+    Record the requests made with a requests.Session in the metrics, and as
+    spans of the current trace.
+
+    Instrumenting a session more than once has no further effect.
+
+    Returns:
+        The same session.
+    """
+    hooks = session.hooks.setdefault("response", [])
+    for hook in [record_response, record_http_span]:
+        if hook not in hooks:
+            hooks.append(hook)
+    return session
+
+
+def instrumented_session_class(session_class):
+    """
+    Make a subclass of `session_class` whose sessions are instrumented, for
+    Flask-Dance's `session_class` argument.
+    """
+    def __init__(self, *args, **kwargs):
+        session_class.__init__(self, *args, **kwargs)
+        instrument_session(self)
+    return type("Instrumented" + session_class.__name__, (session_class,), {"__init__": __init__})
+
+
+def reset_metrics():
+    """
+    Forget all the recorded metrics, in this process and shared.
+    """
+    with _lock:
+        _request_counts.clear()
+        _latencies.clear()
+        _rate_limits.clear()
+    if _store is not None:
+        _store.delete(REQUEST_COUNTS_KEY, LATENCIES_KEY, RATE_LIMITS_KEY)
+
+
+def _labels(**labels):
+    return ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in labels.items())
+
+
+def http_metrics():
+    """
+    Get the HTTP request metrics in the Prometheus text format.
+
+    With a shared store, these are the totals of all the processes.
+    """
+    if _store is not None:
+        share_metrics()
+        counts, latencies, rate_limits = _shared_totals()
+    else:
+        with _lock:
+            counts = dict(_request_counts)
+            latencies = {k: list(v) for k, v in _latencies.items()}
+            rate_limits = dict(_rate_limits)
+    counts = sorted(counts.items())
+    latencies = sorted(latencies.items())
+    rate_limits = sorted(rate_limits.items())
+
+    lines = [
+        "# HELP http_client_requests_total Requests made to GitHub and Jira.",
+        "# TYPE http_client_requests_total counter",
+    ]
+    for (service, method, route, status, task), count in counts:
+        labels = _labels(service=service, method=method, route=route, status=status, task=task)
+        lines.append(f"http_client_requests_total{{{labels}}} {count}")
+
+    lines += [
+        "# HELP http_client_request_seconds Time until the response headers arrived.",
+        "# TYPE http_client_request_seconds histogram",
+    ]
+    for (service, method, route, task), buckets in latencies:
+        labels = _labels(service=service, method=method, route=route, task=task)
+        for bound, count in zip(LATENCY_BUCKETS, buckets):
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f'http_client_request_seconds_bucket{{{labels},le="{le}"}} {count}')
+        lines.append(f"http_client_request_seconds_sum{{{labels}}} {buckets[-1]}")
+        lines.append(f"http_client_request_seconds_count{{{labels}}} {buckets[-2]}")
+
+    lines += [
+        "# HELP http_client_rate_limit The last rate limit headers seen from each service.",
+        "# TYPE http_client_rate_limit gauge",
+    ]
+    for (service, name), value in rate_limits:
+        lines.append(f"http_client_rate_limit{{{_labels(service=service, header=name)}}} {value}")
+    return "\n".join(lines) + "\n"
@@ -2,11 +2,13 @@ import os
 
 from flask import flash, request
 from flask_dance.consumer import oauth_authorized, oauth_error
+from flask_dance.consumer.requests import OAuth1Session, OAuth2Session
 from flask_dance.consumer.storage.sqla import SQLAlchemyStorage
 from flask_dance.contrib.github import make_github_blueprint
 from flask_dance.contrib.jira import make_jira_blueprint
 
 from openedx_webhooks import db
+from openedx_webhooks.metrics import instrumented_session_class
 from openedx_webhooks.models import OAuth
 
 ## JIRA ##
@@ -19,6 +21,7 @@ jira_bp = make_jira_blueprint(
     # these are actually necessary
     base_url="https://openedx.atlassian.net",
     storage=SQLAlchemyStorage(OAuth, db.session),
+    session_class=instrumented_session_class(OAuth1Session),
 )
 
 
@@ -46,6 +49,7 @@ def jira_error(blueprint, message, response=None):
 github_bp = make_github_blueprint(
     scope="admin:repo_hook,repo,user",
     storage=SQLAlchemyStorage(OAuth, db.session),
+    session_class=instrumented_session_class(OAuth2Session),
 )
 
 
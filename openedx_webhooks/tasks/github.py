@@ -1,4 +1,5 @@
 from typing import Optional, Tuple
+from urllib.parse import quote
 
 from urlobject import URLObject
 
@@ -6,6 +7,7 @@ from openedx_webhooks import celery
 from openedx_webhooks.info import (
     get_jira_issue_key,
     get_labels_file,
+    get_repo_labels,
     is_internal_pull_request,
 )
 from openedx_webhooks.oauth import get_github_session
@@ -15,6 +17,7 @@ from openedx_webhooks.tasks.pr_tracking import (
     desired_support_state,
     PrTrackingFixer,
 )
+from openedx_webhooks.tracing import traced
 from openedx_webhooks.types import PrDict
 from openedx_webhooks.utils import (
     log_check_response,
@@ -28,6 +31,7 @@ def pull_request_changed_task(_, pull_request):
     """A bound Celery task to call pull_request_changed."""
     return pull_request_changed(pull_request)
 
+@traced
 def pull_request_changed(pr: PrDict) -> Tuple[Optional[str], bool]:
     """
     Process a pull request.
@@ -115,33 +119,43 @@ def rescan_repository(self, repo):
     return info
 
 
+@traced
 def synchronize_labels(repo: str) -> None:
     """Ensure the labels in `repo` match the specs in repo-tools-data/labels.yaml"""
 
     url = f"/repos/{repo}/labels"
-    repo_labels = {lbl["name"]: lbl for lbl in paginated_get(url, session=get_github_session())}
+    repo_labels = get_repo_labels(repo)
     desired_labels = get_labels_file()
-    for name, label_data in desired_labels.items():
-        if label_data.get("delete", False):
-            # A label that should not exist in the repo.
-            if name in repo_labels:
-                logger.info(f"Deleting label {name} from {repo}")
-                resp = get_github_session().delete(f"{url}/{name}")
-                log_check_response(resp)
-        else:
-            # A label that should exist in the repo.
-            label_data["name"] = name
-            if name in repo_labels:
-                repo_label = repo_labels[name]
-                color_differs = repo_label["color"] != label_data["color"]
-                repo_desc = repo_label.get("description", "") or ""
-                desired_desc = label_data.get("description", "") or ""
-                desc_differs = repo_desc != desired_desc
-                if color_differs or desc_differs:
-                    logger.info(f"Updating label {name} in {repo}")
-                    resp = get_github_session().patch(f"{url}/{name}", json=label_data)
+    changed = False
+    try:
+        for name, label_data in desired_labels.items():
+            if label_data.get("delete", False):
+                # A label that should not exist in the repo.
+                if name in repo_labels:
+                    logger.info(f"Deleting label {name} from {repo}")
+                    changed = True
+                    resp = get_github_session().delete(f"{url}/{quote(name, safe='')}")
                     log_check_response(resp)
             else:
-                logger.info(f"Adding label {name} to {repo}")
-                resp = get_github_session().post(url, json=label_data)
-                log_check_response(resp)
+                # A label that should exist in the repo.
+                label_data["name"] = name
+                if name in repo_labels:
+                    repo_label = repo_labels[name]
+                    color_differs = repo_label["color"] != label_data["color"]
+                    repo_desc = repo_label.get("description", "") or ""
+                    desired_desc = label_data.get("description", "") or ""
+                    desc_differs = repo_desc != desired_desc
+                    if color_differs or desc_differs:
+                        logger.info(f"Updating label {name} in {repo}")
+                        changed = True
+                        resp = get_github_session().patch(f"{url}/{quote(name, safe='')}", json=label_data)
+                        log_check_response(resp)
+                else:
+                    logger.info(f"Adding label {name} to {repo}")
+                    changed = True
+                    resp = get_github_session().post(url, json=label_data)
+                    log_check_response(resp)
+    finally:
+        if changed:
+            # Our cached copy of the repo's labels is out of date now.
+            get_repo_labels.cache_invalidate(repo)
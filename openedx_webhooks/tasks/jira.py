@@ -0,0 +1,381 @@
+"""
+Celery tasks and helpers for processing Jira issues.
+"""
+
+from urllib.parse import quote
+
+from flask import current_app as app
+from urlobject import URLObject
+
+from openedx_webhooks import celery
+from openedx_webhooks.info import get_repo_labels
+from openedx_webhooks.lib.rq import store
+from openedx_webhooks.oauth import get_github_session, get_jira_session, jira_get
+from openedx_webhooks.tasks import logger
+from openedx_webhooks.tasks.github import synchronize_labels
+from openedx_webhooks.utils import (
+    github_pr_num,
+    github_pr_repo,
+    github_pr_url,
+    jira_paginated_get,
+    log_check_response,
+    memoize_timed,
+    parallel_map,
+    sentry_extra_context,
+)
+
+
+def jira_webhook_key(kind, event):
+    """
+    Make a key identifying a Jira webhook event, so duplicates can be dropped.
+
+    Jira often sends the same event more than once, so the key is made from the
+    data about the change rather than anything about the delivery.  An issue is
+    only created once, so its key is enough for "created" events.
+    """
+    issue_key = event["issue"]["key"]
+    if kind == "created":
+        return f"jira-webhook:{kind}:{issue_key}"
+    changelog_id = (event.get("changelog") or {}).get("id")
+    if changelog_id is None:
+        changelog_id = event.get("timestamp")
+    return f"jira-webhook:{kind}:{issue_key}:{changelog_id}"
+
+
+def first_delivery(key):
+    """
+    Return True the first time this is called with `key`, and False for
+    repeats within JIRA_WEBHOOK_DEDUPE_SECONDS.
+    """
+    seconds = app.config.get("JIRA_WEBHOOK_DEDUPE_SECONDS", 60 * 60)
+    return bool(store.set(key, 1, nx=True, ex=seconds))
+
+
+def forget_delivery(key):
+    """
+    Forget that `key` was delivered, so a redelivery will be processed.
+    """
+    store.delete(key)
+
+
+@celery.task(bind=True)
+def jira_issue_created_task(_, event, dedupe_key):
+    """
+    A bound Celery task to handle Jira's "issue created" webhook event.
+    """
+    sentry_extra_context({"event": event})
+    if not first_delivery(dedupe_key):
+        logger.info(f"Dropping duplicate Jira event {dedupe_key}")
+        return "duplicate, ignored"
+    try:
+        return issue_opened(event["issue"])
+    except BaseException:
+        # Let Jira's redelivery of the event try again.
+        forget_delivery(dedupe_key)
+        raise
+
+
+@celery.task(bind=True)
+def jira_issue_updated_task(_, event, dedupe_key):
+    """
+    A bound Celery task to handle Jira's "issue updated" webhook event.
+    """
+    sentry_extra_context({"event": event})
+    if not first_delivery(dedupe_key):
+        logger.info(f"Dropping duplicate Jira event {dedupe_key}")
+        return "duplicate, ignored"
+    try:
+        return issue_updated(event)
+    except BaseException:
+        # Let Jira's redelivery of the event try again.
+        forget_delivery(dedupe_key)
+        raise
+
+
+@celery.task(bind=True)
+def rescan_jira_issues(self, jql):
+    """
+    Re-scan the Jira issues found by `jql`, transitioning the ones that don't
+    need triage.
+
+    Issues are processed in parallel, JIRA_RESCAN_CONCURRENCY at a time. The
+    task state is updated as each one finishes, so the results so far can be
+    seen at the task status URL.
+
+    Returns a dict mapping issue keys to the action taken for each issue.
+    """
+    sentry_extra_context({"jql": jql})
+    issues = list(jira_paginated_get(
+        "/rest/api/2/search", jql=jql, obj_name="issues", session=get_jira_session(),
+    ))
+    results = {}
+
+    def update_progress():
+        if self.request.called_directly:
+            return
+        state_meta = {
+            "jql": jql,
+            "issue_count": len(issues),
+            "done_count": len(results),
+            "results": results,
+        }
+        self.update_state(state="STARTED", meta=state_meta)
+
+    update_progress()
+    prefetch_jira_user_groups(issues)
+    concurrency = app.config.get("JIRA_RESCAN_CONCURRENCY", 8)
+    for issue, action in parallel_map(issue_opened, issues, max_workers=concurrency):
+        if isinstance(action, Exception):
+            logger.error(f"Couldn't rescan {issue['key']}: {action!r}", exc_info=action)
+            action = f"Error: {action}"
+        results[issue["key"]] = action
+        update_progress()
+
+    logger.info(f"Rescanned {len(results)} Jira issues found by {jql!r}")
+    return results
+
+
+def should_transition(issue):
+    """
+    Return a boolean indicating if the given issue should be transitioned
+    automatically from "Needs Triage" to an open status.
+    """
+    issue_key = issue["key"]
+    issue_status = issue["fields"]["status"]["name"]
+    project_key = issue["fields"]["project"]["key"]
+    if issue_status != "Needs Triage":
+        logger.info(f"{issue_key} has status {issue_status}, does not need to be processed.")
+        return False
+
+    # Open source pull requests do not skip Needs Triage.
+    # However, if someone creates a subtask on an OSPR issue, that subtasks
+    # might skip Needs Triage (it just follows the rest of the logic in this
+    # function.)
+    is_subtask = issue["fields"]["issuetype"]["subtask"]
+    if project_key == "OSPR" and not is_subtask:
+        logger.info(f"{issue_key} is an open source pull request, and does not need to be processed.")
+        return False
+
+    user_groups = get_jira_user_groups(issue["fields"]["creator"]["accountId"])
+
+    exempt_groups = {
+        # group name: set of projects that they can create non-triage issues
+        "edx-employees": {"ALL"},
+        "opencraft": {"SOL"},
+    }
+    for user_group in user_groups:
+        if user_group not in exempt_groups:
+            continue
+        exempt_projects = exempt_groups[user_group]
+        if "ALL" in exempt_projects:
+            return True
+        if project_key in exempt_projects:
+            return True
+
+    return False
+
+
+@memoize_timed(minutes=60, maxsize=1000)
+def get_jira_user_groups(account_id):
+    """
+    Get the names of the Jira groups a user belongs to, as a frozenset.
+    """
+    user_url = URLObject("/rest/api/2/user").set_query_params(accountId=account_id, expand="groups")
+    user_resp = jira_get(user_url)
+    user_resp.raise_for_status()
+    user = user_resp.json()
+    return frozenset(g["name"] for g in user["groups"]["items"])
+
+
+def prefetch_jira_user_groups(issues):
+    """
+    Get the groups of the distinct creators of `issues`, so that
+    `should_transition` will find them cached.
+
+    Only issues that `should_transition` will check groups for are considered:
+    issues in "Needs Triage" that aren't OSPR pull requests.
+    """
+    account_ids = {
+        issue["fields"]["creator"]["accountId"]
+        for issue in issues
+        if issue["fields"]["status"]["name"] == "Needs Triage"
+        if issue["fields"]["project"]["key"] != "OSPR" or issue["fields"]["issuetype"]["subtask"]
+    }
+    for account_id in sorted(account_ids):
+        get_jira_user_groups(account_id)
+
+
+def issue_opened(issue):
+    sentry_extra_context({"issue": issue})
+
+    issue_key = issue["key"]
+    issue_url = URLObject(issue["self"])
+
+    action = "ignored"
+    do_it = should_transition(issue)
+    if do_it:
+        # In JIRA, a "transition" is how an issue changes from one status
+        # to another, like going from "Open" to "In Progress". The workflow
+        # defines what transitions are allowed, and this API will tell us
+        # what transitions are currently allowed by the workflow.
+        # Ref: https://docs.atlassian.com/jira/REST/ondemand/#d2e4954
+        transitions_url = issue_url.with_path(issue_url.path + "/transitions")
+        transitions_resp = jira_get(transitions_url)
+        if transitions_resp.status_code == 404:
+            # Issue was deleted.
+            do_it = False
+            action = "Issue is gone, ignored"
+        else:
+            transitions_resp.raise_for_status()
+
+    if do_it:
+        # This transforms the API response into a simple mapping from the
+        # name of the transition (like "In Progress") to the ID of the transition.
+        # Note that a transition may not have the same name as the state that it
+        # goes to, so a transition to go from "Open" to "In Progress" may be
+        # named something like "Start Work".
+        transitions = {t["name"]: t["id"] for t in transitions_resp.json()["transitions"]}
+
+        # We attempt to transition the issue into the "Open" state for the given project
+        # (some projects use a different name), so look for a transition with the right name
+        new_status = None
+        for state_name in ["Open", "Design Backlog", "To Do"]:
+            if state_name in transitions:
+                new_status = state_name
+                action = "Transitioned to '{}'".format(state_name)
+
+        if not new_status:
+            # If it's an OSPR subtask (used by teams to manage reviews), transition to team backlog
+            if issue["fields"]["project"]["key"] == "OSPR" and issue["fields"]["issuetype"]["subtask"]:
+                new_status = "To Backlog"
+                action = "Transitioned to 'To Backlog'"
+            else:
+                raise ValueError("No valid transition! Possibilities are {}".format(transitions.keys()))
+
+        # This creates a new API request to tell JIRA to move the issue from
+        # one status to another using the specified transition. We have to
+        # tell JIRA the transition ID, so we use that mapping we set up earlier.
+        body = {
+            "transition": {
+                "id": transitions[new_status],
+            }
+        }
+        transition_resp = get_jira_session().post(transitions_url, json=body)
+        transition_resp.raise_for_status()
+
+    logger.info(
+        "{key} created by {name} ({account}), {action}".format(
+            key=issue_key,
+            name=issue["fields"]["creator"]["displayName"],
+            account=issue["fields"]["creator"]["accountId"],
+            action=action,
+        )
+    )
+    return action
+
+
+def issue_updated(event):
+    """
+    Update the GitHub pull request for a Jira issue that has changed status.
+
+    `event` is an "issue updated" webhook event that has already been checked
+    by the view for being a status change of an interesting issue.
+    """
+    issue = event["issue"]
+    pr_repo = github_pr_repo(issue)
+    if not pr_repo:
+        issue_key = issue["key"]
+        fail_msg = '{key} is missing "Repo" field'.format(key=issue_key)
+        fail_msg += ' {0}'.format(issue["fields"]["issuetype"])
+        raise Exception(fail_msg)
+
+    synchronize_labels(pr_repo)
+
+    # map of label name lowercased to label name in the case that it is on Github
+    repo_labels_lower = {name.lower(): name for name in get_repo_labels(pr_repo)}
+
+    status_changelog_items = [item for item in event["changelog"]["items"] if item["field"] == "status"]
+    new_status = status_changelog_items[0]["toString"]
+
+    changes = []
+    if new_status == "Rejected":
+        change = jira_issue_rejected(issue)
+        changes.append(change)
+
+    logger.info(f"Comparing labels: {new_status=}, {repo_labels_lower=}")
+    if new_status.lower() in repo_labels_lower:
+        change = jira_issue_status_changed(issue, event["changelog"])
+        changes.append(change)
+
+    if changes:
+        return "\n".join(changes)
+    else:
+        return "no change necessary"
+
+
+def jira_issue_rejected(issue):
+    issue_key = issue["key"]
+
+    pr_num = github_pr_num(issue)
+    pr_url = github_pr_url(issue)
+    issue_url = pr_url.replace("pulls", "issues")
+
+    github = get_github_session()
+    gh_issue_resp = github.get(issue_url)
+    gh_issue_resp.raise_for_status()
+    gh_issue = gh_issue_resp.json()
+    sentry_extra_context({"github_issue": gh_issue})
+    if gh_issue["state"] == "closed":
+        # nothing to do
+        msg = f"{issue_key} was rejected, but PR #{pr_num} was already closed"
+        logger.info(msg)
+        return msg
+
+    # Comment on the PR to explain to look at JIRA
+    username = gh_issue["user"]["login"]
+    comment = {"body": (
+        "Hello @{username}: We are unable to continue with "
+        "review of your submission at this time. Please see the "
+        "associated JIRA ticket for more explanation.".format(username=username)
+    )}
+    comment_resp = github.post(issue_url + "/comments", json=comment)
+    comment_resp.raise_for_status()
+
+    # close the pull request on Github
+    close_resp = github.patch(pr_url, json={"state": "closed"})
+    close_resp.raise_for_status()
+
+    return "Closed PR #{num}".format(num=pr_num)
+
+
+def jira_issue_status_changed(issue, changelog):
+    pr_num = github_pr_num(issue)
+    pr_repo = github_pr_repo(issue)
+    issue_url = github_pr_url(issue).replace("pulls", "issues")
+
+    status_changelog = [item for item in changelog["items"] if item["field"] == "status"][0]
+    old_status = status_changelog["fromString"]
+    new_status = status_changelog["toString"]
+
+    # map of label name lowercased to label name in the case that it is on Github
+    repo_labels_lower = {name.lower(): name for name in get_repo_labels(pr_repo)}
+    logger.info(f"repo_labels_lower: {repo_labels_lower!r}")
+
+    github = get_github_session()
+
+    # remove old status label, if the PR has it
+    old_status_label = repo_labels_lower.get(old_status.lower(), old_status)
+    logger.info(f"old status label: {old_status_label!r}")
+    remove_label_resp = github.delete(f"{issue_url}/labels/{quote(old_status_label, safe='')}")
+    # 404 means the label wasn't on the PR, which is fine.
+    log_check_response(remove_label_resp, raise_for_status=(remove_label_resp.status_code != 404))
+
+    # add new status label
+    new_status_label = repo_labels_lower[new_status.lower()]
+    logger.info(f"new status label: {new_status_label!r}")
+    add_label_resp = github.post(f"{issue_url}/labels", json={"labels": [new_status_label]})
+    log_check_response(add_label_resp)
+
+    pr_labels = [label["name"] for label in add_label_resp.json()]
+    logger.info(f"new labels: {pr_labels!r}")
+    return "Changed labels of PR #{num} to {labels}".format(num=pr_num, labels=pr_labels)
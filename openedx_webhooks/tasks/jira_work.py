@@ -2,12 +2,14 @@ import requests
 
 from openedx_webhooks.oauth import get_jira_session
 from openedx_webhooks.tasks import logger
+from openedx_webhooks.tracing import traced
 from openedx_webhooks.utils import (
     get_jira_custom_fields,
     log_check_response,
     sentry_extra_context,
 )
 
+@traced
 def delete_jira_issue(issue_key):
     """
     Delete an issue from Jira.
@@ -16,6 +18,7 @@ def delete_jira_issue(issue_key):
     log_check_response(resp)
 
 
+@traced
 def transition_jira_issue(issue_key, status_name):
     """
     Transition a Jira issue to a new status.
@@ -81,12 +84,13 @@ def transition_jira_issue(issue_key, status_name):
     return True
 
 
+@traced
 def update_jira_issue(issue_key, summary=None, description=None, labels=None, epic_link=None, extra_fields=None):
     """
     Update some fields on a Jira issue.
     """
     fields = {}
-    custom_fields = get_jira_custom_fields(get_jira_session())
+    custom_fields = get_jira_custom_fields()
     if summary is not None:
         fields["summary"] = summary
     if description is not None:
@@ -3,10 +3,12 @@ State-based updating of the information surrounding pull requests.
 """
 
 import copy
+import re
 
 from dataclasses import dataclass, field
 from typing import Any, Dict, List, Optional, Set, Tuple, cast
 
+import requests
 from glom import glom
 
 from openedx_webhooks.bot_comments import (
@@ -24,6 +26,7 @@ from openedx_webhooks.bot_comments import (
 from openedx_webhooks.info import (
     get_blended_project_id,
     get_bot_comments,
+    get_github_user,
     get_jira_issue_key,
     get_people_file,
     is_bot_pull_request,
@@ -45,13 +48,14 @@ from openedx_webhooks.tasks.jira_work import (
     transition_jira_issue,
     update_jira_issue,
 )
-from openedx_webhooks.types import JiraDict, PrDict
+from openedx_webhooks.tracing import traced
+from openedx_webhooks.types import JiraDict, PrCommentDict, PrDict
 from openedx_webhooks.utils import (
     get_jira_custom_fields,
     get_jira_issue,
     jira_paginated_get,
     log_check_response,
-    retry_get,
+    memoize_timed,
     sentry_extra_context,
     text_summary,
 )
@@ -74,7 +78,8 @@ class PrCurrentInfo:
     """
     bot_comments: Set[BotComment] = field(default_factory=set)
 
-    # The text of the first bot comment.
+    # The id and text of the first bot comment.
+    bot_comment0_id: Optional[int] = None
     bot_comment0_text: Optional[str] = None
 
     # The last-seen state stored in the first bot comment.
@@ -128,17 +133,20 @@ class PrDesiredInfo:
     github_labels: Set[str] = field(default_factory=set)
 
 
-def existing_bot_comments(pr: PrDict) -> Tuple[Optional[str], Set[BotComment]]:
+def existing_bot_comments(bot_comments: List[PrCommentDict]) -> Tuple[Optional[str], Set[BotComment]]:
     """
     Get the set of bot comments already on the pull request.
 
+    Arguments:
+        bot_comments: the comments the bot has made on the pull request.
+
     Returns a tuple:
         comment0: the text of the first (most important) bot comment.
         comment_ids: set of bot comment ids.
     """
     comment0 = None
     comment_ids = set()
-    for i, comment in enumerate(get_bot_comments(pr)):
+    for i, comment in enumerate(bot_comments):
         body = comment["body"]
         if i == 0:
             comment0 = body
@@ -148,15 +156,20 @@ def existing_bot_comments(pr: PrDict) -> Tuple[Optional[str], Set[BotComment]]:
     return comment0, comment_ids
 
 
+@traced
 def current_support_state(pr: PrDict) -> PrCurrentInfo:
     """
     Examine the world to determine what the current support state is.
     """
     current = PrCurrentInfo()
-    current.bot_comment0_text, current.bot_comments = existing_bot_comments(pr)
+    # Fetch the bot comments once, for everything we learn from them.
+    bot_comments = list(get_bot_comments(pr))
+    if bot_comments:
+        current.bot_comment0_id = bot_comments[0]["id"]
+    current.bot_comment0_text, current.bot_comments = existing_bot_comments(bot_comments)
     if current.bot_comment0_text is not None:
         current.last_seen_state = extract_data_from_comment(current.bot_comment0_text)
-    current.jira_id = current.jira_mentioned_id = get_jira_issue_key(pr)
+    current.jira_id = current.jira_mentioned_id = get_jira_issue_key(pr, bot_comments)
     if current.jira_id:
         issue = get_jira_issue(current.jira_id, missing_ok=True)
         if issue is None:
@@ -169,7 +182,7 @@ def current_support_state(pr: PrDict) -> PrCurrentInfo:
             current.jira_status = issue["fields"]["status"]["name"]
             current.jira_labels = set(issue["fields"]["labels"])
 
-            custom_fields = get_jira_custom_fields(get_jira_session())
+            custom_fields = get_jira_custom_fields()
             current.jira_extra_fields = [
                 (name, value)
                 for name in JIRA_EXTRA_FIELDS
@@ -184,6 +197,7 @@ def current_support_state(pr: PrDict) -> PrCurrentInfo:
     return current
 
 
+@traced
 def desired_support_state(pr: PrDict) -> Optional[PrDesiredInfo]:
     """
     Examine a pull request to decide what state we want the world to be in.
@@ -226,7 +240,7 @@ def desired_support_state(pr: PrDict) -> Optional[PrDesiredInfo]:
         blended_epic = find_blended_epic(blended_id)
         if blended_epic is not None:
             desired.jira_epic = blended_epic
-            custom_fields = get_jira_custom_fields(get_jira_session())
+            custom_fields = get_jira_custom_fields()
             desired.jira_extra_fields.extend([
                 ("Platform Map Area (Levels 1 & 2)",
                     blended_epic["fields"].get(custom_fields["Platform Map Area (Levels 1 & 2)"])),
@@ -288,6 +302,7 @@ class PrTrackingFixer:
     def result(self) -> Tuple[Optional[str], bool]:
         return self.current.jira_id, self.happened
 
+    @traced
     def fix(self) -> None:
         """
         The main routine for making needed changes.
@@ -363,6 +378,7 @@ class PrTrackingFixer:
         # Check the bot comments.
         self._fix_bot_comments(comment_kwargs)
 
+    @traced
     def _fix_jira_information(self) -> None:
         """
         Update the information on the Jira issue.
@@ -396,6 +412,7 @@ class PrTrackingFixer:
             self.current.jira_extra_fields = self.desired.jira_extra_fields
             self.happened = True
 
+    @traced
     def _fix_github_labels(self) -> None:
         """
         Reconcile the desired bot labels with the actual labels on GitHub.
@@ -411,6 +428,7 @@ class PrTrackingFixer:
             update_labels_on_pull_request(self.pr, list(desired_labels))
             self.happened = True
 
+    @traced
     def _fix_bot_comments(self, comment_kwargs: Dict) -> None:
         """
         Reconcile the desired comments from the bot with what the bot has said.
@@ -464,7 +482,7 @@ class PrTrackingFixer:
             # If there are current-state comments, then we need to edit the
             # comment, otherwise create one.
             if has_bot_comments:
-                edit_comment_on_pull_request(self.pr, comment_body)
+                edit_comment_on_pull_request(self.pr, self.current.bot_comment0_id, comment_body)
             else:
                 add_comment_to_pull_request(self.pr, comment_body)
             self.happened = True
@@ -484,27 +502,69 @@ def find_blended_epic(project_id: int) -> Optional[JiraDict]:
     """
     Find the blended epic for a blended project.
     """
-    jql = (
-        '"Blended Project ID" ~ "BD-00{id}" or ' +
-        '"Blended Project ID" ~ "BD-0{id}" or ' +
-        '"Blended Project ID" ~ "BD-{id}"'
-    ).format(id=project_id)
-    issues = list(jira_paginated_get("/rest/api/2/search", jql=jql, obj_name="issues", session=get_jira_session()))
+    epics = _blended_epics_by_id().get(project_id)
+    if epics is None:
+        epics = _blended_epics_after_miss(project_id)
     issue = None
-    if not issues:
+    if not epics:
         logger.info(f"Couldn't find a blended epic for {project_id}")
-    elif len(issues) > 1:
-        logger.info(f"Found {len(issues)} blended epics for {project_id}")
+    elif len(epics) > 1:
+        logger.info(f"Found {len(epics)} blended epics for {project_id}")
     else:
-        issue = issues[0]
+        issue = epics[0]
     return issue
 
 
+# The fields of blended epics that we use.
+BLENDED_EPIC_FIELDS = [
+    "Blended Project ID",
+    "Blended Project Status Page",
+    "Platform Map Area (Levels 1 & 2)",
+]
+
+
+@memoize_timed(minutes=30)
+def _blended_epics_by_id() -> Dict[int, List[JiraDict]]:
+    """
+    Make an index of the blended epics, keyed by their blended project id.
+
+    One search for every issue with a "Blended Project ID" is much cheaper than
+    a text search for each blended pull request.  Only the BLENDED_EPIC_FIELDS
+    of the epics are fetched.
+    """
+    custom_fields = get_jira_custom_fields()
+    jql = '"Blended Project ID" is not EMPTY'
+    fields = ",".join(custom_fields[name] for name in BLENDED_EPIC_FIELDS)
+    issues = jira_paginated_get(
+        "/rest/api/2/search", jql=jql, fields=fields, obj_name="issues", session=get_jira_session(),
+    )
+    epics: Dict[int, List[JiraDict]] = {}
+    for issue in issues:
+        bd_id = issue["fields"].get(custom_fields["Blended Project ID"]) or ""
+        m = re.search(r"\bBD\s*-\s*(\d+)\b", bd_id)
+        if m:
+            epics.setdefault(int(m[1]), []).append(issue)
+    return epics
+
+
+@memoize_timed(minutes=5)
+def _blended_epics_after_miss(project_id: int) -> List[JiraDict]:
+    """
+    Refresh the blended epic index to look for a project it didn't have.
+
+    The result is memoized, so a project id with no epic will only cause a
+    refresh every few minutes.
+    """
+    _blended_epics_by_id.cache_invalidate()
+    return _blended_epics_by_id().get(project_id, [])
+
+
 def get_name_and_institution_for_pr(pr: PrDict) -> Tuple[str, Optional[str]]:
     """
     Get the author name and institution for a pull request.
 
     The returned name will always be a string. The institution might be None.
+    If GitHub can't tell us the author's name, their login is used instead.
 
     Returns:
         name, institution
@@ -516,11 +576,12 @@ def get_name_and_institution_for_pr(pr: PrDict) -> Tuple[str, Optional[str]]:
     if user in people:
         user_name = people[user].get("name", "")
     if not user_name:
-        resp = retry_get(get_github_session(), pr["user"]["url"])
-        if resp.ok:
-            user_name = resp.json().get("name", user)
-        else:
-            user_name = user
+        try:
+            github_user = get_github_user(user) or {}
+        except requests.RequestException as exc:
+            logger.warning(f"Couldn't get @{user} from GitHub, using their login as their name: {exc!r}")
+            github_user = {}
+        user_name = github_user.get("name") or user
 
     institution = people.get(user, {}).get("institution", None)
 
@@ -538,6 +599,7 @@ def get_champions_for_pr(pr: PrDict) -> List[str]:
     return glom(user_data, "committer.champions", default=[])
 
 
+@traced
 def create_ospr_issue(pr, project, summary, description, labels, extra_fields=None):
     """
     Create a new OSPR or OSPR-like issue for a pull request.
@@ -549,7 +611,7 @@ def create_ospr_issue(pr, project, summary, description, labels, extra_fields=No
 
     user_name, institution = get_name_and_institution_for_pr(pr)
 
-    custom_fields = get_jira_custom_fields(get_jira_session())
+    custom_fields = get_jira_custom_fields()
     new_issue = {
         "fields": {
             "project": {
@@ -587,6 +649,7 @@ def create_ospr_issue(pr, project, summary, description, labels, extra_fields=No
     return new_issue
 
 
+@traced
 def add_comment_to_pull_request(pr: PrDict, comment_body: str) -> None:
     """
     Add a comment to a pull request.
@@ -599,20 +662,20 @@ def add_comment_to_pull_request(pr: PrDict, comment_body: str) -> None:
     log_check_response(resp)
 
 
-def edit_comment_on_pull_request(pr: PrDict, comment_body: str) -> None:
+@traced
+def edit_comment_on_pull_request(pr: PrDict, comment_id: int, comment_body: str) -> None:
     """
-    Edit the bot-authored comment on this pull request.
+    Edit a bot-authored comment on this pull request.
     """
     repo = pr["base"]["repo"]["full_name"]
     num = pr["number"]
-    bot_comments = list(get_bot_comments(pr))
-    comment_id = bot_comments[0]["id"]
     url = f"/repos/{repo}/issues/comments/{comment_id}"
     logger.info(f"Updating comment on PR {repo} #{num}: {text_summary(comment_body, 90)!r}")
     resp = get_github_session().patch(url, json={"body": comment_body})
     log_check_response(resp)
 
 
+@traced
 def update_labels_on_pull_request(pr, labels):
     """
     Change the labels on a pull request.
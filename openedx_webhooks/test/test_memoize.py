@@ -1,7 +1,16 @@
 """Tests of the memoize decorators."""
 
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import redis
 from freezegun import freeze_time
 
+from openedx_webhooks.cache import (
+    RedisCacheBackend, cache_metrics, cache_stats, set_shared_backend, share_cache_stats,
+)
 from openedx_webhooks.utils import memoize, memoize_timed, clear_memoized_values
 
 
@@ -72,3 +81,320 @@ def test_clear_memoized_values():
     assert add_to_vals(15) == 30
     assert add_to_vals_timed(20) == 40
     assert vals == [10, 15, 20, 15, 20]
+
+def test_memoize_timed_invalidate():
+    vals = []
+    @memoize_timed(minutes=10)
+    def add_to_vals_timed(x):
+        vals.append(x)
+        return x * 2
+
+    assert add_to_vals_timed(10) == 20
+    assert add_to_vals_timed(15) == 30
+    assert vals == [10, 15]
+
+    add_to_vals_timed.cache_invalidate(10)
+    add_to_vals_timed.cache_invalidate(99)
+
+    assert add_to_vals_timed(10) == 20
+    assert add_to_vals_timed(15) == 30
+    assert vals == [10, 15, 10]
+
+
+@pytest.fixture
+def shared_cache(fake_redis):
+    # Forget the stats of other tests' functions, which might have the same names.
+    clear_memoized_values()
+    set_shared_backend(RedisCacheBackend(fake_redis))
+    try:
+        yield fake_redis
+    finally:
+        set_shared_backend(None)
+
+
+def make_process_function(vals, single_flight=False):
+    """
+    Make a memoized function, as each process would have its own copy.
+    """
+    @memoize_timed(minutes=10, single_flight=single_flight)
+    def shared_add(x):
+        vals.append(x)
+        return x * 2
+    return shared_add
+
+
+def test_shared_between_processes(shared_cache):
+    vals = []
+    in_process1 = make_process_function(vals)
+    in_process2 = make_process_function(vals)
+
+    with freeze_time("2020-05-14 09:00:00"):
+        assert in_process1(10) == 20
+        assert vals == [10]
+
+    with freeze_time("2020-05-14 09:05:00"):
+        assert in_process2(10) == 20
+        assert vals == [10]
+
+    # The shared value expires when it would have in the first process.
+    with freeze_time("2020-05-14 09:11:00"):
+        assert in_process2(10) == 20
+        assert vals == [10, 10]
+
+
+def test_shared_invalidate(shared_cache):
+    vals = []
+    in_process1 = make_process_function(vals)
+    in_process2 = make_process_function(vals)
+
+    assert in_process1(10) == 20
+    in_process2.cache_invalidate(10)
+    assert in_process2(10) == 20
+    assert vals == [10, 10]
+
+
+def test_unshareable_arguments(shared_cache):
+    class Thing:
+        def __mul__(self, other):
+            return "many things"
+
+    vals = []
+    in_process1 = make_process_function(vals)
+    in_process2 = make_process_function(vals)
+
+    thing = Thing()
+    assert in_process1(thing) == "many things"
+    assert in_process2(thing) == "many things"
+    assert vals == [thing, thing]
+    assert shared_cache.keys() == []
+
+
+def test_redis_errors_are_misses(mocker):
+    broken = mocker.Mock(spec=redis.Redis)
+    broken.get.side_effect = redis.ConnectionError("Nope")
+    broken.set.side_effect = redis.ConnectionError("Nope")
+    set_shared_backend(RedisCacheBackend(broken))
+    try:
+        vals = []
+        add = make_process_function(vals)
+        assert add(10) == 20
+        assert add(10) == 20
+        assert vals == [10]
+    finally:
+        set_shared_backend(None)
+
+
+def test_clear_only_this_process(shared_cache):
+    vals = []
+    in_process1 = make_process_function(vals)
+    in_process2 = make_process_function(vals)
+
+    assert in_process1(10) == 20
+    in_process1.cache_clear()
+    assert in_process1(10) == 20
+    assert vals == [10]
+    assert in_process1.stats.shared_hits == 1
+
+    in_process1.cache_clear(shared=True)
+    assert in_process2(10) == 20
+    assert vals == [10, 10]
+
+
+def test_single_flight_uses_stale_value():
+    vals = []
+    computing = threading.Event()
+    finish = threading.Event()
+
+    @memoize_timed(minutes=10, single_flight=True)
+    def slow_count():
+        vals.append(1)
+        if len(vals) > 1:
+            computing.set()
+            finish.wait(5)
+        return len(vals)
+
+    with freeze_time("2020-05-14 09:00:00"):
+        assert slow_count() == 1
+
+    with freeze_time("2020-05-14 09:11:00"):
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            recomputed = executor.submit(slow_count)
+            assert computing.wait(5)
+            # While the value is being recomputed, others get the old value.
+            assert slow_count() == 1
+            finish.set()
+            assert recomputed.result() == 2
+        assert slow_count() == 2
+    assert len(vals) == 2
+
+
+def test_single_flight_waits_for_first_value():
+    vals = []
+    started = threading.Barrier(4)
+
+    @memoize_timed(minutes=10, single_flight=True)
+    def slow_count():
+        vals.append(1)
+        time.sleep(0.1)
+        return len(vals)
+
+    def call():
+        started.wait(5)
+        return slow_count()
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = [executor.submit(call) for _ in range(4)]
+    assert [r.result() for r in results] == [1, 1, 1, 1]
+    assert vals == [1]
+
+
+def test_single_flight_between_processes(shared_cache):
+    vals = []
+    in_process1 = make_process_function(vals, single_flight=True)
+    in_process2 = make_process_function(vals, single_flight=True)
+    backend = RedisCacheBackend(shared_cache)
+
+    with freeze_time("2020-05-14 09:00:00"):
+        assert in_process1(10) == 20
+
+    with freeze_time("2020-05-14 09:11:00"):
+        # Another process is recomputing the value, so the expired value is used.
+        lock_key = in_process2._shared_key((10,), {}) + ":lock"
+        token = backend.acquire_lock(lock_key, 60)
+        assert in_process2(10) == 20
+        assert vals == [10]
+
+        backend.release_lock(lock_key, token)
+        assert in_process2(10) == 20
+        assert vals == [10, 10]
+
+
+def test_single_flight_gives_up_waiting(shared_cache, mocker):
+    mocker.patch("openedx_webhooks.cache.SINGLE_FLIGHT_LOCK_SECONDS", 0.3)
+    mocker.patch("openedx_webhooks.cache.SINGLE_FLIGHT_POLL_SECONDS", 0.1)
+    vals = []
+    in_process = make_process_function(vals, single_flight=True)
+    lock_key = in_process._shared_key((10,), {}) + ":lock"
+    RedisCacheBackend(shared_cache).acquire_lock(lock_key, 60)
+
+    # No value to use, and the other process never finishes.
+    assert in_process(10) == 20
+    assert vals == [10]
+
+
+def test_single_flight_locks_each_key(shared_cache):
+    computing = threading.Event()
+    finish = threading.Event()
+
+    @memoize_timed(minutes=10, single_flight=True)
+    def slow_double(x):
+        if x == 1:
+            computing.set()
+            finish.wait(5)
+        return x * 2
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        slow = executor.submit(slow_double, 1)
+        assert computing.wait(5)
+        # Other keys don't wait for the slow one.
+        for x in range(2, 40):
+            assert slow_double(x) == x * 2
+        assert not slow.done()
+        finish.set()
+        assert slow.result() == 2
+    assert slow_double._key_locks == {}
+
+
+def test_not_single_flight_by_default(shared_cache):
+    vals = []
+    add = make_process_function(vals)
+    assert add(10) == 20
+    assert not add.single_flight
+    # No lock was taken in the shared backend.
+    assert not [k for k in shared_cache.keys() if k.endswith(b":lock")]
+    assert shared_cache.ttl(add._shared_key((10,), {})) == 601
+
+
+def test_stats():
+    @memoize_timed(minutes=10, maxsize=2)
+    def double(x):
+        return x * 2
+
+    with freeze_time("2020-05-14 09:00:00"):
+        double(1)
+        double(1)
+        double(2)
+        double(3)       # Evicts 1.
+        double(1)
+    assert double.stats.hits == 1
+    assert double.stats.misses == 4
+    assert double.stats.evictions == 2
+    assert double.stats.hit_rate() == 0.2
+
+    info, = [i for i in cache_stats() if i["name"].endswith("test_stats.<locals>.double")]
+    assert info["ttl"] == 600
+    assert info["maxsize"] == 2
+    assert info["size"] == 2
+    assert info["hits"] == 1
+    assert info["misses"] == 4
+    assert info["hit_rate"] == 0.2
+
+    metrics = cache_metrics()
+    assert f'memoize_calls_total{{function="{info["name"]}",result="hit"}} 1\n' in metrics
+    assert f'memoize_calls_total{{function="{info["name"]}",result="miss"}} 4\n' in metrics
+    assert f'memoize_evictions_total{{function="{info["name"]}"}} 2\n' in metrics
+    assert f'memoize_size{{function="{info["name"]}"}} 2\n' in metrics
+
+    # Clearing the values keeps the stats.
+    double.cache_clear()
+    assert double.stats.misses == 4
+    double.reset_stats()
+    assert double.stats.misses == 0
+    assert double.stats.hit_rate() is None
+
+
+def test_shared_hit_stats(shared_cache):
+    vals = []
+    double_here = make_process_function(vals)
+    double_there = make_process_function(vals)
+
+    double_here(10)
+    double_there(10)
+    assert vals == [10]
+    assert double_here.stats.misses == 1
+    assert double_there.stats.misses == 0
+    assert double_there.stats.shared_hits == 1
+
+
+def test_stats_totalled_between_processes(shared_cache):
+    vals = []
+    double_here = make_process_function(vals)
+    double_there = make_process_function(vals)
+
+    double_here(10)
+    double_here(10)
+    double_there(10)
+    double_there(20)
+    # A job in a forked process adds its stats when it finishes.
+    share_cache_stats()
+
+    info = double_here.stats_info()
+    assert (info["hits"], info["shared_hits"], info["misses"]) == (1, 1, 2)
+    assert info["hit_rate"] == 0.5
+    assert info["load_seconds"] > 0
+    assert double_there.stats_info()["misses"] == 2
+
+    # Clearing the values doesn't lose the history.
+    double_here.cache_clear(shared=True)
+    double_here(10)
+    share_cache_stats()
+    assert double_there.stats_info()["misses"] == 3
+
+
+def test_stats_shared_every_so_often(shared_cache, mocker):
+    mocker.patch("openedx_webhooks.cache.STATS_SHARE_SECONDS", 0)
+    vals = []
+    double_here = make_process_function(vals)
+    double_there = make_process_function(vals)
+    double_here(10)
+    assert double_there.total_stats().misses == 1
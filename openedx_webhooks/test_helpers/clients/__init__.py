@@ -1,2 +1,3 @@
 from .github import *
 from .jira import *
+from .redis import *
@@ -0,0 +1,12 @@
+import fakeredis
+import pytest
+
+
+@pytest.fixture
+def fake_redis(mocker):
+    """Use an in-memory Redis instead of the real one."""
+    the_fake_redis = fakeredis.FakeStrictRedis()
+    mocker.patch("openedx_webhooks.lib.rq.store", the_fake_redis)
+    mocker.patch("openedx_webhooks.jira.tasks.store", the_fake_redis)
+    mocker.patch("openedx_webhooks.tasks.jira.store", the_fake_redis)
+    return the_fake_redis
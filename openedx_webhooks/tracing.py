@@ -0,0 +1,330 @@
+"""
+Tracing of webhook events, from when we receive them to the last change we
+make because of them.
+
+A trace is started by `start_trace`, in the view that receives the event.
+`trace_context` captures the trace to send along with a Celery task or RQ
+job, and `continue_trace` picks it up in the worker, recording how long the
+work sat in the queue.  Inside a trace, `span` and `traced` record the time
+spent in blocks of code and functions, and outgoing HTTP requests are
+recorded by the session hook `record_http_span`.
+
+Spans are written in the Zipkin v2 JSON format to the destination in the
+TRACE_EXPORT environment variable: either a URL to POST them to (like a
+local collector's http://localhost:9411/api/v2/spans), or a file to append
+them to, one JSON list per line.  If TRACE_EXPORT isn't set, nothing is
+recorded.  Spans for a URL are sent from a background thread, so a slow
+collector doesn't slow down the work being traced; `flush_spans` waits for
+them to be sent.
+"""
+
+import atexit
+import contextlib
+import contextvars
+import dataclasses
+import functools
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+import urllib.parse
+from typing import Dict, List, Optional
+
+import requests
+
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "openedx-webhooks"
+
+
+@dataclasses.dataclass
+class _Trace:
+    """The span running in this context, and the spans waiting to be exported."""
+    trace_id: str
+    span_id: Optional[str]
+    finished: List[Dict]
+
+
+_current = contextvars.ContextVar("current_trace", default=None)
+
+# A callable taking a list of finished spans, or None to record nothing.
+_exporter = None
+
+
+def set_exporter(exporter):
+    """
+    Set the callable that finished spans are passed to, or None to stop tracing.
+    """
+    global _exporter    # pylint: disable=global-statement
+    _exporter = exporter
+
+
+class FileExporter:
+    """
+    Append spans to a file, as one JSON list per line.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def __call__(self, spans):
+        with self.lock:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(spans) + "\n")
+
+
+class HttpExporter:
+    """
+    POST spans to a Zipkin-compatible collector, from a background thread.
+
+    Up to `max_queued` lists of spans wait to be sent.  If the collector
+    can't keep up, more are dropped, and counted in `dropped`.
+    """
+    def __init__(self, url, timeout=2, max_queued=1000):
+        self.url = url
+        self.timeout = timeout
+        self.max_queued = max_queued
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self.queue = None
+        self.pid = None
+
+    def __call__(self, spans):
+        try:
+            self._queue().put_nowait(spans)
+        except queue.Full:
+            with self.lock:
+                self.dropped += len(spans)
+
+    def _queue(self):
+        """
+        Get the queue of spans to send, starting the sending thread if needed.
+
+        Threads don't survive a fork, so each process starts its own.
+        """
+        with self.lock:
+            if self.pid != os.getpid():
+                self.pid = os.getpid()
+                self.queue = queue.Queue(maxsize=self.max_queued)
+                threading.Thread(target=self._send_forever, args=(self.queue,), daemon=True).start()
+            return self.queue
+
+    def _send_forever(self, spans_queue):
+        while True:
+            batches = [spans_queue.get()]
+            # Send everything that's waiting in one request.
+            with contextlib.suppress(queue.Empty):
+                while True:
+                    batches.append(spans_queue.get_nowait())
+            spans = [span for batch in batches for span in batch]
+            try:
+                requests.post(self.url, json=spans, timeout=self.timeout).raise_for_status()
+            except requests.RequestException:
+                logger.exception(f"Couldn't export {len(spans)} spans to {self.url}")
+            finally:
+                for _ in batches:
+                    spans_queue.task_done()
+            with self.lock:
+                dropped, self.dropped = self.dropped, 0
+            if dropped:
+                logger.warning(f"Dropped {dropped} spans, because {self.url} couldn't keep up")
+
+    def flush(self, timeout=5):
+        """
+        Wait up to `timeout` seconds for the queued spans to be sent.
+        """
+        spans_queue = self.queue
+        if spans_queue is None or self.pid != os.getpid():
+            return
+        deadline = time.monotonic() + timeout
+        with spans_queue.all_tasks_done:
+            while spans_queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning(f"Gave up waiting to export spans to {self.url}")
+                    return
+                spans_queue.all_tasks_done.wait(remaining)
+
+
+def exporter_for(destination):
+    """
+    Make the exporter for a TRACE_EXPORT value.
+    """
+    if urllib.parse.urlsplit(destination).scheme in ("http", "https"):
+        return HttpExporter(destination)
+    return FileExporter(destination)
+
+if os.environ.get("TRACE_EXPORT"):
+    set_exporter(exporter_for(os.environ["TRACE_EXPORT"]))
+
+
+def flush_spans():
+    """
+    Wait a little for the exporter to send the spans it's holding, if it
+    holds any.  Use this before a process exits.
+    """
+    flush = getattr(_exporter, "flush", None)
+    if flush is not None:
+        flush()
+
+atexit.register(flush_spans)
+
+
+def _new_id(nbytes=8):
+    return secrets.token_hex(nbytes)
+
+
+def _microseconds(seconds):
+    return int(seconds * 1_000_000)
+
+
+def _add_span(trace, name, start, duration, span_id=None, parent_id=None, kind=None, tags=None):
+    span = {
+        "traceId": trace.trace_id,
+        "id": span_id or _new_id(),
+        "name": name,
+        "timestamp": _microseconds(start),
+        "duration": max(_microseconds(duration), 1),
+        "localEndpoint": {"serviceName": SERVICE_NAME},
+    }
+    parent_id = parent_id or trace.span_id
+    if parent_id:
+        span["parentId"] = parent_id
+    if kind:
+        span["kind"] = kind
+    if tags:
+        span["tags"] = {k: str(v) for k, v in tags.items()}
+    trace.finished.append(span)
+
+
+def _export(spans):
+    if spans and _exporter is not None:
+        try:
+            _exporter(spans)
+        except Exception:   # pylint: disable=broad-except
+            logger.exception("Couldn't export spans")
+
+
+@contextlib.contextmanager
+def span(name, **tags):
+    """
+    Record the time spent in this block as a span of the current trace.
+
+    Outside of a trace, this does nothing.
+    """
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    span_id = _new_id()
+    token = _current.set(dataclasses.replace(trace, span_id=span_id))
+    start = time.time()
+    start_counter = time.perf_counter()
+    try:
+        yield
+    except Exception as exc:
+        tags["error"] = repr(exc)
+        raise
+    finally:
+        _current.reset(token)
+        _add_span(trace, name, start, time.perf_counter() - start_counter, span_id=span_id, tags=tags)
+
+
+def traced(func):
+    """
+    Decorate a function so that each call is a span of the current trace.
+    """
+    @functools.wraps(func)
+    def _decorated(*args, **kwargs):
+        with span(func.__qualname__):
+            return func(*args, **kwargs)
+    return _decorated
+
+
+@contextlib.contextmanager
+def _local_root(trace_id, parent_id, name, tags, queued_at=None):
+    """
+    Run a block as the first span of a trace in this process, and export
+    the spans recorded under it when it ends.
+    """
+    trace = _Trace(trace_id=trace_id, span_id=parent_id, finished=[])
+    if queued_at is not None:
+        _add_span(trace, "queue wait", queued_at, time.time() - queued_at, tags=tags)
+    token = _current.set(trace)
+    try:
+        with span(name, **tags):
+            yield trace_id
+    finally:
+        _current.reset(token)
+        _export(trace.finished)
+
+
+@contextlib.contextmanager
+def start_trace(name, **tags):
+    """
+    Start a new trace, with this block as its root span.
+
+    Yields the trace id, or None if tracing is off.
+    """
+    if _exporter is None:
+        yield None
+        return
+    with _local_root(_new_id(16), None, name, tags) as trace_id:
+        yield trace_id
+
+
+def trace_context():
+    """
+    Capture the current trace, to pass along with queued work.
+
+    Returns:
+        A JSON-friendly dict for `continue_trace`, or None if there's no trace.
+    """
+    trace = _current.get()
+    if trace is None:
+        return None
+    return {"trace_id": trace.trace_id, "parent_id": trace.span_id, "queued_at": time.time()}
+
+
+@contextlib.contextmanager
+def continue_trace(context, name, **tags):
+    """
+    Continue a trace captured by `trace_context`, with this block as a span.
+
+    The time between capturing the trace and starting this block is
+    recorded as a "queue wait" span.  If `context` is None, this does
+    nothing.
+    """
+    if context is None or _exporter is None:
+        yield
+        return
+    with _local_root(context["trace_id"], context["parent_id"], name, tags, queued_at=context["queued_at"]):
+        yield
+
+
+def record_http_span(response, *args, **kwargs):
+    """
+    A requests response hook that records the request as a span.
+    """
+    trace = _current.get()
+    if trace is not None:
+        request = response.request
+        duration = response.elapsed.total_seconds()
+        url = urllib.parse.urlsplit(request.url)
+        _add_span(
+            trace,
+            f"{request.method} {url.hostname}",
+            time.time() - duration,
+            duration,
+            kind="CLIENT",
+            tags={
+                "http.method": request.method,
+                "http.path": url.path,
+                "http.status_code": response.status_code,
+            },
+        )
+    return response
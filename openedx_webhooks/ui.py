@@ -1,8 +1,10 @@
 import logging
 
-from flask import Blueprint, render_template
+from flask import Blueprint, Response, jsonify, render_template
 from flask_dance.contrib.github import github as github_session
 from flask_dance.contrib.jira import jira as jira_session
+from openedx_webhooks.cache import cache_metrics, cache_stats
+from openedx_webhooks.metrics import http_metrics
 from openedx_webhooks.utils import requires_auth
 
 
@@ -41,3 +43,37 @@ def index():
     return render_template("main.html",
         github_username=github_username, jira_username=jira_username,
     )
+
+
+@ui.route("/cache")
+@requires_auth
+def cache():
+    """
+    Show the hit/miss stats of the memoized functions, as JSON.
+
+    With a shared cache backend, the stats are the totals of all the
+    processes.  Otherwise they are for the process that handles this request.
+    """
+    return jsonify(functions=cache_stats())
+
+
+@ui.route("/cache/metrics")
+@requires_auth
+def cache_metrics_view():
+    """
+    Show the memoized function stats in the Prometheus text format.
+    """
+    return Response(cache_metrics(), mimetype="text/plain; version=0.0.4")
+
+
+@ui.route("/metrics")
+@requires_auth
+def metrics():
+    """
+    Show the outgoing HTTP request metrics and the memoized function stats,
+    in the Prometheus text format.
+
+    With METRICS_REDIS_URL set, the HTTP metrics are the totals of all the
+    processes.  Otherwise they are for the process that handles this request.
+    """
+    return Response(http_metrics() + cache_metrics(), mimetype="text/plain; version=0.0.4")
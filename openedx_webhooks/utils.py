@@ -2,24 +2,26 @@
 Generic utilities.
 """
 
-import functools
+import concurrent.futures
+import contextvars
 import hmac
 import os
 import sys
-import time
 from functools import wraps
 from hashlib import sha1
 from time import sleep as retry_sleep   # so that we can patch it for tests.
 from typing import Optional
 
-import cachetools.func
 import requests
-from flask import request, Response
-from flask_dance.contrib.jira import jira
+from flask import current_app, has_request_context, request, Response
 from urlobject import URLObject
 
 from openedx_webhooks import logger
-from openedx_webhooks.oauth import jira_get
+from openedx_webhooks.cache import (     # pylint: disable=unused-import
+    clear_memoized_values, memoize, memoize_timed,
+)
+from openedx_webhooks.metrics import instrument_session
+from openedx_webhooks.oauth import get_jira_session, jira_get
 from openedx_webhooks.types import JiraDict
 
 
@@ -148,7 +150,7 @@ def paginated_get(url, session=None, limit=None, per_page=100, callback=None, **
     """
     url = URLObject(url).set_query_param('per_page', str(per_page))
     limit = limit or 999999999
-    session = session or requests.Session()
+    session = session or instrument_session(requests.Session())
     returned = 0
     while url:
         resp = retry_get(session, url, **kwargs)
@@ -177,7 +179,7 @@ def jira_paginated_get(url, session=None,
     Like ``paginated_get``, but uses JIRA's conventions for a paginated API, which
     are different from Github's conventions.
     """
-    session = session or requests.Session()
+    session = session or instrument_session(requests.Session())
     url = URLObject(url)
     more_results = True
     while more_results:
@@ -218,35 +220,6 @@ def jira_paginated_get(url, session=None,
             more_results = True  # just keep going until there are no more results.
 
 
-# A list of all the memoized functions, so that `clear_memoized_values` can
-# clear them all.
-_memoized_functions = []
-
-def memoize(func):
-    """Cache the value returned by a function call forever."""
-    func = functools.lru_cache()(func)
-    _memoized_functions.append(func)
-    return func
-
-def memoize_timed(minutes):
-    """Cache the value of a function for `minutes` minutes."""
-    def _timed(func):
-        # We use time.time as the timer so that freezegun can test it, and in a
-        # new function so that freezegun's patching will work.  Freezegun doesn't
-        # patch time.monotonic, and we aren't that picky about the time anyway.
-        def patchable_timer():
-            return time.time()
-        func = cachetools.func.ttl_cache(ttl=60 * minutes, timer=patchable_timer)(func)
-        _memoized_functions.append(func)
-        return func
-    return _timed
-
-def clear_memoized_values():
-    """Clear all the values saved by @memoize and @memoize_timed, to ensure isolated tests."""
-    for func in _memoized_functions:
-        func.cache_clear()
-
-
 def minimal_wsgi_environ():
     values = {
         "HTTP_HOST", "SERVER_NAME", "SERVER_PORT", "REQUEST_METHOD",
@@ -256,6 +229,42 @@ def minimal_wsgi_environ():
             if key in values}
 
 
+def parallel_map(func, items, max_workers):
+    """
+    Call `func` on each of `items` in a pool of `max_workers` threads.
+
+    Each thread runs in the current Flask app context (and request context, if
+    there is one), so `func` can use the OAuth sessions.  Each call also gets a
+    copy of the caller's context variables, so spans it makes are part of the
+    caller's trace.
+
+    Yields (item, result) pairs as the calls finish, not in the order of
+    `items`.  If a call raised an exception, the exception is the result.
+    """
+    app = current_app._get_current_object()     # pylint: disable=protected-access
+    wsgi_environ = minimal_wsgi_environ() if has_request_context() else None
+
+    def _in_context(item):
+        with app.app_context():
+            if wsgi_environ:
+                with app.request_context(wsgi_environ):
+                    return func(item)
+            else:
+                return func(item)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(contextvars.copy_context().run, _in_context, item): item
+            for item in items
+        }
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as exc:        # pylint: disable=broad-except
+                result = exc
+            yield futures[future], result
+
+
 def sentry_extra_context(data_dict):
     """Apply the keys and values from data_dict to the Sentry extra context."""
     from sentry_sdk import configure_scope
@@ -264,13 +273,15 @@ def sentry_extra_context(data_dict):
             scope.set_extra(key, value)
 
 
-@memoize_timed(minutes=30)
-def get_jira_custom_fields(session=None):
+@memoize_timed(minutes=30, single_flight=True)
+def get_jira_custom_fields():
     """
     Return a name-to-id mapping for the custom fields on JIRA.
+
+    This takes no arguments, so that every caller shares the same cached
+    value, in this process and through the shared cache.
     """
-    session = session or jira
-    field_resp = session.get("/rest/api/2/field")
+    field_resp = get_jira_session().get("/rest/api/2/field")
     field_resp.raise_for_status()
     field_map = dict(pop_dict_id(f) for f in field_resp.json())
     return {
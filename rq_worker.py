@@ -9,7 +9,8 @@ import os
 
 from rq import Connection, Queue, Worker
 
-from openedx_webhooks.lib.rq import store
+from openedx_webhooks.jira.tasks import flush_all_latest_github_activity
+from openedx_webhooks.lib.rq import InstrumentedJob, store
 
 LISTEN = ('default',)
 
@@ -17,5 +18,8 @@ LISTEN = ('default',)
 if __name__ == '__main__':
     logging_level = os.environ.get('RQ_WORKER_LOGGING_LEVEL', 'INFO').upper()
     with Connection(store):
-        worker = Worker(map(Queue, LISTEN))
-        worker.work(logging_level=logging_level)
+        worker = Worker(map(Queue, LISTEN), job_class=InstrumentedJob)
+        # The scheduler runs jobs queued with enqueue_in, like the flushes of
+        # buffered GitHub activity.
+        worker.work(logging_level=logging_level, with_scheduler=True)
+    flush_all_latest_github_activity()
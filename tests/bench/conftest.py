@@ -0,0 +1,142 @@
+"""
+A benchmark harness for pull_request_changed, run against FakeGitHub and FakeJira.
+
+Each benchmark measures the wall time, CPU time, and number of GitHub and
+Jira requests of a scenario, and compares them to baseline.json.  Making more
+requests than the baseline fails the benchmark, because request counts are
+exact and are what our rate limits are spent on.  Times depend on the
+machine, so they are only reported, with a note when they are much slower
+than the baseline.
+
+    py.test tests/bench --bench-rounds=20       # measure and compare
+    py.test tests/bench --bench-update          # accept the new numbers
+    py.test tests/bench --fake-latency=0.05     # with 50ms median latency
+
+The baseline times are without --fake-latency.  Scenarios at production
+scale can build their world with the scale_world fixture.
+
+"""
+
+import json
+import os
+import statistics
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict
+
+import pytest
+
+from openedx_webhooks.utils import clear_memoized_values
+
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# How much slower than the baseline a time can be before we mention it.
+TIME_TOLERANCE = 1.5
+
+
+@dataclass
+class BenchResult:
+    github_requests: int
+    jira_requests: int
+    wall_ms: float
+    cpu_ms: float
+
+
+_results: Dict[str, BenchResult] = {}
+
+
+def _load_baseline():
+    try:
+        with open(BASELINE_FILE) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+@pytest.fixture
+def bench(request, reqctx, fake_github, fake_jira):
+    """
+    Measure a scenario.
+
+    `bench(setup, func)` calls `setup()` to make a fresh scenario, then
+    measures `func(scenario)`, as many times as --bench-rounds says.  The
+    memoized values are cleared before each measurement, as they would be in
+    a new RQ worker process.
+    """
+    rounds = request.config.getoption("bench_rounds")
+    name = request.node.name
+
+    def _bench(setup, func):
+        walls, cpus, counts = [], [], set()
+        for _ in range(rounds):
+            clear_memoized_values()
+            with reqctx:
+                scenario = setup()
+            clear_memoized_values()
+            github_before = len(fake_github.requests_made())
+            jira_before = len(fake_jira.requests_made())
+            wall_start = time.perf_counter()
+            cpu_start = time.process_time()
+            with reqctx:
+                func(scenario)
+            cpus.append(time.process_time() - cpu_start)
+            walls.append(time.perf_counter() - wall_start)
+            counts.add((
+                len(fake_github.requests_made()) - github_before,
+                len(fake_jira.requests_made()) - jira_before,
+            ))
+        assert len(counts) == 1, f"Request counts changed between rounds: {counts}"
+        (github_requests, jira_requests), = counts
+        result = _results[name] = BenchResult(
+            github_requests=github_requests,
+            jira_requests=jira_requests,
+            wall_ms=round(statistics.median(walls) * 1000, 2),
+            cpu_ms=round(statistics.median(cpus) * 1000, 2),
+        )
+
+        if request.config.getoption("bench_update"):
+            return result
+        baseline = _load_baseline().get(name)
+        assert baseline is not None, f"No baseline for {name}, run with --bench-update"
+        for service in ["github", "jira"]:
+            made = getattr(result, f"{service}_requests")
+            expected = baseline[f"{service}_requests"]
+            assert made <= expected, f"{name} made {made} {service} requests, baseline is {expected}"
+        return result
+
+    return _bench
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if not _results:
+        return
+    baseline = _load_baseline()
+    terminalreporter.section("benchmarks")
+    terminalreporter.write_line(
+        f"{'scenario':<40} {'github':>8} {'jira':>6} {'wall ms':>9} {'cpu ms':>9}  vs. baseline"
+    )
+    for name, result in sorted(_results.items()):
+        notes = []
+        base = baseline.get(name)
+        if base:
+            for service in ["github", "jira"]:
+                delta = getattr(result, f"{service}_requests") - base[f"{service}_requests"]
+                if delta:
+                    notes.append(f"{service} {delta:+d}")
+            for timing in ["wall_ms", "cpu_ms"]:
+                if getattr(result, timing) > base[timing] * TIME_TOLERANCE:
+                    notes.append(f"{timing} {getattr(result, timing) / base[timing]:.1f}x slower")
+        else:
+            notes.append("new")
+        terminalreporter.write_line(
+            f"{name:<40} {result.github_requests:>8} {result.jira_requests:>6} "
+            f"{result.wall_ms:>9.2f} {result.cpu_ms:>9.2f}  {', '.join(notes) or 'ok'}"
+        )
+
+    if config.getoption("bench_update"):
+        baseline.update({name: asdict(result) for name, result in _results.items()})
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(baseline, f, indent=4, sort_keys=True)
+            f.write("\n")
+        terminalreporter.write_line(f"Wrote {BASELINE_FILE}")
@@ -0,0 +1,77 @@
+"""Benchmarks of task/github.py:pull_request_changed and rescan_repository."""
+
+import pytest
+
+from openedx_webhooks.tasks.github import pull_request_changed, rescan_repository
+
+
+pytestmark = pytest.mark.benchmark
+
+
+def test_new_community_pr(bench, fake_github):
+    # No CLA, because this person is not in people.yaml
+    fake_github.make_user(login="new_contributor", name="Newb Contributor")
+    def setup():
+        pr = fake_github.make_pull_request(owner="edx", repo="edx-platform", user="new_contributor")
+        return pr.as_json()
+    bench(setup, pull_request_changed)
+
+
+def test_community_pr_with_cla(bench, fake_github):
+    def setup():
+        return fake_github.make_pull_request(owner="edx", repo="some-code", user="tusbar").as_json()
+    bench(setup, pull_request_changed)
+
+
+def test_core_committer_pr(bench, fake_github):
+    def setup():
+        return fake_github.make_pull_request(owner="edx", repo="edx-platform", user="felipemontoya").as_json()
+    bench(setup, pull_request_changed)
+
+
+def test_blended_pr(bench, fake_github, fake_jira):
+    fake_jira.make_issue(project="BLENDED", blended_project_id="BD-34")
+    def setup():
+        pr = fake_github.make_pull_request(
+            owner="edx", repo="some-code", user="tusbar", title="[BD-34] Something good",
+        )
+        return pr.as_json()
+    bench(setup, pull_request_changed)
+
+
+def test_contractor_pr(bench, fake_github):
+    def setup():
+        return fake_github.make_pull_request(owner="edx", repo="edx-platform", user="joecontractor").as_json()
+    bench(setup, pull_request_changed)
+
+
+def test_already_tracked_pr(bench, fake_github):
+    # The common case: a PR we've seen before gets another event.
+    def setup():
+        prj = fake_github.make_pull_request(owner="edx", repo="edx-platform", user="tusbar").as_json()
+        pull_request_changed(prj)
+        return prj
+    bench(setup, pull_request_changed)
+
+
+@pytest.mark.parametrize("num_prs, num_comments", [(5, 3), (25, 10)])
+def test_rescan_repo(bench, fake_github, num_prs, num_comments):
+    fake_github.make_user(login="new_contributor", name="Newb Contributor")
+    def setup():
+        repo = fake_github.make_repo("edx", "edx-platform")
+        for _ in range(num_prs):
+            pr = repo.make_pull_request(user="new_contributor")
+            for n in range(num_comments):
+                pr.add_comment(user="nedbat", body=f"Review comment {n}")
+        return "edx/edx-platform"
+    bench(setup, rescan_repository)
+
+
+def test_rescan_repo_at_scale(bench, scale_world):
+    # The busiest repo of a generated world, with its tracked PRs, their
+    # comments, and a large people.yaml.
+    def setup():
+        world = scale_world(seed=1, repos=50, pull_requests=500, people=1000, orgs=50)
+        busiest = max(world.repos, key=lambda repo: len(repo.pull_requests))
+        return f"{busiest.owner}/{busiest.repo}"
+    bench(setup, rescan_repository)
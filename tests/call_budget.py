@@ -0,0 +1,80 @@
+"""
+Budgets for the API calls a scenario makes to the fakes.
+
+A budget is the most calls allowed for each method and route, with routes
+written as `openedx_webhooks.metrics.route_template` makes them:
+
+    with api_budget(
+        github={
+            "GET /repos/{owner}/{repo}/issues/{number}/comments": 1,
+            "PATCH /repos/{owner}/{repo}/issues/{number}": 1,
+        },
+        jira={"GET /rest/api/2/issue/{key}": 1},
+    ):
+        pull_request_changed(pr.as_json())
+
+Calls to routes that aren't in the budget are over it.  When a scenario
+goes over, the failure shows each route's budget and calls, and every
+call that was made, in order.  The api_budget fixture checks FakeGitHub
+and FakeJira.
+"""
+
+import collections
+import contextlib
+from typing import Counter, Dict, List, Optional, Tuple
+
+from openedx_webhooks.metrics import route_template
+
+from .faker import Faker
+
+
+def call_counts(calls: List[Tuple[str, str]]) -> Counter[str]:
+    """
+    Count (path, method) calls by method and route, like "GET /user".
+    """
+    return collections.Counter(f"{method} {route_template(path)}" for path, method in calls)
+
+
+def budget_report(service: str, budget: Dict[str, int], calls: List[Tuple[str, str]]) -> Optional[str]:
+    """
+    Describe how `calls` went over `budget`.
+
+    Returns:
+        A report for a test failure, or None if the calls are within budget.
+    """
+    counts = call_counts(calls)
+    if all(made <= budget.get(route, 0) for route, made in counts.items()):
+        return None
+    lines = [f"{service} made more API calls than its budget:", f"  {'budget':>6} {'made':>5}"]
+    for route in sorted(set(budget) | set(counts), key=lambda r: r.partition(" ")[::-1]):
+        allowed = budget.get(route, 0)
+        made = counts.get(route, 0)
+        over = f"+{made - allowed}" if made > allowed else ""
+        lines.append(f"{over:>3}{allowed:>5} {made:>5}  {route}")
+    lines.append(f"{service} calls, in order:")
+    lines.extend(f"      {method} {path}" for path, method in calls)
+    return "\n".join(lines)
+
+
+@contextlib.contextmanager
+def api_call_budget(fakes: Dict[str, Faker], **budgets: Dict[str, int]):
+    """
+    Check the calls made to the fakes in this block against budgets.
+
+    Arguments:
+        fakes: the fakes by service name, like "github".
+        budgets: the budget for each service to check, by service name.
+
+    Raises:
+        AssertionError: if any service went over its budget.
+    """
+    starts = {service: len(fakes[service].requests_made()) for service in budgets}
+    yield
+    reports = []
+    for service, budget in budgets.items():
+        calls = fakes[service].requests_made()[starts[service]:]
+        report = budget_report(service, budget, calls)
+        if report is not None:
+            reports.append(report)
+    if reports:
+        raise AssertionError("\n\n".join(reports))
@@ -1,3 +1,4 @@
+import functools
 import os
 import os.path
 import re
@@ -11,9 +12,13 @@ from flask_dance.consumer.requests import OAuth2Session
 import openedx_webhooks
 import openedx_webhooks.utils
 import openedx_webhooks.info
+from openedx_webhooks.test_helpers.clients.redis import fake_redis  # pylint: disable=unused-import
 
+from . import faker
+from .call_budget import api_call_budget
 from .fake_github import FakeGitHub
 from .fake_jira import FakeJira
+from .scale_data import generate_world
 
 
 @pytest.yield_fixture
@@ -27,14 +32,18 @@ def requests_mocker():
         mocker.stop()
 
 
+def read_repo_data_file(filename):
+    """Read a repo-tools-data file from our local copy."""
+    repo_data_dir = os.path.join(os.path.dirname(__file__), "repo_data")
+    with open(os.path.join(repo_data_dir, filename)) as data:
+        return data.read()
+
+
 @pytest.fixture
 def fake_repo_data(requests_mocker):
     def _repo_data_callback(request, _):
         """Read repo_data data from local data."""
-        filename = request.path.split("/")[-1]
-        repo_data_dir = os.path.join(os.path.dirname(__file__), "repo_data")
-        with open(os.path.join(repo_data_dir, filename)) as data:
-            return data.read()
+        return read_repo_data_file(request.path.split("/")[-1])
 
     requests_mocker.get(
         re.compile(f"https://raw.githubusercontent.com/edx/repo-tools-data/master/"),
@@ -66,12 +75,11 @@ class FakeBlueprint:
         self.client_secret = "FooSecret"
 
 
-@pytest.fixture
-def mock_github_bp(mocker):
+def mock_github_session(mocker, base_url="https://api.github.com/"):
     github_token = os.environ.get("GITHUB_TOKEN", "faketoken")
     token = {"access_token": github_token, "token_type": "bearer"}
     github_session = OAuth2Session(
-        base_url="https://api.github.com/",
+        base_url=base_url,
         blueprint=FakeBlueprint(token),
     )
     mocker.patch("flask_dance.contrib.github.github", github_session)
@@ -80,6 +88,11 @@ def mock_github_bp(mocker):
     mocker.patch("openedx_webhooks.oauth.github_bp", mock_bp)
 
 
+@pytest.fixture
+def mock_github_bp(mocker):
+    mock_github_session(mocker)
+
+
 def pytest_addoption(parser):
     parser.addoption(
         "--percent-404",
@@ -87,11 +100,37 @@ def pytest_addoption(parser):
         help="What percent of HTTP requests should fail with a 404",
         default="0",
     )
+    parser.addoption(
+        "--fake-latency",
+        action="store",
+        type=float,
+        help="Median seconds of latency to add to FakeGitHub and FakeJira responses",
+        default=0,
+    )
+    parser.addoption(
+        "--bench-rounds",
+        action="store",
+        type=int,
+        help="How many times to run each benchmark in tests/bench",
+        default=1,
+    )
+    parser.addoption(
+        "--bench-update",
+        action="store_true",
+        help="Write the benchmark results to tests/bench/baseline.json",
+    )
+
+def add_fake_latency(pytestconfig, fake):
+    """Slow down a fake service if --fake-latency asks for it."""
+    median = pytestconfig.getoption("fake_latency")
+    if median:
+        fake.add_middleware(faker.Latency(faker.lognormal(median)).middleware)
 
 @pytest.fixture
 def fake_github(pytestconfig, mocker, requests_mocker, mock_github_bp, fake_repo_data):
     fraction_404 = float(pytestconfig.getoption("percent_404")) / 100.0
     the_fake_github = FakeGitHub(login="webhook-bot", fraction_404=fraction_404)
+    add_fake_latency(pytestconfig, the_fake_github)
     the_fake_github.install_mocks(requests_mocker)
     if fraction_404:
         # Make the retry sleep a no-op so it won't slow the tests.
@@ -99,11 +138,10 @@ def fake_github(pytestconfig, mocker, requests_mocker, mock_github_bp, fake_repo
     return the_fake_github
 
 
-@pytest.fixture
-def mock_jira_bp(mocker):
+def mock_jira_session(mocker, base_url="https://openedx.atlassian.net/"):
     token = {"access_token": "faketoken", "token_type": "bearer"}
     jira_session = OAuth2Session(
-        base_url="https://openedx.atlassian.net/",
+        base_url=base_url,
         blueprint=FakeBlueprint(token),
     )
     mocker.patch("flask_dance.contrib.jira.jira", jira_session)
@@ -113,12 +151,73 @@ def mock_jira_bp(mocker):
 
 
 @pytest.fixture
-def fake_jira(mock_jira_bp, requests_mocker):
+def mock_jira_bp(mocker):
+    mock_jira_session(mocker)
+
+
+@pytest.fixture
+def fake_jira(pytestconfig, mock_jira_bp, requests_mocker):
     the_fake_jira = FakeJira()
+    add_fake_latency(pytestconfig, the_fake_jira)
     the_fake_jira.install_mocks(requests_mocker)
     return the_fake_jira
 
 
+@pytest.fixture
+def served_fake_github(pytestconfig, mocker, monkeypatch):
+    """
+    A FakeGitHub served from a local HTTP server, with our GitHub session
+    pointed at it.  Unlike fake_github, it can be used from other processes.
+    """
+    # Our sessions are OAuth sessions, which insist on https.
+    monkeypatch.setenv("OAUTHLIB_INSECURE_TRANSPORT", "1")
+    mocker.patch("openedx_webhooks.info._read_repotools_file", read_repo_data_file)
+    the_fake_github = FakeGitHub(login="webhook-bot")
+    add_fake_latency(pytestconfig, the_fake_github)
+    with the_fake_github.serve() as server:
+        mock_github_session(mocker, base_url=server.url + "/")
+        yield the_fake_github
+
+
+@pytest.fixture
+def served_fake_jira(pytestconfig, mocker, monkeypatch):
+    """
+    A FakeJira served from a local HTTP server, with our Jira session
+    pointed at it.
+    """
+    monkeypatch.setenv("OAUTHLIB_INSECURE_TRANSPORT", "1")
+    the_fake_jira = FakeJira()
+    add_fake_latency(pytestconfig, the_fake_jira)
+    with the_fake_jira.serve() as server:
+        mock_jira_session(mocker, base_url=server.url + "/")
+        yield the_fake_jira
+
+
+@pytest.fixture
+def api_budget(fake_github, fake_jira):
+    """
+    Check the GitHub and Jira calls made in a block against budgets.
+
+    `with api_budget(github={...}, jira={...}):`, as described in call_budget.py.
+    """
+    return functools.partial(api_call_budget, {"github": fake_github, "jira": fake_jira})
+
+
+@pytest.fixture
+def scale_world(mocker, fake_github, fake_jira):
+    """
+    Fill fake_github and fake_jira with a large generated world.
+
+    `scale_world(**kwargs)` calls `scale_data.generate_world`, and uses the
+    people.yaml and orgs.yaml of the world it made.
+    """
+    def _scale_world(**kwargs):
+        world = generate_world(fake_github, fake_jira, **kwargs)
+        mocker.patch("openedx_webhooks.info._read_repotools_yaml_file", world.read_repotools_yaml_file)
+        return world
+    return _scale_world
+
+
 @pytest.fixture
 def app():
     return openedx_webhooks.create_app(config="testing")
@@ -4,15 +4,22 @@ A fake implementation of the GitHub REST API.
 
 from __future__ import annotations
 
+import collections
 import dataclasses
 import datetime
+import hashlib
 import itertools
+import json
 import random
 import re
+import threading
+import time
 from dataclasses import dataclass, field
-from typing import Dict, Iterable, List, Optional, Set
+from typing import Deque, Dict, Iterable, List, Optional, Set
 from urllib.parse import unquote
 
+from urlobject import URLObject
+
 from . import faker
 
 
@@ -256,6 +263,122 @@ class Flaky404:
         return None
 
 
+@dataclass
+class Quota:
+    limit: int
+    remaining: int
+    reset: int
+
+    def headers(self) -> Dict[str, str]:
+        return {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+            "X-RateLimit-Reset": str(self.reset),
+            "X-RateLimit-Used": str(self.limit - self.remaining),
+            "X-RateLimit-Resource": "core",
+        }
+
+    def as_json(self) -> Dict:
+        return {
+            "limit": self.limit,
+            "remaining": self.remaining,
+            "reset": self.reset,
+            "used": self.limit - self.remaining,
+        }
+
+
+class RateLimits:
+    """
+    Emulate GitHub's rate limits.
+
+    Each token gets `limit` requests per `window` seconds, and requests
+    without a token get `anonymous_limit`.  Responses carry the X-RateLimit
+    headers, and a request over the limit gets GitHub's 403.  If
+    `secondary_limit` is set, more than that many requests from a token in
+    `secondary_window` seconds get the secondary rate limit 403, with a
+    Retry-After header.
+
+    Successful GETs get an ETag.  A request with a matching If-None-Match
+    gets a 304, which doesn't count against the quota.
+    """
+    def __init__(
+        self, limit=5000, window=3600, anonymous_limit=60,
+        secondary_limit=None, secondary_window=60, retry_after=60,
+        clock=time.time,
+    ):
+        self.limit = limit
+        self.window = window
+        self.anonymous_limit = anonymous_limit
+        self.secondary_limit = secondary_limit
+        self.secondary_window = secondary_window
+        self.retry_after = retry_after
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.quotas: Dict[Optional[str], Quota] = {}
+        self.recent: Dict[Optional[str], Deque[float]] = collections.defaultdict(collections.deque)
+
+    @staticmethod
+    def token(request) -> Optional[str]:
+        auth = request.headers.get("Authorization")
+        return auth.split()[-1] if auth else None
+
+    def quota(self, token: Optional[str]) -> Quota:
+        """Get the current quota for `token`, starting a new window if needed."""
+        now = self.clock()
+        quota = self.quotas.get(token)
+        if quota is None or now >= quota.reset:
+            limit = self.anonymous_limit if token is None else self.limit
+            quota = self.quotas[token] = Quota(limit, limit, int(now + self.window))
+        return quota
+
+    def middleware(self, request, context):
+        token = self.token(request)
+        with self.lock:
+            quota = self.quota(token)
+            context.headers.update(quota.headers())
+            if request.path == "/rate_limit":
+                # Checking the rate limit is free.
+                return None
+
+            if self.secondary_limit is not None:
+                now = self.clock()
+                recent = self.recent[token]
+                while recent and recent[0] <= now - self.secondary_window:
+                    recent.popleft()
+                if len(recent) >= self.secondary_limit:
+                    context.status_code = 403
+                    context.headers["Retry-After"] = str(self.retry_after)
+                    return {
+                        "message": (
+                            "You have exceeded a secondary rate limit. " +
+                            "Please wait a few minutes before you try again."
+                        ),
+                    }
+                recent.append(now)
+
+            if quota.remaining == 0:
+                context.status_code = 403
+                return {"message": "API rate limit exceeded."}
+            quota.remaining -= 1
+            context.headers.update(quota.headers())
+        return None
+
+    def response_hook(self, request, context, result):
+        if request.method != "GET" or context.status_code != 200:
+            return result
+        etag = '"{}"'.format(hashlib.sha1(json.dumps(result, sort_keys=True).encode()).hexdigest())
+        context.headers["ETag"] = etag
+        if request.headers.get("If-None-Match") == etag:
+            context.status_code = 304
+            if request.path != "/rate_limit":
+                with self.lock:
+                    quota = self.quota(self.token(request))
+                    quota.remaining = min(quota.limit, quota.remaining + 1)
+                    context.headers.update(quota.headers())
+            return faker.EMPTY
+        return result
+
+
 class FakeGitHub(faker.Faker):
 
     def __init__(self, login: str = "some-user", fraction_404=0):
@@ -266,6 +389,16 @@ class FakeGitHub(faker.Faker):
         self.login = login
         self.users: Dict[str, User] = {}
         self.repos: Dict[str, Repo] = {}
+        self.rate_limits: Optional[RateLimits] = None
+
+    def enable_rate_limits(self, **kwargs) -> RateLimits:
+        """
+        Start emulating GitHub's rate limits.  `kwargs` are for `RateLimits`.
+        """
+        self.rate_limits = RateLimits(**kwargs)
+        self.add_middleware(self.rate_limits.middleware)
+        self.add_response_hook(self.rate_limits.response_hook)
+        return self.rate_limits
 
     def make_user(self, login: str, **kwargs) -> User:
         u = self.users[login] = User(login, **kwargs)
@@ -298,6 +431,17 @@ class FakeGitHub(faker.Faker):
         pr = rep.make_pull_request(**kwargs)
         return pr
 
+    # Rate limits
+
+    @faker.route(r"/rate_limit")
+    def _get_rate_limit(self, _match, request, _context) -> Dict:
+        # https://docs.github.com/en/rest/reference/rate-limit
+        if self.rate_limits is None:
+            raise DoesNotExist("Rate limits are not enabled")
+        with self.rate_limits.lock:
+            quota = self.rate_limits.quota(RateLimits.token(request)).as_json()
+        return {"resources": {"core": quota}, "rate": quota}
+
     # Users
 
     @faker.route(r"/user")
@@ -307,10 +451,28 @@ class FakeGitHub(faker.Faker):
     @faker.route(r"/users/(?P<login>[^/]+)")
     def _get_users(self, match, _request, _context) -> Dict:
         # https://developer.github.com/v3/users/#get-a-user
-        return self.users[match["login"]].as_json()
+        return self.get_user(match["login"]).as_json()
 
     # Pull requests
 
+    @faker.route(r"/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/pulls")
+    def _get_pulls_list(self, match, request, context) -> List[Dict]:
+        # https://developer.github.com/v3/pulls/#list-pull-requests
+        r = self.get_repo(match["owner"], match["repo"])
+        state = request.qs.get("state", ["open"])[0]
+        prs = [pr for _, pr in sorted(r.pull_requests.items()) if state in ("all", pr.state)]
+        per_page = int(request.qs.get("per_page", ["30"])[0])
+        page = int(request.qs.get("page", ["1"])[0])
+        last_page = max(1, (len(prs) + per_page - 1) // per_page)
+        links = []
+        url = URLObject(request.url)
+        if page < last_page:
+            links.append(f'<{url.set_query_param("page", str(page + 1))}>; rel="next"')
+            links.append(f'<{url.set_query_param("page", str(last_page))}>; rel="last"')
+        if links:
+            context.headers["Link"] = ", ".join(links)
+        return [pr.as_json() for pr in prs[(page - 1) * per_page:page * per_page]]
+
     @faker.route(r"/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/pulls/(?P<number>\d+)")
     def _get_pulls(self, match, _request, _context) -> Dict:
         # https://developer.github.com/v3/pulls/#get-a-pull-request
@@ -328,6 +490,25 @@ class FakeGitHub(faker.Faker):
             pr.set_labels(patch["labels"])
         return pr.as_json()
 
+    @faker.route(r"/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/issues/(?P<number>\d+)/labels", "POST")
+    def _post_issues_labels(self, match, request, _context) -> List[Dict]:
+        # https://docs.github.com/en/rest/reference/issues#add-labels-to-an-issue
+        r = self.get_repo(match["owner"], match["repo"])
+        pr = r.get_pull_request(int(match["number"]))
+        pr.set_labels(pr.labels | set(request.json()["labels"]))
+        return pr.as_json()["labels"]
+
+    @faker.route(r"/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/issues/(?P<number>\d+)/labels/(?P<name>.*)", "DELETE")
+    def _delete_issues_labels(self, match, _request, _context) -> List[Dict]:
+        # https://docs.github.com/en/rest/reference/issues#remove-a-label-from-an-issue
+        r = self.get_repo(match["owner"], match["repo"])
+        pr = r.get_pull_request(int(match["number"]))
+        name = unquote(match["name"])
+        if name not in pr.labels:
+            raise DoesNotExist(f"Label {name!r} is not on pull request {r.owner}/{r.repo} #{pr.number}")
+        pr.set_labels(pr.labels - {name})
+        return pr.as_json()["labels"]
+
     # Repo labels
 
     @faker.route(r"/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/labels")
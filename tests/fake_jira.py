@@ -1,12 +1,13 @@
 """A fake implementation of the Jira API."""
 
+import collections
 import dataclasses
 import itertools
-import re
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Set
+from typing import Any, Dict, Iterable, List, Optional, Set
 
 from . import faker
+from .fake_jql import JqlError, parse_jql
 
 
 issue_ids = itertools.count(start=101, step=13)
@@ -23,6 +24,8 @@ class Issue:
     key: str
     status: str
     issuetype: Optional[str] = None
+    subtask: bool = False
+    creator: Optional[str] = None
     contributor_name: Optional[str] = None
     customer: Optional[str] = None
     pr_number: Optional[int] = None
@@ -38,14 +41,24 @@ class Issue:
     blended_project_id: Optional[str] = None
     lines_added: Optional[int] = None
     lines_deleted: Optional[int] = None
+    # The IssueTable this issue is in, to keep its indexes up to date.
+    _table: Optional["IssueTable"] = field(default=None, init=False, repr=False, compare=False)
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        table = self.__dict__.get("_table")
+        if table is not None and name != "_table":
+            table.reindex(self)
 
     def as_json(self) -> Dict:
         return {
             "key": self.key,
+            "self": f"https://{FakeJira.HOST}/rest/api/2/issue/{self.key}",
             "fields": {
                 "project": {"key": self.key.partition("-")[0]},
                 "status": {"name": self.status},
-                "issuetype": {"name": self.issuetype},
+                "issuetype": {"name": self.issuetype, "subtask": self.subtask},
+                "creator": self.creator_json(),
                 "summary": self.summary,
                 "description": self.description,
                 "labels": sorted(self.labels),
@@ -65,6 +78,93 @@ class Issue:
         }
 
 
+    def creator_json(self) -> Optional[Dict]:
+        if self.creator is None:
+            return None
+        return {
+            "accountId": self.creator,
+            "displayName": self.creator.title(),
+            "self": f"https://{FakeJira.HOST}/rest/api/2/user?accountId={self.creator}",
+        }
+
+
+def _index_value(value: Any) -> Any:
+    """Make a field value comparable with JQL values, which are strings."""
+    if value is None:
+        return None
+    return str(value).lower()
+
+
+# The attributes we index, with "project" from the key.
+_INDEXED_ATTRS = ["project"] + [f.name for f in dataclasses.fields(Issue) if f.name != "_table"]
+
+
+class IssueTable(dict):
+    """
+    Issues by key, with indexes of their field values for JQL searches.
+
+    Issues are reindexed when they are stored in the table, or when their
+    attributes are assigned.  Changing a label set in place isn't noticed:
+    assign a new set instead.
+    """
+    def __init__(self):
+        super().__init__()
+        # Map from attribute names to values to the keys of issues with them.
+        self.postings: Dict[str, Dict[Any, Set[str]]] = collections.defaultdict(
+            lambda: collections.defaultdict(set)
+        )
+        # Map from keys to the (attribute, value) pairs indexed for them.
+        self.indexed: Dict[str, List] = {}
+
+    def __setitem__(self, key, issue):
+        if key in self:
+            self._unindex(key)
+        super().__setitem__(key, issue)
+        issue._table = self
+        self._index(key, issue)
+
+    def __delitem__(self, key):
+        self._unindex(key)
+        self[key]._table = None
+        super().__delitem__(key)
+
+    def reindex(self, issue: Issue) -> None:
+        if self.get(issue.key) is issue:
+            self._unindex(issue.key)
+            self._index(issue.key, issue)
+
+    def _index(self, key, issue):
+        entries = []
+        for attr in _INDEXED_ATTRS:
+            value = self.value(key, attr)
+            if isinstance(value, (set, frozenset, list)):
+                entries.extend((attr, _index_value(v)) for v in value)
+                if not value:
+                    entries.append((attr, None))
+            else:
+                entries.append((attr, _index_value(value)))
+        for attr, value in entries:
+            self.postings[attr][value].add(key)
+        self.indexed[key] = entries
+
+    def _unindex(self, key):
+        for attr, value in self.indexed.pop(key, ()):
+            self.postings[attr][value].discard(key)
+
+    # The interface fake_jql needs.
+
+    def lookup(self, attr: str, value: Optional[str]) -> Set[str]:
+        return self.postings[attr].get(_index_value(value), set())
+
+    def all_keys(self) -> Set[str]:
+        return set(self)
+
+    def value(self, key: str, attr: str) -> Any:
+        if attr == "project":
+            return key.partition("-")[0]
+        return getattr(self[key], attr)
+
+
 class FakeJira(faker.Faker):
     """A fake implementation of the Jira API, specialized to the OSPR project."""
 
@@ -84,6 +184,40 @@ class FakeJira(faker.Faker):
     LINES_ADDED = "custom_280"
     LINES_DELETED = "custom_281"
 
+    # The custom fields, with the Issue attributes that hold their values.
+    CUSTOM_FIELDS = [
+        (EPIC_LINK, "Epic Link", "epic_link"),
+        (CONTRIBUTOR_NAME, "Contributor Name", "contributor_name"),
+        (CUSTOMER, "Customer", "customer"),
+        (PR_NUMBER, "PR Number", "pr_number"),
+        (REPO, "Repo", "repo"),
+        (URL, "URL", "url"),
+        (PLATFORM_MAP_1_2, "Platform Map Area (Levels 1 & 2)", "platform_map_1_2"),
+        (PLATFORM_MAP_3_4, "Platform Map Area (Levels 3 & 4)", "platform_map_3_4"),
+        (BLENDED_PROJECT_STATUS_PAGE, "Blended Project Status Page", "blended_project_status_page"),
+        (BLENDED_PROJECT_ID, "Blended Project ID", "blended_project_id"),
+        (LINES_ADDED, "Github Lines Added", "lines_added"),
+        (LINES_DELETED, "Github Lines Deleted", "lines_deleted"),
+    ]
+
+    # The system fields JQL can search, with the Issue attributes for them.
+    JQL_FIELDS = {
+        "project": "project",
+        "key": "key",
+        "issuekey": "key",
+        "status": "status",
+        "issuetype": "issuetype",
+        "type": "issuetype",
+        "summary": "summary",
+        "description": "description",
+        "labels": "labels",
+        "creator": "creator",
+        "reporter": "creator",
+    }
+
+    # The most issues a search returns at once, like Jira Cloud.
+    MAX_RESULTS = 100
+
     # Issue states and transitions for OSPR.
     INITIAL_STATE = "Needs Triage"
 
@@ -104,6 +238,8 @@ class FakeJira(faker.Faker):
             "Engineering Review",
             "Architecture Review",
             "Changes Requested",
+            # Not an OSPR state, but other projects start here.
+            "Open",
         ])
     }
 
@@ -112,27 +248,39 @@ class FakeJira(faker.Faker):
     def __init__(self):
         super().__init__(host="https://openedx.atlassian.net")
         # Map from issue keys to Issue objects.
-        self.issues: Dict[str, Issue] = {}
+        self.issues: Dict[str, Issue] = IssueTable()
         # Map from old keys to new keys for moved issues.
         self.moves: Dict[str, str] = {}
+        # Map from user account ids to the names of their groups.
+        self.user_groups: Dict[str, Set[str]] = {}
 
     @faker.route(r"/rest/api/2/field")
     def _get_field(self, _match, _request, _context) -> List[Dict]:
         # Custom fields particular to the OSPR project.
-        return [{"id": i, "name": n, "custom": True} for i, n in [
-            (self.EPIC_LINK, "Epic Link"),
-            (self.CONTRIBUTOR_NAME, "Contributor Name"),
-            (self.CUSTOMER, "Customer"),
-            (self.PR_NUMBER, "PR Number"),
-            (self.REPO, "Repo"),
-            (self.URL, "URL"),
-            (self.PLATFORM_MAP_1_2, "Platform Map Area (Levels 1 & 2)"),
-            (self.PLATFORM_MAP_3_4, "Platform Map Area (Levels 3 & 4)"),
-            (self.BLENDED_PROJECT_STATUS_PAGE, "Blended Project Status Page"),
-            (self.BLENDED_PROJECT_ID, "Blended Project ID"),
-            (self.LINES_ADDED, "Github Lines Added"),
-            (self.LINES_DELETED, "Github Lines Deleted"),
-        ]]
+        return [{"id": i, "name": n, "custom": True} for i, n, _ in self.CUSTOM_FIELDS]
+
+    def make_user(self, account_id: str, groups: Iterable[str] = ()) -> None:
+        """Make a fake user in some groups."""
+        self.user_groups[account_id] = set(groups)
+
+    @faker.route(r"/rest/api/2/user")
+    def _get_user(self, _match, request, context) -> Dict:
+        """Implement the GET user endpoint, always expanding groups."""
+        account_id = request.qs["accountId"][0]
+        if account_id not in self.user_groups:
+            context.status_code = 404
+            return {"errorMessages": [f"User {account_id} does not exist"], "errors": {}}
+        groups = sorted(self.user_groups[account_id])
+        return {
+            "accountId": account_id,
+            "groups": {
+                "size": len(groups),
+                "items": [
+                    {"name": name, "self": f"https://{self.HOST}/rest/api/2/group?groupname={name}"}
+                    for name in groups
+                ],
+            },
+        }
 
     def make_issue(self, key: Optional[str] = None, project: str = "OSPR", **kwargs) -> Issue:
         """Make fake issue data."""
@@ -250,7 +398,7 @@ class FakeJira(faker.Faker):
             # The transitions don't include the transitions to the current state.
             return {
                 "transitions": [
-                    {"id": id, "to": {"name": name}}
+                    {"id": id, "name": name, "to": {"name": name}}
                     for name, id in self.TRANSITIONS.items()
                     if name != issue.status
                 ],
@@ -270,20 +418,61 @@ class FakeJira(faker.Faker):
         transition_id = request.json()["transition"]["id"]
         issue.status = self.TRANSITION_IDS[transition_id]
 
+    def _jql_attribute(self, name: str) -> str:
+        """Find the Issue attribute for a field named in JQL."""
+        lower = name.lower()
+        if lower in self.JQL_FIELDS:
+            return self.JQL_FIELDS[lower]
+        for field_id, field_name, attr in self.CUSTOM_FIELDS:
+            if lower == field_name.lower():
+                return attr
+            if lower.startswith("cf[") and field_id.rpartition("_")[2] == lower[3:-1]:
+                return attr
+        raise JqlError(f"Field '{name}' does not exist or you do not have permission to view it.")
+
+    def _sort_key(self, attr: str):
+        def _key(issue):
+            value = self.issues.value(issue.key, attr)
+            if attr == "key":
+                project, _, number = value.partition("-")
+                value = (project, int(number))
+            elif isinstance(value, (set, frozenset)):
+                value = sorted(value)
+            elif isinstance(value, str):
+                value = value.lower()
+            # Empty values sort last.
+            return (value is None, value)
+        return _key
+
     @faker.route(r"/rest/api/2/search", "GET")
-    def _get_search(self, _match, request, _context):
+    def _get_search(self, _match, request, context):
         """
-        Implement the search endpoint.
+        Implement the search endpoint, for the JQL that fake_jql understands.
         """
-        jql = request.qs["jql"][0]
-        # We only handle certain specific queries.
-        if bd_ids := re.findall(r'"Blended Project ID" ~ "(.*?)"', jql):
-            issues = [iss for iss in self.issues.values() if iss.blended_project_id in bd_ids]
-        else:
-            # We don't understand this query.
-            _context.status_code = 500
-            return None
+        jql = request.qs.get("jql", [""])[0]
+        start_at = int(request.qs.get("startAt", ["0"])[0])
+        max_results = min(int(request.qs.get("maxResults", ["50"])[0]), self.MAX_RESULTS)
+        fields = request.qs["fields"][0].split(",") if "fields" in request.qs else None
+        try:
+            query = parse_jql(jql).map_fields(self._jql_attribute)
+        except JqlError as err:
+            context.status_code = 400
+            return {"errorMessages": [str(err)], "errors": {}}
+
+        issues = [self.issues[key] for key in query.select(self.issues)]
+        # Sort by each field, the last first, so the first field counts most.
+        for attr, descending in reversed(query.order_by or [("key", False)]):
+            issues.sort(key=self._sort_key(attr), reverse=descending)
+
+        page = []
+        for issue in issues[start_at:start_at + max_results]:
+            issue_json = issue.as_json()
+            if fields is not None and not {"*all", "*navigable"} & set(fields):
+                issue_json["fields"] = {k: v for k, v in issue_json["fields"].items() if k in fields}
+            page.append(issue_json)
         return {
-            "issues": [iss.as_json() for iss in issues],
+            "startAt": start_at,
+            "maxResults": max_results,
             "total": len(issues),
+            "issues": page,
         }
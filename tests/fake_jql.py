@@ -0,0 +1,310 @@
+"""
+A parser and evaluator for the subset of JQL that we search Jira with.
+
+`parse_jql` turns a query into a `Query`, whose `where` is a tree of nodes.
+Nodes find the keys of matching issues in an index, which must have:
+
+    index.lookup(field, value) -> Set[str]: the keys of issues whose `field`
+        is `value`, or has `value` in it, compared without case.
+    index.all_keys() -> Set[str]: the keys of all the issues.
+    index.value(key, field): the value of `field` for the issue `key`.
+
+Equality, IN, and EMPTY use the index.  Text searches with ~ look at the
+issues left by the other clauses of an AND, so put them with a clause that
+narrows the search, as you would with Jira.
+
+Supported:
+
+    field = value, field != value
+    field IN (value, ...), field NOT IN (value, ...)
+    field IS EMPTY, field IS NOT EMPTY  (NULL works too)
+    field ~ "text", field !~ "text"
+    AND, OR, NOT, and parentheses
+    ORDER BY field [ASC|DESC], ...
+
+Fields are names like `status` or `"Blended Project ID"`, or custom field
+ids like `cf[10904]`.  Keywords are case-insensitive.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, List, Optional, Set, Tuple
+
+
+class JqlError(Exception):
+    """A query we can't parse or evaluate, as Jira would reject it."""
+
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<op>!=|!~|=|~|\(|\)|,)
+      | (?P<cf>cf\[\d+\])
+      | (?P<word>[^\s"'=!~(),]+)
+    )
+""", re.VERBOSE | re.IGNORECASE)
+
+_KEYWORDS = {"and", "or", "not", "in", "is", "empty", "null", "order", "by", "asc", "desc"}
+
+
+@dataclass
+class _Token:
+    kind: str   # "string", "op", "word", "keyword", or "end"
+    text: str
+
+
+def _tokenize(jql: str) -> List[_Token]:
+    tokens = []
+    pos = 0
+    jql = jql.rstrip()
+    while pos < len(jql):
+        match = _TOKEN.match(jql, pos)
+        if match is None:
+            raise JqlError(f"Error in the JQL Query: unexpected character at position {pos}")
+        pos = match.end()
+        kind = match.lastgroup
+        text = match[kind]
+        if kind == "string":
+            text = re.sub(r"\\(.)", r"\1", text[1:-1])
+        elif kind == "cf":
+            kind = "word"
+        elif kind == "word" and text.lower() in _KEYWORDS:
+            kind, text = "keyword", text.lower()
+        tokens.append(_Token(kind, text))
+    tokens.append(_Token("end", ""))
+    return tokens
+
+
+# Nodes of the WHERE tree.  `within` is the set of keys to choose from, or
+# None for all of them.
+
+@dataclass
+class Clause:
+    """A comparison of one field: `field op values`."""
+    field: str
+    op: str         # "=", "!=", "~", "!~", "is", or "is not"
+    values: List[Optional[str]]
+
+    @property
+    def indexed(self) -> bool:
+        return self.op not in ("~", "!~")
+
+    def select(self, index, within: Optional[Set[str]]) -> Set[str]:
+        if self.op in ("=", "is"):
+            return self._lookup(index, within)
+        if self.op in ("!=", "is not"):
+            matched = self._lookup(index, within)
+            if self.op == "!=":
+                # Like Jira, != doesn't find issues with no value.
+                matched |= index.lookup(self.field, None)
+            return (index.all_keys() if within is None else within) - matched
+        keys = index.all_keys() if within is None else within
+        words = self.values[0].lower().split()
+        matched = {k for k in keys if self._contains(index.value(k, self.field), words)}
+        return matched if self.op == "~" else keys - matched
+
+    def _lookup(self, index, within):
+        found = set()
+        for value in self.values:
+            found |= index.lookup(self.field, value)
+        return found if within is None else found & within
+
+    @staticmethod
+    def _contains(value, words) -> bool:
+        if value is None:
+            return False
+        if isinstance(value, (set, frozenset, list)):
+            value = " ".join(value)
+        text = str(value).lower()
+        return all(word in text for word in words)
+
+
+@dataclass
+class And:
+    children: List[Any]
+
+    def select(self, index, within: Optional[Set[str]]) -> Set[str]:
+        # Use the indexes first, so that text searches look at fewer issues.
+        for child in sorted(self.children, key=lambda c: not getattr(c, "indexed", False)):
+            within = child.select(index, within)
+            if not within:
+                break
+        return within
+
+
+@dataclass
+class Or:
+    children: List[Any]
+
+    def select(self, index, within: Optional[Set[str]]) -> Set[str]:
+        keys = set()
+        for child in self.children:
+            keys |= child.select(index, within)
+        return keys
+
+
+@dataclass
+class Not:
+    child: Any
+
+    def select(self, index, within: Optional[Set[str]]) -> Set[str]:
+        return (index.all_keys() if within is None else within) - self.child.select(index, within)
+
+
+@dataclass
+class Query:
+    """A parsed JQL query."""
+    where: Optional[Any]
+    # (field, descending) pairs.
+    order_by: List[Tuple[str, bool]] = field(default_factory=list)
+
+    def fields(self) -> Set[str]:
+        """The names of the fields the query uses."""
+        names = {name for name, _ in self.order_by}
+        nodes = [self.where] if self.where is not None else []
+        while nodes:
+            node = nodes.pop()
+            if isinstance(node, Clause):
+                names.add(node.field)
+            elif isinstance(node, Not):
+                nodes.append(node.child)
+            else:
+                nodes.extend(node.children)
+        return names
+
+    def map_fields(self, func: Callable[[str], str]) -> "Query":
+        """Rename the fields in the query, like from names to attributes."""
+        def _map(node):
+            if isinstance(node, Clause):
+                return Clause(func(node.field), node.op, node.values)
+            if isinstance(node, Not):
+                return Not(_map(node.child))
+            return type(node)([_map(child) for child in node.children])
+        return Query(
+            where=None if self.where is None else _map(self.where),
+            order_by=[(func(name), desc) for name, desc in self.order_by],
+        )
+
+    def select(self, index) -> Set[str]:
+        """Find the keys of the matching issues."""
+        if self.where is None:
+            return index.all_keys()
+        return self.where.select(index, None)
+
+
+class _Parser:
+    def __init__(self, jql: str):
+        self.tokens = _tokenize(jql)
+        self.pos = 0
+
+    @property
+    def token(self) -> _Token:
+        return self.tokens[self.pos]
+
+    def _take(self) -> _Token:
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def _accept(self, kind: str, text: str) -> bool:
+        if self.token.kind == kind and self.token.text == text:
+            self.pos += 1
+            return True
+        return False
+
+    def _expect(self, kind: str, text: str) -> None:
+        if not self._accept(kind, text):
+            self._error(f"expected {text!r}")
+
+    def _error(self, message: str):
+        found = self.token.text or "the end of the query"
+        raise JqlError(f"Error in the JQL Query: {message}, but found {found!r}")
+
+    def parse(self) -> Query:
+        where = None
+        if self.token.kind != "end" and not (self.token.kind == "keyword" and self.token.text == "order"):
+            where = self._or()
+        order_by = []
+        if self._accept("keyword", "order"):
+            self._expect("keyword", "by")
+            while True:
+                name = self._field()
+                descending = False
+                if self._accept("keyword", "desc"):
+                    descending = True
+                else:
+                    self._accept("keyword", "asc")
+                order_by.append((name, descending))
+                if not self._accept("op", ","):
+                    break
+        if self.token.kind != "end":
+            self._error("expected the end of the query")
+        return Query(where, order_by)
+
+    def _or(self):
+        children = [self._and()]
+        while self._accept("keyword", "or"):
+            children.append(self._and())
+        return children[0] if len(children) == 1 else Or(children)
+
+    def _and(self):
+        children = [self._not()]
+        while self._accept("keyword", "and"):
+            children.append(self._not())
+        return children[0] if len(children) == 1 else And(children)
+
+    def _not(self):
+        if self._accept("keyword", "not"):
+            return Not(self._not())
+        if self._accept("op", "("):
+            node = self._or()
+            self._expect("op", ")")
+            return node
+        return self._clause()
+
+    def _field(self) -> str:
+        if self.token.kind in ("word", "string"):
+            return self._take().text
+        return self._error("expected a field")
+
+    def _value(self) -> str:
+        if self.token.kind in ("word", "string"):
+            return self._take().text
+        return self._error("expected a value")
+
+    def _clause(self) -> Clause:
+        name = self._field()
+        token = self._take()
+        if token.kind == "op" and token.text in ("=", "!=", "~", "!~"):
+            if token.text in ("=", "!=") and self.token.kind == "keyword" and self.token.text in ("empty", "null"):
+                self._take()
+                return Clause(name, "is" if token.text == "=" else "is not", [None])
+            return Clause(name, token.text, [self._value()])
+        if token.kind == "keyword" and token.text == "is":
+            op = "is not" if self._accept("keyword", "not") else "is"
+            if not (self._accept("keyword", "empty") or self._accept("keyword", "null")):
+                self._error("expected EMPTY or NULL")
+            return Clause(name, op, [None])
+        if token.kind == "keyword" and token.text in ("in", "not"):
+            op = "="
+            if token.text == "not":
+                self._expect("keyword", "in")
+                op = "!="
+            self._expect("op", "(")
+            values = [self._value()]
+            while self._accept("op", ","):
+                values.append(self._value())
+            self._expect("op", ")")
+            return Clause(name, op, values)
+        self.pos -= 1
+        return self._error("expected an operator")
+
+
+def parse_jql(jql: str) -> Query:
+    """
+    Parse a JQL query.
+
+    Raises:
+        JqlError: if the query isn't in the subset we understand.
+    """
+    return _Parser(jql).parse()
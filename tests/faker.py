@@ -3,10 +3,21 @@ Base classes for defining fake implementations of APIs.
 
 """
 
+import abc
+import collections
 import functools
+import http.server
 import inspect
+import json
+import random
 import re
-from typing import Any, List, Tuple
+import threading
+import time
+import urllib.parse
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests_mock
+from requests.structures import CaseInsensitiveDict
 
 
 class FakerException(Exception):
@@ -23,6 +34,10 @@ class FakerException(Exception):
         return {"error": str(self)}
 
 
+# A middleware can return this to end the request with an empty body.
+EMPTY = object()
+
+
 def route(path_regex, http_method="GET", data_type="json"):
     """
     Decorator to associate a method with a particular HTTP route.
@@ -36,7 +51,7 @@ def route(path_regex, http_method="GET", data_type="json"):
     request object.
 
     In the route handler, `match` is the re.match object matching the request
-    path.  `request` and `context` are as defined by requests-mock.
+    path.  `request` and `context` are like requests-mock's.
 
     Arguments:
         path_regex: a regex to match against the path of the request.
@@ -46,27 +61,88 @@ def route(path_regex, http_method="GET", data_type="json"):
     """
     def _decorator(func):
         func.callback_spec = (path_regex, http_method.upper(), data_type)
-        @functools.wraps(func)
-        def _decorated(self, request, context) -> Any:
+        compiled = re.compile(path_regex)
+        def _respond(self, match, request, context) -> Any:
             for fn in self.middleware:
                 result = fn(request, context)
                 if context.status_code != 200 or result is not None:
                     return result
-            match = re.match(path_regex, request.path)
             try:
-                return func(self, match, request, context)
+                with self.state_lock:
+                    return func(self, match, request, context)
             except FakerException as ex:
                 context.status_code = ex.status_code
                 return ex.as_json()
+
+        @functools.wraps(func)
+        def _decorated(self, request, context, match=None) -> Any:
+            # The Router passes the match it already made.
+            if match is None:
+                match = compiled.match(request.path)
+            result = _respond(self, match, request, context)
+            for fn in self.response_hooks:
+                result = fn(request, context, result)
+            return None if result is EMPTY else result
         return _decorated
     return _decorator
 
 
+# A named group, to be made a plain group.
+_NAMED_GROUP = re.compile(r"\(\?P<\w+>")
+
+
+class Router:
+    """
+    Find the route for a request with one regex match, however many routes
+    there are.
+
+    The path regexes for each HTTP method are combined into one alternation,
+    with a marker group around each.  The marker group that matched tells
+    which route it was.  Group names can't repeat in one regex, so the
+    routes' named groups are plain groups in the combined regex, and the
+    chosen route's own regex is matched again to make the handler's `match`.
+    """
+    def __init__(self, routes):
+        self.routes: Dict[str, List[Tuple[re.Pattern, str, Callable]]] = collections.defaultdict(list)
+        for path_regex, http_method, data_type, callback in routes:
+            self.routes[http_method].append((re.compile(fr"{path_regex}$"), data_type, callback))
+        self.combined = {
+            http_method: re.compile("|".join(
+                f"(?P<_{i}>{_NAMED_GROUP.sub('(', regex.pattern)})"
+                for i, (regex, _, _) in enumerate(method_routes)
+            ))
+            for http_method, method_routes in self.routes.items()
+        }
+
+    def find(self, method: str, path: str) -> Optional[Tuple[re.Match, str, Callable]]:
+        """
+        Find the route for a request.
+
+        Returns:
+            The match of the route's regex, its data type and its callback,
+            or None if no route matches.
+        """
+        combined = self.combined.get(method)
+        match = combined.match(path) if combined is not None else None
+        if match is None:
+            return None
+        # The marker group closes after any groups inside it, so it's the
+        # last group.
+        regex, data_type, callback = self.routes[method][int(match.lastgroup[1:])]
+        return regex.match(path), data_type, callback
+
+
 class Faker:
     def __init__(self, host):
         self.host = host
         self.requests_mocker = None
+        self.server = None
         self.middleware = []
+        self.response_hooks = []
+        # Route handlers run with this held, so that the fake's data is safe
+        # to use from many threads.  Hold it to change the data while the
+        # fake is in use.
+        self.state_lock = threading.RLock()
 
     def add_middleware(self, middleware_func):
         """
@@ -75,20 +151,91 @@ class Faker:
         The function receives `request` and `context` just as route handlers
         do.  If the function returns non-None, or the context.status_code is
         set to something other than 200, then the request is ended, and the
-        route handler is not called.
+        route handler is not called.  Returning `EMPTY` ends the request with
+        an empty body.
         """
         self.middleware.append(middleware_func)
 
+    def add_response_hook(self, hook_func):
+        """
+        Add a function to be invoked on all responses.
+
+        The function receives `request`, `context`, and the result of the
+        route handler or middleware, and returns the result to use instead.
+        It can change the status code and headers in `context`, and return
+        `EMPTY` for an empty body.
+        """
+        self.response_hooks.append(hook_func)
+
+    def routes(self):
+        """
+        Get the routes of this fake.
+
+        Returns:
+            List[Tuple[str, str, str, Callable]]: the path regex, HTTP method,
+            data type, and callback of each route.
+        """
+        return [
+            (*func.callback_spec, getattr(self, name))
+            for name, func in inspect.getmembers(type(self), inspect.isfunction)
+            if hasattr(func, "callback_spec")
+        ]
+
+    @functools.cached_property
+    def router(self) -> Router:
+        return Router(self.routes())
+
+    def handle(self, request) -> Optional[Tuple[int, Dict[str, str], bytes]]:
+        """
+        Run the route handler for a request.
+
+        Returns:
+            The status code, headers and body of the response, or None if no
+            route matches the request.
+        """
+        found = self.router.find(request.method, request.path)
+        if found is None:
+            return None
+        match, data_type, callback = found
+        context = Context()
+        result = callback(request, context, match=match)
+        headers = {}
+        if result is None:
+            body = b""
+        elif data_type == "json":
+            body = json.dumps(result).encode()
+            headers["Content-Type"] = "application/json"
+        else:
+            body = result.encode()
+            headers["Content-Type"] = "text/plain"
+        headers.update(context.headers)
+        return context.status_code, headers, body
+
     def install_mocks(self, requests_mocker) -> None:
+        """
+        Handle the requests to our host made through `requests_mocker`.
+        """
         self.requests_mocker = requests_mocker
-        for _, method in inspect.getmembers(self, inspect.ismethod):
-            if hasattr(method, "callback_spec"):
-                path_regex, http_method, data_type = method.callback_spec
-                self.requests_mocker.register_uri(
-                    http_method,
-                    re.compile(fr"^{self.host}{path_regex}(\?.*)?$"),
-                    **{data_type: method},
-                )
+        requests_mocker.add_matcher(self._mock_matcher)
+
+    def _mock_matcher(self, request):
+        if f"{request.scheme}://{request.hostname}" != self.host:
+            return None
+        response = self.handle(request)
+        if response is None:
+            return None
+        status_code, headers, body = response
+        return requests_mock.create_response(request, status_code=status_code, headers=headers, content=body)
+
+    def serve(self, port: int = 0) -> "FakeServer":
+        """
+        Serve this fake from a local HTTP server, instead of through requests-mock.
+
+        Returns:
+            The started FakeServer.  Its `url` is where to send requests.
+        """
+        self.server = FakeServer(self, port=port).start()
+        return self.server
 
     def requests_made(self, path_regex: str = None, method: str = None) -> List[Tuple[str, str]]:
         """
@@ -97,13 +244,262 @@ class Faker:
         If no method is provided, all methods are returned.
         """
         reqs = []
-        assert self.requests_mocker is not None
-        for req in self.requests_mocker.request_history:
-            if f"{req.scheme}://{req.hostname}" != self.host:
+        if self.server is not None:
+            history = self.server.history()
+        else:
+            assert self.requests_mocker is not None
+            history = [
+                (req.path, req.method) for req in self.requests_mocker.request_history
+                if f"{req.scheme}://{req.hostname}" == self.host
+            ]
+        for req_path, req_method in history:
+            if method is not None and method != req_method:
                 continue
-            if method is not None and method != req.method:
+            if path_regex is not None and not re.search(path_regex, req_path):
                 continue
-            if path_regex is not None and not re.search(path_regex, req.path):
-                continue
-            reqs.append((req.path, req.method))
+            reqs.append((req_path, req_method))
         return reqs
+
+
+class ServedRequest:
+    """
+    A request received by a FakeServer, with the attributes of requests-mock's
+    request objects that route handlers use.
+    """
+    def __init__(self, method: str, url: str, headers: Dict[str, str], body: bytes):
+        self.method = method
+        self.url = url
+        self.headers = CaseInsensitiveDict(headers)
+        self.body = body
+        parts = urllib.parse.urlsplit(url)
+        self.scheme = parts.scheme
+        self.hostname = parts.hostname
+        self.path = parts.path
+        self.query = parts.query
+        self.qs = urllib.parse.parse_qs(parts.query, keep_blank_values=True)
+
+    @property
+    def text(self) -> str:
+        return self.body.decode()
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+class Context:
+    """
+    The response settings a route handler can change, like requests-mock's context.
+    """
+    def __init__(self):
+        self.status_code = 200
+        self.headers: Dict[str, str] = {}
+
+
+class FakeServer:
+    """
+    A local threaded HTTP server for the routes of a Faker.
+
+    This lets other processes, and HTTP clients other than requests, use a
+    fake.  Requests are handled at the same time on many threads, as a real
+    service would, so slow middleware doesn't hold up other requests.
+    """
+    def __init__(self, fake: Faker, host: str = "127.0.0.1", port: int = 0):
+        self.fake = fake
+        self.httpd = http.server.ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+        self.lock = threading.Lock()
+        self._history: List[Tuple[str, str]] = []
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeServer":
+        self.thread = threading.Thread(target=self.httpd.serve_forever, args=(0.05,), daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self.thread is not None:
+            self.thread.join()
+        if self.fake.server is self:
+            self.fake.server = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def history(self) -> List[Tuple[str, str]]:
+        """The (path, method) of each request received so far."""
+        with self.lock:
+            return list(self._history)
+
+    def handle(self, method: str, target: str, headers: Dict[str, str], body: bytes) -> Tuple[int, Dict, bytes]:
+        """
+        Run the route handler for a request.
+
+        Returns:
+            The status code, headers and body of the response.
+        """
+        request = ServedRequest(method, self.url + target, headers, body)
+        with self.lock:
+            self._history.append((request.path, method))
+        response = self.fake.handle(request)
+        if response is None:
+            return 404, {"Content-Type": "application/json"}, b'{"message": "No fake route"}'
+        return response
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            # Keep connections open, so clients can pool them.
+            protocol_version = "HTTP/1.1"
+
+            def _respond(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                status, headers, body = server.handle(self.command, self.path, dict(self.headers), body)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _respond
+
+            def log_message(self, format, *args):     # pylint: disable=redefined-builtin
+                pass
+
+        return Handler
+
+
+
+# Middleware for injecting the delays and failures of real services.  Each
+# applies to the requests matching its `method` and `path_regex`, if given.
+# Randomness comes from `rng`, so a seeded random.Random makes it repeatable.
+
+class FaultMiddleware(abc.ABC):
+    """
+    Base class for the fault injection middleware.
+    """
+    def __init__(self, method: Optional[str] = None, path_regex: Optional[str] = None, rng=None):
+        self.method = method
+        self.path_regex = path_regex
+        self.rng = rng or random.Random()
+
+    def applies(self, request) -> bool:
+        if self.method is not None and request.method != self.method:
+            return False
+        if self.path_regex is not None and not re.search(self.path_regex, request.path):
+            return False
+        return True
+
+    def middleware(self, request, context):
+        if self.applies(request):
+            return self.inject(request, context)
+        return None
+
+    @abc.abstractmethod
+    def inject(self, request, context):
+        """Inject the fault into `request`, returning what a middleware would."""
+
+
+def fixed(seconds: float) -> Callable[[random.Random], float]:
+    """A latency distribution that is always `seconds`."""
+    return lambda rng: seconds
+
+def uniform(low: float, high: float) -> Callable[[random.Random], float]:
+    """A latency distribution evenly spread between `low` and `high` seconds."""
+    return lambda rng: rng.uniform(low, high)
+
+def lognormal(median: float, sigma: float = 0.5) -> Callable[[random.Random], float]:
+    """
+    A latency distribution with a long tail, like real services have.
+
+    Half the requests take less than `median` seconds.  A larger `sigma`
+    makes the slow requests slower.
+    """
+    return lambda rng: median * rng.lognormvariate(0, sigma)
+
+
+class Latency(FaultMiddleware):
+    """
+    Delay responses by a time drawn from `distribution`.
+    """
+    def __init__(self, distribution, sleep=time.sleep, **kwargs):
+        super().__init__(**kwargs)
+        self.distribution = distribution
+        self.sleep = sleep
+
+    def inject(self, request, context):
+        self.sleep(self.distribution(self.rng))
+
+
+class ErrorBursts(FaultMiddleware):
+    """
+    Fail runs of `length` requests in a row with `status_code`, starting a
+    run on a fraction `probability` of the requests.
+    """
+    def __init__(self, probability, length=3, status_code=502, **kwargs):
+        super().__init__(**kwargs)
+        self.probability = probability
+        self.length = length
+        self.status_code = status_code
+        self.remaining = 0
+        self.lock = threading.Lock()
+
+    def inject(self, request, context):
+        with self.lock:
+            if not self.remaining and self.rng.random() < self.probability:
+                self.remaining = self.length
+            if not self.remaining:
+                return None
+            self.remaining -= 1
+        context.status_code = self.status_code
+        return {"message": "Server Error"}
+
+
+class EmptyBodies(FaultMiddleware):
+    """
+    Return a 200 with an empty body for a fraction of the requests, as Jira
+    sometimes does.
+    """
+    def __init__(self, fraction, **kwargs):
+        super().__init__(**kwargs)
+        self.fraction = fraction
+
+    def inject(self, request, context):
+        if self.rng.random() < self.fraction:
+            return EMPTY
+        return None
+
+
+class SlowPagination(FaultMiddleware):
+    """
+    Delay the pages after the first of a paginated list, more for each page
+    further in.
+
+    GitHub counts pages with a "page" parameter, Jira counts items with
+    "startAt".
+    """
+    def __init__(self, seconds_per_page, sleep=time.sleep, **kwargs):
+        super().__init__(**kwargs)
+        self.seconds_per_page = seconds_per_page
+        self.sleep = sleep
+
+    def inject(self, request, context):
+        page = int(request.qs.get("page", ["1"])[0])
+        start_at = int(request.qs.get("startAt", ["0"])[0])
+        if start_at:
+            page_size = int(request.qs.get("maxResults", ["50"])[0])
+            page = start_at // page_size + 1
+        if page > 1:
+            self.sleep(self.seconds_per_page * (page - 1))
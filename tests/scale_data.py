@@ -0,0 +1,252 @@
+"""
+Fill FakeGitHub and FakeJira with a world the size of production, for
+benchmarks of org-wide rescans and reconciliation.
+
+`generate_world` makes repos, pull requests with comments and labels, the
+OSPR and BLENDED issues that track them, and the people.yaml and orgs.yaml
+that describe their authors.  The same seed makes the same world, though
+comment ids and issue keys come from the fakes' global counters, so they
+depend on what else the test session has made.
+
+    world = generate_world(fake_github, fake_jira, seed=1, repos=1000, pull_requests=20000)
+    mocker.patch("openedx_webhooks.info._read_repotools_yaml_file", world.read_repotools_yaml_file)
+
+The scale_world fixture does both.
+
+"""
+
+import datetime
+import itertools
+import os
+import random
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import yaml
+
+from .fake_github import FakeGitHub, PullRequest, Repo
+from .fake_jira import FakeJira, Issue
+
+
+# The statuses of open OSPR issues, with how common they are.
+OPEN_STATUSES = {
+    "Needs Triage": 10,
+    "Waiting on Author": 25,
+    "Community Manager Review": 5,
+    "Open edX Community Review": 10,
+    "Awaiting Prioritization": 15,
+    "Product Review": 5,
+    "Engineering Review": 20,
+    "Changes Requested": 10,
+}
+
+# How pull requests end up, with how common each is.
+PR_STATES = {"open": 30, "merged": 55, "closed": 15}
+
+# What kinds of authors make pull requests, with how common each is.
+AUTHOR_KINDS = {"internal": 45, "community": 35, "contractor": 10, "committer": 5, "blended": 5}
+
+# Labels that people add to pull requests by hand.
+EXTRA_LABELS = ["bug", "enhancement", "documentation", "help wanted", "needs rebase", "waiting for CI"]
+
+SPEC_ORGS = ["edx", "openedx"]
+
+# Pull requests are made in the three years before this.
+EPOCH = datetime.datetime(2021, 6, 1)
+
+LOCAL_REPO_DATA = os.path.join(os.path.dirname(__file__), "repo_data")
+
+
+def _weighted(rng: random.Random, weights: Dict[str, int]) -> str:
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def _comment_count(rng: random.Random) -> int:
+    """A long-tailed number of comments: most PRs have a few, some have dozens."""
+    return min(int(rng.lognormvariate(1.0, 1.0)), 200)
+
+
+@dataclass
+class ScaleWorld:
+    """What `generate_world` made."""
+    people: Dict[str, Dict]
+    orgs: Dict[str, Dict]
+    repos: List[Repo] = field(default_factory=list)
+    pull_requests: List[PullRequest] = field(default_factory=list)
+    # Map from "owner/repo#number" to the issue tracking that pull request.
+    issues: Dict[str, Issue] = field(default_factory=dict)
+
+    def read_repotools_yaml_file(self, filename: str) -> Dict:
+        """
+        Read a repo-tools-data file of this world, to replace
+        `openedx_webhooks.info._read_repotools_yaml_file`.
+        """
+        if filename == "people.yaml":
+            return self.people
+        if filename == "orgs.yaml":
+            return self.orgs
+        with open(os.path.join(LOCAL_REPO_DATA, filename)) as data:
+            return yaml.safe_load(data)
+
+    def dump_repotools_file(self, filename: str) -> str:
+        """
+        Write a repo-tools-data file of this world as YAML, for code that
+        reads the text, like a worker in another process.
+        """
+        return yaml.safe_dump(self.read_repotools_yaml_file(filename), sort_keys=False)
+
+
+def _make_people(rng, num_people, num_orgs):
+    orgs = {"edX": {"agreement": "institution", "internal": True}}
+    for i in range(num_orgs):
+        org = {"agreement": "institution", "contractor": i % 5 == 0}
+        if i % 7 == 0:
+            org["contact"] = {"name": f"Contact {i}", "email": f"contact@org{i}.example.com"}
+        orgs[f"Org{i:04d}"] = org
+    contractors = [name for name, org in orgs.items() if org.get("contractor")]
+    others = [name for name, org in orgs.items() if not org.get("contractor") and not org.get("internal")]
+
+    people = {}
+    authors = {kind: [] for kind in AUTHOR_KINDS}
+    for i in range(num_people):
+        login = f"user{i:05d}"
+        kind = _weighted(rng, AUTHOR_KINDS)
+        person = {
+            "name": f"User {i}",
+            "email": f"{login}@example.com",
+            "jira": login,
+        }
+        if kind == "internal":
+            person.update(agreement="institution", institution="edX")
+        elif kind == "contractor":
+            person.update(agreement="institution", institution=rng.choice(contractors))
+        elif kind == "community":
+            chance = rng.random()
+            if chance < 0.45:
+                person["agreement"] = "individual"
+            elif chance < 0.9:
+                person.update(agreement="institution", institution=rng.choice(others))
+            # The rest haven't signed an agreement.
+        else:
+            person.update(agreement="institution", institution=rng.choice(others))
+            if kind == "committer":
+                person["committer"] = {"orgs": [rng.choice(SPEC_ORGS)]}
+        if rng.random() < 0.05:
+            person["before"] = {datetime.date(2020, 1, 1): {"agreement": "none"}}
+        people[login] = person
+        authors[kind].append(login)
+    return people, orgs, authors
+
+
+def generate_world(
+    fake_github: FakeGitHub,
+    fake_jira: FakeJira,
+    seed: int = 0,
+    repos: int = 1000,
+    pull_requests: int = 20000,
+    people: int = 5000,
+    orgs: int = 300,
+    blended_projects: int = 50,
+) -> ScaleWorld:
+    """
+    Fill `fake_github` and `fake_jira` with a large random world.
+
+    Pull requests from the community have an OSPR issue, and those from
+    blended developers have a BLENDED issue under their project's epic.
+    Each of those has the bot's first comment mentioning the issue, and the
+    labels the bot would have put on it.  Other comments are from random
+    people.
+
+    Returns:
+        A ScaleWorld describing what was made.
+    """
+    rng = random.Random(seed)
+    the_people, the_orgs, authors = _make_people(rng, people, orgs)
+    world = ScaleWorld(people=the_people, orgs=the_orgs)
+    logins = list(the_people)
+
+    for login in logins:
+        fake_github.make_user(login=login, name=the_people[login]["name"])
+
+    epics = [
+        fake_jira.make_issue(
+            project="BLENDED",
+            issuetype="Epic",
+            summary=f"Blended project {bd}",
+            blended_project_id=f"BD-{bd}",
+            blended_project_status_page=f"https://thewiki/bd-{bd}",
+        )
+        for bd in range(1, blended_projects + 1)
+    ]
+
+    for i in range(repos):
+        repo = fake_github.make_repo(rng.choice(SPEC_ORGS), f"repo-{i:04d}")
+        world.repos.append(repo)
+
+    # Spread the pull requests unevenly: a few repos get most of them.
+    repo_weights = [1 / (rank + 1) for rank in range(len(world.repos))]
+    numbers = {id(repo): itertools.count(1) for repo in world.repos}
+    for repo in rng.choices(world.repos, weights=repo_weights, k=pull_requests):
+        kind = _weighted(rng, AUTHOR_KINDS)
+        user = rng.choice(authors[kind] or logins)
+        state = _weighted(rng, PR_STATES)
+        epic = rng.choice(epics) if kind == "blended" and epics else None
+        title = f"Change {rng.randrange(100000)}"
+        if epic is not None:
+            title = f"[{epic.blended_project_id}] {title}"
+        pr = repo.make_pull_request(
+            user=user,
+            number=next(numbers[id(repo)]),
+            title=title,
+            body="A description of the change.",
+            created_at=EPOCH - datetime.timedelta(seconds=rng.randrange(3 * 365 * 24 * 3600)),
+            state="open" if state == "open" else "closed",
+            merged=(state == "merged"),
+            draft=(state == "open" and rng.random() < 0.1),
+            additions=rng.randrange(1, 2000),
+            deletions=rng.randrange(0, 500),
+        )
+        world.pull_requests.append(pr)
+
+        labels = set()
+        if kind in ("community", "blended"):
+            project = "BLENDED" if epic is not None else "OSPR"
+            status = {"merged": "Merged", "closed": "Rejected"}.get(state) or _weighted(rng, OPEN_STATUSES)
+            issue = fake_jira.make_issue(
+                project=project,
+                issuetype="Pull Request Review",
+                summary=title,
+                description=pr.body,
+                contributor_name=the_people[user]["name"],
+                customer=the_people[user].get("institution"),
+                pr_number=pr.number,
+                repo=f"{repo.owner}/{repo.repo}",
+                url=f"https://github.com/{repo.owner}/{repo.repo}/pull/{pr.number}",
+                labels={"blended"} if epic is not None else set(),
+                epic_link=epic.key if epic is not None else None,
+                lines_added=pr.additions,
+                lines_deleted=pr.deletions,
+            )
+            issue.status = status
+            world.issues[f"{repo.owner}/{repo.repo}#{pr.number}"] = issue
+            pr.add_comment(
+                user=fake_github.login,
+                body=(
+                    "<!-- comment:external_pr -->\n"
+                    f"Thanks for the pull request, @{user}! I've created {issue.key} to keep track of it in Jira.\n"
+                ),
+            )
+            labels |= {status.lower(), "blended" if epic is not None else "open-source-contribution"}
+        elif kind == "contractor":
+            pr.add_comment(
+                user=fake_github.login,
+                body=f"<!-- comment:contractor -->\n@{user}, you work for a company that does contract work for edX.\n",
+            )
+        for _ in range(_comment_count(rng)):
+            pr.add_comment(user=rng.choice(logins), body="A comment about the change.")
+        if rng.random() < 0.3:
+            labels |= set(rng.sample(EXTRA_LABELS, rng.randint(1, 2)))
+        pr.set_labels(labels)
+
+    return world
+
@@ -0,0 +1,190 @@
+"""
+Budgets for the GitHub and Jira calls of our main code paths.
+
+If a change makes fewer calls, lower the budget to match.  If it makes
+more, be sure it has to.
+"""
+
+import pytest
+import requests
+
+from openedx_webhooks.tasks.github import pull_request_changed, synchronize_labels
+from openedx_webhooks.tasks.jira import issue_updated, rescan_jira_issues
+
+from .call_budget import budget_report
+from .test_jira_status_changed import status_change_event
+
+
+def test_within_budget(api_budget, fake_github):
+    fake_github.make_user(login="someone")
+    with api_budget(github={"GET /user": 1, "GET /users/{login}": 2}, jira={}):
+        requests.get("https://api.github.com/users/someone")
+        requests.get("https://api.github.com/users/someone")
+
+
+def test_over_budget(api_budget, fake_github):
+    fake_github.make_user(login="someone")
+    with pytest.raises(AssertionError) as exc_info:
+        with api_budget(github={"GET /user": 1, "GET /users/{login}": 1}, jira={}):
+            requests.get("https://api.github.com/users/someone")
+            requests.get("https://api.github.com/user")
+            requests.get("https://api.github.com/users/someone")
+            requests.get("https://api.github.com/rate_limit")
+    assert str(exc_info.value) == (
+        "github made more API calls than its budget:\n"
+        "  budget  made\n"
+        " +1    0     1  GET /rate_limit\n"
+        "       1     1  GET /user\n"
+        " +1    1     2  GET /users/{login}\n"
+        "github calls, in order:\n"
+        "      GET /users/someone\n"
+        "      GET /user\n"
+        "      GET /users/someone\n"
+        "      GET /rate_limit"
+    )
+
+
+def test_budget_report_with_no_calls():
+    assert budget_report("jira", {"GET /rest/api/2/field": 1}, []) is None
+
+
+@pytest.fixture
+def new_contributor_pr(fake_github):
+    fake_github.make_user(login="new_contributor", name="Newb Contributor")
+    return fake_github.make_pull_request(owner="edx", repo="edx-platform", user="new_contributor")
+
+
+def test_new_community_pr(reqctx, api_budget, new_contributor_pr):
+    with api_budget(
+        github={
+            "GET /user": 1,
+            # The contributor's name, for the Jira issue.
+            "GET /users/{login}": 1,
+            "GET /repos/{owner}/{repo}/labels": 1,
+            "POST /repos/{owner}/{repo}/labels": 2,
+            "GET /repos/{owner}/{repo}/issues/{number}/comments": 1,
+            "POST /repos/{owner}/{repo}/issues/{number}/comments": 1,
+            "PATCH /repos/{owner}/{repo}/issues/{number}": 1,
+        },
+        jira={
+            "GET /rest/api/2/field": 1,
+            "POST /rest/api/2/issue": 1,
+            "GET /rest/api/2/issue/{key}/transitions": 1,
+            "POST /rest/api/2/issue/{key}/transitions": 1,
+        },
+    ):
+        with reqctx:
+            pull_request_changed(new_contributor_pr.as_json())
+
+
+def test_unchanged_community_pr(reqctx, api_budget, new_contributor_pr):
+    with reqctx:
+        pull_request_changed(new_contributor_pr.as_json())
+    with api_budget(
+        github={
+            "GET /repos/{owner}/{repo}/labels": 1,
+            "GET /repos/{owner}/{repo}/issues/{number}/comments": 1,
+        },
+        jira={"GET /rest/api/2/issue/{key}": 1},
+    ):
+        with reqctx:
+            pull_request_changed(new_contributor_pr.as_json())
+
+
+def test_community_pr_comment_edited(reqctx, api_budget, new_contributor_pr):
+    with reqctx:
+        pull_request_changed(new_contributor_pr.as_json())
+    # Becoming a draft changes the bot comment, which is edited in place.
+    new_contributor_pr.title = "WIP: " + new_contributor_pr.title
+    with api_budget(
+        github={
+            "GET /repos/{owner}/{repo}/labels": 1,
+            "GET /repos/{owner}/{repo}/issues/{number}/comments": 1,
+            "PATCH /repos/{owner}/{repo}/issues/comments/{number}": 1,
+        },
+        jira={
+            "GET /rest/api/2/issue/{key}": 1,
+            "PUT /rest/api/2/issue/{key}": 1,
+        },
+    ):
+        with reqctx:
+            pull_request_changed(new_contributor_pr.as_json())
+
+
+def test_community_pr_merged(reqctx, api_budget, new_contributor_pr):
+    with reqctx:
+        pull_request_changed(new_contributor_pr.as_json())
+    new_contributor_pr.close(merge=True)
+    with api_budget(
+        github={
+            "GET /repos/{owner}/{repo}/labels": 1,
+            "GET /repos/{owner}/{repo}/issues/{number}/comments": 1,
+            "PATCH /repos/{owner}/{repo}/issues/{number}": 1,
+        },
+        jira={
+            "GET /rest/api/2/issue/{key}": 1,
+            "GET /rest/api/2/issue/{key}/transitions": 1,
+            "POST /rest/api/2/issue/{key}/transitions": 1,
+        },
+    ):
+        with reqctx:
+            pull_request_changed(new_contributor_pr.as_json())
+
+
+def test_internal_pr(reqctx, api_budget, fake_github):
+    pr = fake_github.make_pull_request(owner="edx", repo="edx-platform", user="nedbat")
+    with api_budget(github={}, jira={}):
+        with reqctx:
+            pull_request_changed(pr.as_json())
+
+
+def test_synchronize_labels(reqctx, api_budget, fake_github):
+    fake_github.make_repo("edx", "some-repo")
+    with api_budget(
+        github={
+            "GET /repos/{owner}/{repo}/labels": 1,
+            "POST /repos/{owner}/{repo}/labels": 2,
+        },
+        jira={},
+    ):
+        with reqctx:
+            synchronize_labels("edx/some-repo")
+
+
+def test_jira_status_change(reqctx, api_budget, fake_github, fake_jira):
+    repo = fake_github.make_repo("edx", "some-repo")
+    repo.set_labels([{"name": "needs triage"}, {"name": "Waiting on Author"}])
+    pr = repo.make_pull_request(number=17)
+    pr.set_labels(["open-source-contribution", "needs triage"])
+    issue = fake_jira.make_issue(repo="edx/some-repo", pr_number=17)
+    with api_budget(
+        github={
+            # Read again after the missing labels are made.
+            "GET /repos/{owner}/{repo}/labels": 2,
+            "POST /repos/{owner}/{repo}/labels": 2,
+            "POST /repos/{owner}/{repo}/issues/{number}/labels": 1,
+            "DELETE /repos/{owner}/{repo}/issues/{number}/labels/{name}": 1,
+        },
+        jira={"GET /rest/api/2/field": 1},
+    ):
+        with reqctx:
+            issue_updated(status_change_event(issue, "Needs Triage", "Waiting on Author"))
+
+
+def test_rescan_jira_issues(reqctx, api_budget, fake_jira):
+    fake_jira.make_user("employee", groups=["edx-employees", "jira-users"])
+    fake_jira.make_user("someone", groups=["jira-users"])
+    for creator in ["employee", "employee", "employee", "someone", "someone"]:
+        fake_jira.make_issue(project="SOL", creator=creator)
+    with api_budget(
+        github={},
+        jira={
+            "GET /rest/api/2/search": 1,
+            # Each creator is looked up once.
+            "GET /rest/api/2/user": 2,
+            "GET /rest/api/2/issue/{key}/transitions": 3,
+            "POST /rest/api/2/issue/{key}/transitions": 3,
+        },
+    ):
+        with reqctx:
+            rescan_jira_issues('status = "Needs Triage" ORDER BY key')
@@ -4,6 +4,8 @@ import pytest
 import requests
 from glom import glom
 
+from openedx_webhooks.metrics import http_metrics, instrument_session, reset_metrics
+
 from .fake_github import DoesNotExist, FakeGitHub
 
 
@@ -189,6 +191,23 @@ class TestPullRequests:
         assert resp.json()["message"] == "Repo some-user/another-repo does not exist"
 
 
+    def test_listing_pull_requests(self, fake_github):
+        repo = fake_github.make_repo("an-org", "a-repo")
+        prs = [repo.make_pull_request(number=n) for n in range(1, 6)]
+        prs[1].close()
+
+        resp = requests.get("https://api.github.com/repos/an-org/a-repo/pulls?per_page=3")
+        assert resp.status_code == 200
+        assert [p["number"] for p in resp.json()] == [1, 3, 4]
+        assert resp.links["last"]["url"].endswith("page=2")
+        resp = requests.get(resp.links["next"]["url"])
+        assert [p["number"] for p in resp.json()] == [5]
+        assert "next" not in resp.links
+
+        resp = requests.get("https://api.github.com/repos/an-org/a-repo/pulls?state=all")
+        assert [p["number"] for p in resp.json()] == [1, 2, 3, 4, 5]
+
+
 class TestPullRequestLabels:
     def test_updating_labels_with_api(self, fake_github):
         repo = fake_github.make_repo("an-org", "a-repo")
@@ -333,3 +352,93 @@ class TestFlakyGitHub:
             json={"name": "nice", "color": "ff0000"},
         )
         assert resp.status_code == 201
+
+
+class FakeClock:
+    def __init__(self, now=1_600_000_000):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestRateLimits:
+    def get(self, path, token="tok1", **headers):
+        if token:
+            headers["Authorization"] = f"token {token}"
+        return requests.get(f"https://api.github.com{path}", headers=headers)
+
+    def test_headers_count_down(self, fake_github):
+        clock = FakeClock()
+        fake_github.enable_rate_limits(limit=10, window=3600, clock=clock)
+        resp = self.get("/user")
+        assert resp.status_code == 200
+        assert resp.headers["X-RateLimit-Limit"] == "10"
+        assert resp.headers["X-RateLimit-Remaining"] == "9"
+        assert resp.headers["X-RateLimit-Used"] == "1"
+        assert resp.headers["X-RateLimit-Reset"] == str(clock.now + 3600)
+        resp = self.get("/user")
+        assert resp.headers["X-RateLimit-Remaining"] == "8"
+        # Each token has its own quota, and no token has a smaller one.
+        resp = self.get("/user", token="tok2")
+        assert resp.headers["X-RateLimit-Remaining"] == "9"
+        resp = self.get("/user", token=None)
+        assert resp.headers["X-RateLimit-Limit"] == "60"
+
+    def test_quota_runs_out(self, fake_github):
+        clock = FakeClock()
+        fake_github.enable_rate_limits(limit=2, window=60, clock=clock)
+        assert self.get("/user").status_code == 200
+        assert self.get("/user").status_code == 200
+        resp = self.get("/user")
+        assert resp.status_code == 403
+        assert resp.headers["X-RateLimit-Remaining"] == "0"
+        assert resp.json()["message"] == "API rate limit exceeded."
+        # The rate limit can still be checked.
+        resp = self.get("/rate_limit")
+        assert resp.status_code == 200
+        assert resp.json()["resources"]["core"]["remaining"] == 0
+        # The next window has a fresh quota.
+        clock.now += 60
+        resp = self.get("/user")
+        assert resp.status_code == 200
+        assert resp.headers["X-RateLimit-Remaining"] == "1"
+
+    def test_secondary_rate_limit(self, fake_github):
+        clock = FakeClock()
+        fake_github.enable_rate_limits(secondary_limit=3, secondary_window=10, retry_after=30, clock=clock)
+        for _ in range(3):
+            assert self.get("/user").status_code == 200
+        resp = self.get("/user")
+        assert resp.status_code == 403
+        assert resp.headers["Retry-After"] == "30"
+        assert "secondary rate limit" in resp.json()["message"]
+        clock.now += 10
+        assert self.get("/user").status_code == 200
+
+    def test_conditional_requests(self, fake_github):
+        fake_github.enable_rate_limits(limit=10, clock=FakeClock())
+        fake_github.make_user(login="nedbat", name="Ned Batchelder")
+        resp = self.get("/users/nedbat")
+        etag = resp.headers["ETag"]
+        assert resp.headers["X-RateLimit-Remaining"] == "9"
+
+        resp = self.get("/users/nedbat", **{"If-None-Match": etag})
+        assert resp.status_code == 304
+        assert resp.content == b""
+        # A 304 doesn't count against the quota.
+        assert resp.headers["X-RateLimit-Remaining"] == "9"
+
+        fake_github.users["nedbat"].name = "Ned"
+        resp = self.get("/users/nedbat", **{"If-None-Match": etag})
+        assert resp.status_code == 200
+        assert resp.headers["ETag"] != etag
+        assert resp.headers["X-RateLimit-Remaining"] == "8"
+
+    def test_metrics_see_rate_limits(self, fake_github):
+        fake_github.enable_rate_limits(limit=100, clock=FakeClock())
+        reset_metrics()
+        session = instrument_session(requests.Session())
+        session.get("https://api.github.com/user", headers={"Authorization": "token tok1"})
+        assert 'http_client_rate_limit{service="github",header="remaining"} 99\n' in http_metrics()
+        reset_metrics()
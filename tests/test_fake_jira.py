@@ -1,7 +1,14 @@
 """Tests of FakeJira."""
 
+import jira
+import pytest
 import requests
 
+from openedx_webhooks.github.dispatcher.actions.utils import find_issues_for_pull_request
+from openedx_webhooks.lib.jira.utils import iter_search_issues
+
+SEARCH_URL = "https://openedx.atlassian.net/rest/api/2/search"
+
 
 class TestIssues:
     """
@@ -87,4 +94,101 @@ class TestBadRequests:
 
     def test_baffling_search(self, fake_jira):
         resp = requests.get(f"https://openedx.atlassian.net/rest/api/2/search?jql=xyzzy")
-        assert resp.status_code == 500
+        assert resp.status_code == 400
+        assert resp.json()["errorMessages"][0].startswith("Error in the JQL Query")
+
+
+class TestSearch:
+    """
+    Tests of searching with JQL.
+    """
+    @pytest.fixture
+    def issues(self, fake_jira):
+        issues = [
+            fake_jira.make_issue(
+                summary=f"Pull request {n}",
+                url=f"https://github.com/edx/edx-platform/pull/{n}",
+                pr_number=n,
+            )
+            for n in range(1, 8)
+        ]
+        issues[0].status = "Merged"
+        issues[1].status = "Rejected"
+        issues[2].labels = {"blended"}
+        fake_jira.make_issue(project="BLENDED", blended_project_id="BD-34")
+        return issues
+
+    def search(self, **params):
+        resp = requests.get(SEARCH_URL, params=params)
+        assert resp.status_code == 200
+        return resp.json()
+
+    def test_search(self, fake_jira, issues):
+        result = self.search(jql='project = OSPR AND status NOT IN (Merged, Rejected) ORDER BY key DESC')
+        assert result["total"] == 5
+        assert [iss["key"] for iss in result["issues"]] == [iss.key for iss in reversed(issues[2:])]
+
+    def test_changes_are_found(self, fake_jira, issues):
+        assert self.search(jql="status = Merged")["total"] == 1
+        issues[3].status = "Merged"
+        fake_jira.issues[issues[0].key].status = "Open"
+        del fake_jira.issues[issues[4].key]
+        assert [iss["key"] for iss in self.search(jql="status = Merged")["issues"]] == [issues[3].key]
+        assert self.search(jql="project = OSPR")["total"] == 6
+
+    def test_custom_fields(self, fake_jira, issues):
+        result = self.search(jql='project=OSPR AND cf[10904]="https://github.com/edx/edx-platform/pull/4"')
+        assert [iss["key"] for iss in result["issues"]] == [issues[3].key]
+        result = self.search(jql='"PR Number" in (2, 3) ORDER BY "PR Number" DESC')
+        assert [iss["key"] for iss in result["issues"]] == [issues[2].key, issues[1].key]
+        result = self.search(jql='"Blended Project ID" is not EMPTY')
+        assert result["issues"][0]["fields"][fake_jira.BLENDED_PROJECT_ID] == "BD-34"
+
+    def test_text_and_labels(self, fake_jira, issues):
+        assert self.search(jql='summary ~ "request 5"')["issues"][0]["key"] == issues[4].key
+        assert self.search(jql="labels = blended")["issues"][0]["key"] == issues[2].key
+        assert self.search(jql="labels is EMPTY")["total"] == 7
+
+    def test_pagination(self, fake_jira, issues):
+        keys = []
+        for start_at in range(0, 8, 3):
+            result = self.search(jql="ORDER BY key", startAt=start_at, maxResults=3)
+            assert result["startAt"] == start_at
+            assert result["maxResults"] == 3
+            assert result["total"] == 8
+            keys.extend(iss["key"] for iss in result["issues"])
+        assert keys == sorted(fake_jira.issues, key=lambda k: (k.partition("-")[0], int(k.partition("-")[2])))
+
+    def test_max_results_is_limited(self, fake_jira):
+        for _ in range(fake_jira.MAX_RESULTS + 10):
+            fake_jira.make_issue()
+        result = self.search(jql="", maxResults=1000)
+        assert result["maxResults"] == fake_jira.MAX_RESULTS
+        assert len(result["issues"]) == fake_jira.MAX_RESULTS
+        assert result["total"] == fake_jira.MAX_RESULTS + 10
+
+    def test_fields(self, fake_jira, issues):
+        result = self.search(jql="status = Merged", fields=f"summary,status,{fake_jira.URL}")
+        assert result["issues"][0]["fields"] == {
+            "summary": "Pull request 1",
+            "status": {"name": "Merged"},
+            fake_jira.URL: "https://github.com/edx/edx-platform/pull/1",
+        }
+        result = self.search(jql="status = Merged", fields="*all")
+        assert fake_jira.PR_NUMBER in result["issues"][0]["fields"]
+
+    def test_unknown_field(self, fake_jira):
+        resp = requests.get(SEARCH_URL, params={"jql": "flavor = chocolate"})
+        assert resp.status_code == 400
+        assert resp.json()["errorMessages"] == [
+            "Field 'flavor' does not exist or you do not have permission to view it."
+        ]
+
+    def test_jira_client(self, fake_jira, issues):
+        # The jira library's searches work too.
+        client = jira.JIRA(server="https://openedx.atlassian.net", get_server_info=False)
+        found = find_issues_for_pull_request(client, "https://github.com/edx/edx-platform/pull/6")
+        assert [iss.key for iss in found] == [issues[5].key]
+        found = list(iter_search_issues(client, "project = OSPR", page_size=2))
+        assert [iss.key for iss in found] == [iss.key for iss in issues]
+        assert len(fake_jira.requests_made("/rest/api/2/search")) == 1 + 4
@@ -0,0 +1,108 @@
+"""Tests of the JQL subset used by FakeJira."""
+
+import pytest
+
+from .fake_jql import And, Clause, JqlError, Not, Or, Query, parse_jql
+
+
+@pytest.mark.parametrize("jql, query", [
+    ("", Query(None)),
+    ('status = "Needs Triage" ORDER BY key', Query(Clause("status", "=", ["Needs Triage"]), [("key", False)])),
+    ("project=OSPR", Query(Clause("project", "=", ["OSPR"]))),
+    (
+        'project=OSPR AND cf[10904]="https://github.com/edx/edx-platform/pull/1"',
+        Query(And([
+            Clause("project", "=", ["OSPR"]),
+            Clause("cf[10904]", "=", ["https://github.com/edx/edx-platform/pull/1"]),
+        ])),
+    ),
+    ('"Blended Project ID" is not EMPTY', Query(Clause("Blended Project ID", "is not", [None]))),
+    ("labels is empty", Query(Clause("labels", "is", [None]))),
+    ("customer = null", Query(Clause("customer", "is", [None]))),
+    (
+        "status NOT IN (Merged, 'Rejected') order by created desc, key",
+        Query(Clause("status", "!=", ["Merged", "Rejected"]), [("created", True), ("key", False)]),
+    ),
+    (
+        'summary ~ "edx platform" OR NOT (status = Open and labels in (blended))',
+        Query(Or([
+            Clause("summary", "~", ["edx platform"]),
+            Not(And([Clause("status", "=", ["Open"]), Clause("labels", "=", ["blended"])])),
+        ])),
+    ),
+    (r'summary !~ "say \"hi\""', Query(Clause("summary", "!~", ['say "hi"']))),
+    ("ORDER BY key ASC", Query(None, [("key", False)])),
+])
+def test_parse(jql, query):
+    assert parse_jql(jql) == query
+
+
+@pytest.mark.parametrize("jql", [
+    "xyzzy",
+    "status =",
+    "status = Open AND",
+    "status in (Open",
+    "status is Open",
+    "(status = Open",
+    "status = Open ORDER key",
+    "status = Open extra",
+    "status < 3",
+])
+def test_parse_errors(jql):
+    with pytest.raises(JqlError, match="Error in the JQL Query"):
+        parse_jql(jql)
+
+
+class FakeIndex:
+    """A small index of issues, each a dict of field values."""
+    def __init__(self, issues):
+        self.issues = issues
+
+    def lookup(self, field, value):
+        found = set()
+        for key, issue in self.issues.items():
+            have = issue.get(field)
+            values = have if isinstance(have, set) else {have}
+            if value is None and (have is None or have == set()):
+                found.add(key)
+            elif value is not None and value.lower() in {str(v).lower() for v in values if v is not None}:
+                found.add(key)
+        return found
+
+    def all_keys(self):
+        return set(self.issues)
+
+    def value(self, key, field):
+        return self.issues[key].get(field)
+
+
+@pytest.mark.parametrize("jql, keys", [
+    ("", {"A-1", "A-2", "B-1", "B-2"}),
+    ("status = open", {"A-1", "B-1"}),
+    ("status != Open", {"A-2"}),
+    ("status NOT IN (Open, Closed)", set()),
+    ("status IS EMPTY", {"B-2"}),
+    ("status is not empty AND labels = blended", {"A-2"}),
+    ("labels in (blended, bug)", {"A-2", "B-1"}),
+    ("labels is empty", {"A-1", "B-2"}),
+    ('summary ~ "fix CRASH"', {"A-1"}),
+    # Like Jira, words match longer forms of them.
+    ('summary !~ "crash"', {"A-2", "B-2"}),
+    ("status = Open OR labels = bug", {"A-1", "B-1"}),
+    ("NOT status = Open", {"A-2", "B-2"}),
+    ("status = Open AND NOT labels = bug", {"A-1"}),
+])
+def test_select(jql, keys):
+    index = FakeIndex({
+        "A-1": {"status": "Open", "labels": set(), "summary": "Fix the crash"},
+        "A-2": {"status": "Closed", "labels": {"blended"}, "summary": "Add a thing"},
+        "B-1": {"status": "Open", "labels": {"bug"}, "summary": "Crashes sometimes"},
+        "B-2": {"status": None, "labels": set(), "summary": None},
+    })
+    assert parse_jql(jql).select(index) == keys
+
+
+def test_fields_and_map_fields():
+    query = parse_jql("(a = 1 OR NOT b = 2) AND c ~ x ORDER BY d")
+    assert query.fields() == {"a", "b", "c", "d"}
+    assert query.map_fields(str.upper) == parse_jql("(A = 1 OR NOT B = 2) AND C ~ x ORDER BY D")
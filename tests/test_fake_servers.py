@@ -0,0 +1,52 @@
+"""Tests of pull request processing against the fakes served over HTTP."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from openedx_webhooks.tasks.github import pull_request_changed
+
+
+def test_new_pr_over_http(reqctx, served_fake_github, served_fake_jira):
+    served_fake_github.make_user(login="new_contributor", name="Newb Contributor")
+    pr = served_fake_github.make_pull_request(owner="edx", repo="edx-platform", user="new_contributor")
+
+    with reqctx:
+        issue_id, anything_happened = pull_request_changed(pr.as_json())
+
+    assert anything_happened is True
+    assert issue_id in served_fake_jira.issues
+    assert len(pr.list_comments()) == 1
+    assert ("/rest/api/2/issue", "POST") in served_fake_jira.requests_made(method="POST")
+    assert served_fake_github.requests_made(f"/issues/{pr.number}/comments", "POST")
+
+
+def test_many_prs_at_once(app, served_fake_github, served_fake_jira):
+    served_fake_github.make_user(login="new_contributor", name="Newb Contributor")
+    repo = served_fake_github.make_repo("edx", "edx-platform")
+    prs = [repo.make_pull_request(user="new_contributor") for _ in range(10)]
+
+    def process(pr):
+        # Each thread needs its own request context.
+        with app.test_request_context("/", base_url="https://openedx-webhooks.herokuapp.com"):
+            return pull_request_changed(pr.as_json())
+
+    # The first PR creates the repo's labels.  Concurrent PRs in a repo
+    # without them would race to create them, as they would on GitHub.
+    results = [process(prs[0])]
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        results += executor.map(process, prs[1:])
+
+    assert all(happened for _, happened in results)
+    assert len({issue_id for issue_id, _ in results}) == 10
+    assert len(served_fake_jira.issues) == 10
+    assert all(len(pr.list_comments()) == 1 for pr in prs)
+
+
+def test_served_rate_limits(served_fake_github):
+    served_fake_github.enable_rate_limits(limit=1)
+    url = served_fake_github.server.url
+    assert requests.get(f"{url}/user", headers={"Authorization": "token t"}).status_code == 200
+    resp = requests.get(f"{url}/user", headers={"Authorization": "token t"})
+    assert resp.status_code == 403
+    assert resp.headers["X-RateLimit-Remaining"] == "0"
@@ -2,6 +2,10 @@
 Test the Faker class and its helpers.
 """
 
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 import requests
 import requests_mock
@@ -129,3 +133,161 @@ def test_requests_made(my_fake):
     assert my_fake.requests_made(r"123", "GET") == [
         ("/api/something/1234", "GET"),
     ]
+
+
+def test_router():
+    def handler(name):
+        return lambda request, context, match=None: name
+    router = faker.Router([
+        (r"/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)", "GET", "json", handler("repo")),
+        (r"/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/labels/(?P<name>.*)", "GET", "json", handler("label")),
+        (r"/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)/labels/(?P<name>.*)", "DELETE", "json", handler("delete")),
+        (r"/users/(\w+)/(repos|orgs)", "GET", "text", handler("user")),
+    ])
+    match, data_type, callback = router.find("GET", "/repos/edx/edx-platform/labels/needs triage")
+    assert callback(None, None) == "label"
+    assert data_type == "json"
+    assert match.groupdict() == {"owner": "edx", "repo": "edx-platform", "name": "needs triage"}
+
+    match, _, callback = router.find("GET", "/repos/edx/edx-platform")
+    assert callback(None, None) == "repo"
+    assert match["repo"] == "edx-platform"
+
+    match, data_type, callback = router.find("GET", "/users/nedbat/orgs")
+    assert callback(None, None) == "user"
+    assert data_type == "text"
+    assert match.groups() == ("nedbat", "orgs")
+
+    assert router.find("DELETE", "/repos/edx/edx-platform/labels/bug")[2](None, None) == "delete"
+    # The whole path has to match.
+    assert router.find("GET", "/repos/edx/edx-platform/pulls") is None
+    assert router.find("GET", "/api/repos/edx/edx-platform") is None
+    assert router.find("PATCH", "/repos/edx/edx-platform") is None
+
+
+class FakeSleep:
+    """A replacement for time.sleep that only records what it was asked."""
+    def __init__(self):
+        self.sleeps = []
+
+    def __call__(self, seconds):
+        self.sleeps.append(seconds)
+
+
+def test_latency(my_fake):
+    sleep = FakeSleep()
+    my_fake.add_middleware(faker.Latency(faker.fixed(0.25), sleep=sleep, method="GET").middleware)
+    requests.get("https://myapi.com/api/something/1")
+    requests.post("https://myapi.com/api/something/1")
+    requests.get("https://myapi.com/api/something/2")
+    assert sleep.sleeps == [0.25, 0.25]
+
+
+def test_fault_middleware_needs_inject():
+    with pytest.raises(TypeError):
+        faker.FaultMiddleware()  # pylint: disable=abstract-class-instantiated
+
+
+@pytest.mark.parametrize("distribution, low, high", [
+    (faker.uniform(0.1, 0.2), 0.1, 0.2),
+    (faker.lognormal(0.1), 0.01, 1.0),
+])
+def test_latency_distributions(distribution, low, high):
+    rng = random.Random(17)
+    samples = [distribution(rng) for _ in range(100)]
+    assert all(low <= s <= high for s in samples)
+    assert len(set(samples)) > 90
+
+
+def test_error_bursts(my_fake):
+    my_fake.add_middleware(faker.ErrorBursts(probability=0.2, length=3, rng=random.Random(1)).middleware)
+    statuses = [requests.get("https://myapi.com/api/something/1").status_code for _ in range(50)]
+    failures = "".join("x" if s == 502 else "." for s in statuses)
+    # Failures come in runs of three, though the last may be cut short.
+    runs = [run for run in failures.split(".") if run]
+    assert runs
+    assert all(len(run) % 3 == 0 for run in runs[:-1])
+
+
+def test_empty_bodies(my_fake):
+    my_fake.add_middleware(faker.EmptyBodies(fraction=1.0, path_regex="/something/2").middleware)
+    resp = requests.get("https://myapi.com/api/something/2")
+    assert resp.status_code == 200
+    assert resp.content == b""
+    resp = requests.get("https://myapi.com/api/something/1")
+    assert resp.json() == {"hello": "there", "id": "1"}
+
+
+def test_slow_pagination(my_fake):
+    sleep = FakeSleep()
+    my_fake.add_middleware(faker.SlowPagination(0.5, sleep=sleep).middleware)
+    requests.get("https://myapi.com/api/something/1")
+    requests.get("https://myapi.com/api/something/1?page=1")
+    requests.get("https://myapi.com/api/something/1?page=3")
+    requests.get("https://myapi.com/api/something/1?startAt=100&maxResults=50")
+    assert sleep.sleeps == [1.0, 1.0]
+
+
+def test_response_hooks(my_fake):
+    def add_header(request, context, result):
+        context.headers["X-Seen"] = request.path
+        return result
+    def wrap_result(_request, context, result):
+        if context.status_code == 200:
+            return {"wrapped": result}
+        return result
+    my_fake.add_response_hook(add_header)
+    my_fake.add_response_hook(wrap_result)
+
+    resp = requests.get("https://myapi.com/api/something/1")
+    assert resp.headers["X-Seen"] == "/api/something/1"
+    assert resp.json() == {"wrapped": {"hello": "there", "id": "1"}}
+    # Hooks also see the responses made by middleware.
+    resp = requests.get("https://myapi.com/api/something/1?foo")
+    assert resp.status_code == 789
+    assert resp.headers["X-Seen"] == "/api/something/1"
+    assert resp.json() == {}
+
+
+@pytest.fixture
+def served_fake():
+    the_fake = MyFake(host="https://myapi.com")
+    with the_fake.serve() as server:
+        yield the_fake, server.url
+
+
+def test_served_fake(served_fake):
+    my_fake, url = served_fake
+    with requests.Session() as session:
+        resp = session.get(f"{url}/api/something/ME-123")
+        assert resp.status_code == 200
+        assert resp.json() == {"hello": "there", "id": "ME-123"}
+        resp = session.post(f"{url}/api/something/ME-456", json={"x": 1})
+        assert resp.json() == {"created": "ME-456"}
+        resp = session.get(f"{url}/api/bad")
+        assert resp.status_code == 501
+        resp = session.get(f"{url}/api/status?code=477")
+        assert resp.status_code == 477
+        assert resp.text == ""
+        resp = session.get(f"{url}/api/status?code=477&foo")
+        assert resp.status_code == 789
+        resp = session.get(f"{url}/nothing")
+        assert resp.status_code == 404
+    assert my_fake.requests_made("/api/something") == [
+        ("/api/something/ME-123", "GET"),
+        ("/api/something/ME-456", "POST"),
+    ]
+
+
+def test_served_fake_handles_requests_at_once(served_fake):
+    my_fake, url = served_fake
+    my_fake.add_middleware(faker.Latency(faker.fixed(0.2)).middleware)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        statuses = list(executor.map(
+            lambda n: requests.get(f"{url}/api/something/{n}").status_code,
+            range(8),
+        ))
+    assert statuses == [200] * 8
+    # Eight requests of 0.2s each, handled together.
+    assert time.perf_counter() - start < 0.8
@@ -0,0 +1,58 @@
+"""Tests of tasks/pr_tracking.py:find_blended_epic."""
+
+from freezegun import freeze_time
+
+from openedx_webhooks.tasks.pr_tracking import find_blended_epic
+
+
+def test_epics_found_with_one_search(fake_jira):
+    epic34 = fake_jira.make_issue(project="BLENDED", blended_project_id="BD-34")
+    epic7 = fake_jira.make_issue(project="BLENDED", blended_project_id="BD-007")
+
+    assert find_blended_epic(34)["key"] == epic34.key
+    assert find_blended_epic(7)["key"] == epic7.key
+    assert find_blended_epic(34)["key"] == epic34.key
+    assert len(fake_jira.requests_made("/rest/api/2/search")) == 1
+
+
+def test_only_used_fields_are_fetched(fake_jira):
+    fake_jira.make_issue(
+        project="BLENDED",
+        summary="A big project",
+        blended_project_id="BD-34",
+        blended_project_status_page="https://thewiki/bd-34",
+    )
+    epic = find_blended_epic(34)
+    assert set(epic["fields"]) <= {
+        fake_jira.BLENDED_PROJECT_ID, fake_jira.BLENDED_PROJECT_STATUS_PAGE, fake_jira.PLATFORM_MAP_1_2,
+    }
+    assert epic["fields"][fake_jira.BLENDED_PROJECT_STATUS_PAGE] == "https://thewiki/bd-34"
+    assert "summary" not in epic["fields"]
+
+
+def test_duplicate_epics(fake_jira):
+    fake_jira.make_issue(project="BLENDED", blended_project_id="BD-12")
+    fake_jira.make_issue(project="BLENDED", blended_project_id="BD-0012")
+    assert find_blended_epic(12) is None
+
+
+def test_missing_epic_is_negatively_cached(fake_jira):
+    fake_jira.make_issue(project="BLENDED", blended_project_id="BD-34")
+
+    with freeze_time("2020-11-02 09:00:00"):
+        # A miss refreshes the index once.
+        assert find_blended_epic(99) is None
+        assert len(fake_jira.requests_made("/rest/api/2/search")) == 2
+        # Another miss for the same project doesn't search again.
+        assert find_blended_epic(99) is None
+        assert len(fake_jira.requests_made("/rest/api/2/search")) == 2
+
+    epic99 = fake_jira.make_issue(project="BLENDED", blended_project_id="BD-99")
+
+    with freeze_time("2020-11-02 09:03:00"):
+        assert find_blended_epic(99) is None
+        assert len(fake_jira.requests_made("/rest/api/2/search")) == 2
+
+    with freeze_time("2020-11-02 09:06:00"):
+        assert find_blended_epic(99)["key"] == epic99.key
+        assert len(fake_jira.requests_made("/rest/api/2/search")) == 3
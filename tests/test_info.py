@@ -4,9 +4,10 @@ Tests of the functions in info.py
 from datetime import datetime
 
 import pytest
+import requests
 
 from openedx_webhooks.info import (
-    get_orgs, get_people_file, get_person_certain_time,
+    get_github_user, get_orgs, get_people_file, get_person_certain_time,
     is_committer_pull_request, is_internal_pull_request, is_draft_pull_request,
     pull_request_has_cla,
     get_blended_project_id,
@@ -167,3 +168,34 @@ def test_is_draft_pull_request(fake_github, title):
     # No matter what the title, a pr is Draft if it says it is.
     pr = fake_github.make_pull_request(title=title, draft=True)
     assert is_draft_pull_request(pr.as_json())
+
+
+def test_get_github_user(fake_github):
+    fake_github.make_user(login="new_contributor", name="Newb Contributor")
+    assert get_github_user("new_contributor")["name"] == "Newb Contributor"
+    num_requests = len(fake_github.requests_made("/users/new_contributor"))
+    assert get_github_user("new_contributor")["name"] == "Newb Contributor"
+    assert len(fake_github.requests_made("/users/new_contributor")) == num_requests
+
+
+def test_get_github_user_missing(fake_github, mocker):
+    mocker.patch("openedx_webhooks.utils.retry_sleep", lambda x: None)
+    assert get_github_user("nobody") is None
+    num_requests = len(fake_github.requests_made("/users/nobody"))
+    # The miss is remembered.
+    assert get_github_user("nobody") is None
+    assert len(fake_github.requests_made("/users/nobody")) == num_requests
+
+
+def test_get_github_user_errors_are_not_remembered(fake_github):
+    fake_github.make_user(login="new_contributor", name="Newb Contributor")
+
+    def unavailable(request, context):
+        context.status_code = 503
+        return {"message": "Service unavailable"}
+
+    fake_github.add_middleware(unavailable)
+    with pytest.raises(requests.HTTPError):
+        get_github_user("new_contributor")
+    fake_github.middleware.clear()
+    assert get_github_user("new_contributor")["name"] == "Newb Contributor"
@@ -0,0 +1,77 @@
+"""Tests of the caching of Jira's custom fields, as our code uses them."""
+
+import threading
+import unittest.mock as mock
+
+import pytest
+from flask_dance.consumer.requests import OAuth2Session
+
+from openedx_webhooks.cache import RedisCacheBackend, set_shared_backend
+from openedx_webhooks.tasks.jira_work import update_jira_issue
+from openedx_webhooks.utils import get_jira_custom_fields, github_pr_num, github_pr_repo, parallel_map
+
+from . import faker
+from .conftest import FakeBlueprint
+
+
+@pytest.fixture
+def shared_cache(fake_redis):
+    set_shared_backend(RedisCacheBackend(fake_redis))
+    try:
+        yield fake_redis
+    finally:
+        set_shared_backend(None)
+
+
+@pytest.fixture
+def new_jira_sessions(mocker, fake_jira):
+    """
+    Make a new Jira session each time one is asked for, as flask-dance does
+    for each app context.
+    """
+    token = {"access_token": "faketoken", "token_type": "bearer"}
+    mock_bp = mock.Mock()
+    type(mock_bp).session = mock.PropertyMock(
+        side_effect=lambda: OAuth2Session(base_url="https://openedx.atlassian.net/", blueprint=FakeBlueprint(token)),
+    )
+    mocker.patch("openedx_webhooks.oauth.jira_bp", mock_bp)
+
+
+def field_fetches(fake_jira):
+    return len(fake_jira.requests_made("/rest/api/2/field", "GET"))
+
+
+def test_custom_fields_shared_between_contexts(app, fake_jira, new_jira_sessions, shared_cache):
+    issue = fake_jira.make_issue(repo="edx/edx-platform", pr_number=1234).as_json()
+    for _ in range(3):
+        with app.app_context():
+            assert github_pr_repo(issue) == "edx/edx-platform"
+            assert github_pr_num(issue) == 1234
+            update_jira_issue(issue["key"], epic_link="BLENDED-1")
+    assert field_fetches(fake_jira) == 1
+    assert shared_cache.keys(get_jira_custom_fields._shared_prefix + "*")
+
+    # Another process finds the value in the shared cache.
+    get_jira_custom_fields._values.clear()
+    with app.app_context():
+        assert github_pr_repo(issue) == "edx/edx-platform"
+    assert field_fetches(fake_jira) == 1
+    assert get_jira_custom_fields.stats.shared_hits == 1
+
+
+def test_custom_fields_single_flight(app, fake_jira, new_jira_sessions, shared_cache):
+    # Slow Jira down, so that all the threads ask for the fields before the
+    # first answer arrives.
+    fake_jira.add_middleware(faker.Latency(lambda rng: 0.2).middleware)
+    issues = [fake_jira.make_issue(repo="edx/edx-platform", pr_number=num).as_json() for num in range(1, 9)]
+    started = threading.Barrier(len(issues))
+
+    def look_up(issue):
+        started.wait(5)
+        update_jira_issue(issue["key"], labels=["checked"])
+        return github_pr_repo(issue), github_pr_num(issue)
+
+    with app.app_context():
+        results = {issue["key"]: found for issue, found in parallel_map(look_up, issues, max_workers=len(issues))}
+    assert results == {issue["key"]: ("edx/edx-platform", num) for issue, num in zip(issues, range(1, 9))}
+    assert field_fetches(fake_jira) == 1
@@ -0,0 +1,86 @@
+"""Tests of tasks/jira.py:issue_updated handling Jira status changes."""
+
+import pytest
+
+from openedx_webhooks.tasks.jira import issue_updated
+
+
+def status_change_event(issue, old_status, new_status):
+    return {
+        "issue": issue.as_json(),
+        "changelog": {
+            "items": [
+                {"field": "status", "fromString": old_status, "toString": new_status},
+            ],
+        },
+    }
+
+
+@pytest.fixture
+def pr_and_issue(fake_github, fake_jira):
+    repo = fake_github.make_repo("edx", "some-repo")
+    repo.set_labels([
+        {"name": "basic label", "color": "bfe5bf"},
+        {"name": "important-label", "color": "00ff00", "description": "This stuff is important."},
+        {"name": "needs triage", "color": "ff0000"},
+        {"name": "Waiting on Author", "color": "0000ff"},
+    ])
+    pr = repo.make_pull_request(number=17)
+    pr.set_labels(["open-source-contribution", "needs triage"])
+    issue = fake_jira.make_issue(repo="edx/some-repo", pr_number=17)
+    return pr, issue
+
+
+def test_status_change_relabels_pr(reqctx, fake_github, pr_and_issue):
+    pr, issue = pr_and_issue
+    event = status_change_event(issue, "Needs Triage", "Waiting on Author")
+    with reqctx:
+        result = issue_updated(event)
+
+    assert result == "Changed labels of PR #17 to ['Waiting on Author', 'open-source-contribution']"
+    assert pr.labels == {"open-source-contribution", "Waiting on Author"}
+    assert fake_github.requests_made("/repos/edx/some-repo/issues/17", "GET") == []
+    assert fake_github.requests_made("/repos/edx/some-repo/issues/17/labels", "POST") == [
+        ("/repos/edx/some-repo/issues/17/labels", "POST"),
+    ]
+    assert len(fake_github.requests_made("/repos/edx/some-repo/issues/17/labels/", "DELETE")) == 1
+    # The repo labels were only read once, and were already in sync.
+    assert len(fake_github.requests_made("/repos/edx/some-repo/labels", "GET")) == 1
+
+
+def test_label_catalog_is_cached(reqctx, fake_github, pr_and_issue):
+    pr, issue = pr_and_issue
+    event = status_change_event(issue, "Needs Triage", "Waiting on Author")
+    with reqctx:
+        issue_updated(event)
+    event = status_change_event(issue, "Waiting on Author", "Needs Triage")
+    with reqctx:
+        issue_updated(event)
+
+    assert pr.labels == {"open-source-contribution", "needs triage"}
+    assert len(fake_github.requests_made("/repos/edx/some-repo/labels", "GET")) == 1
+
+
+def test_old_status_label_missing(reqctx, fake_github, pr_and_issue):
+    pr, issue = pr_and_issue
+    pr.set_labels(["open-source-contribution"])
+    event = status_change_event(issue, "Needs Triage", "Waiting on Author")
+    with reqctx:
+        issue_updated(event)
+
+    assert pr.labels == {"open-source-contribution", "Waiting on Author"}
+
+
+
+def test_status_labels_are_quoted(reqctx, fake_github, pr_and_issue):
+    pr, issue = pr_and_issue
+    pr.repo.add_label(name="blocked/waiting", color="999999")
+    pr.set_labels(["open-source-contribution", "blocked/waiting"])
+    event = status_change_event(issue, "Blocked/Waiting", "Waiting on Author")
+    with reqctx:
+        issue_updated(event)
+
+    assert pr.labels == {"open-source-contribution", "Waiting on Author"}
+    assert fake_github.requests_made("/repos/edx/some-repo/issues/17/labels/", "DELETE") == [
+        ("/repos/edx/some-repo/issues/17/labels/blocked%2Fwaiting", "DELETE"),
+    ]
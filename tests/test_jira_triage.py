@@ -0,0 +1,101 @@
+"""Tests of tasks/jira.py: moving new Jira issues out of Needs Triage."""
+
+import pytest
+
+from openedx_webhooks.tasks.jira import (
+    prefetch_jira_user_groups,
+    rescan_jira_issues,
+    should_transition,
+)
+
+
+def make_issue_json(key, creator, project="SOL", status="Needs Triage", subtask=False):
+    """Make just enough of a Jira issue for should_transition."""
+    return {
+        "key": key,
+        "fields": {
+            "status": {"name": status},
+            "project": {"key": project},
+            "issuetype": {"subtask": subtask},
+            "creator": {"accountId": creator},
+        },
+    }
+
+
+@pytest.fixture
+def jira_users(fake_jira):
+    fake_jira.make_user("employee", groups=["edx-employees", "jira-users"])
+    fake_jira.make_user("crafty", groups=["opencraft"])
+    fake_jira.make_user("someone", groups=["jira-users"])
+
+
+@pytest.mark.parametrize("creator, project, result", [
+    ("employee", "SOL", True),
+    ("employee", "TNL", True),
+    ("crafty", "SOL", True),
+    ("crafty", "TNL", False),
+    ("someone", "SOL", False),
+])
+def test_should_transition(jira_users, creator, project, result):
+    issue = make_issue_json("X-1", creator, project=project)
+    assert should_transition(issue) == result
+
+
+def test_ospr_issues_dont_transition(jira_users, fake_jira):
+    issue = make_issue_json("OSPR-1", "employee", project="OSPR")
+    assert should_transition(issue) is False
+    assert fake_jira.requests_made() == []
+
+
+def test_user_groups_are_cached(jira_users, fake_jira):
+    issues = [
+        make_issue_json(f"SOL-{i}", creator)
+        for i, creator in enumerate(["employee", "crafty", "someone"] * 10)
+    ]
+    prefetch_jira_user_groups(issues)
+    assert len(fake_jira.requests_made("/rest/api/2/user")) == 3
+    for issue in issues:
+        should_transition(issue)
+    assert len(fake_jira.requests_made("/rest/api/2/user")) == 3
+
+
+def test_prefetch_skips_issues_without_group_checks(jira_users, fake_jira):
+    issues = [
+        make_issue_json("OSPR-1", "employee", project="OSPR"),
+        make_issue_json("SOL-1", "crafty", status="Open"),
+        make_issue_json("OSPR-2", "someone", project="OSPR", subtask=True),
+    ]
+    prefetch_jira_user_groups(issues)
+    assert fake_jira.requests_made("/rest/api/2/user") == [("/rest/api/2/user", "GET")]
+
+
+def test_rescan_jira_issues(reqctx, jira_users, fake_jira):
+    employee_issues = [fake_jira.make_issue(project="SOL", creator="employee") for _ in range(5)]
+    crafty_issue = fake_jira.make_issue(project="TNL", creator="crafty")
+    ospr_issue = fake_jira.make_issue(project="OSPR", creator="employee")
+    open_issue = fake_jira.make_issue(project="SOL", creator="someone")
+    open_issue.status = "Open"
+
+    with reqctx:
+        results = rescan_jira_issues('status = "Needs Triage" ORDER BY key')
+
+    assert results == {
+        **{issue.key: "Transitioned to 'Open'" for issue in employee_issues},
+        crafty_issue.key: "ignored",
+        ospr_issue.key: "ignored",
+    }
+    assert all(issue.status == "Open" for issue in employee_issues)
+    assert crafty_issue.status == "Needs Triage"
+    assert ospr_issue.status == "Needs Triage"
+    # Each creator was only looked up once.
+    assert len(fake_jira.requests_made("/rest/api/2/user")) == 2
+
+
+def test_rescan_jira_issues_reports_errors(reqctx, jira_users, fake_jira, mocker):
+    issue = fake_jira.make_issue(project="SOL", creator="employee")
+    mocker.patch.object(fake_jira, "TRANSITIONS", {"Done": "999"})
+
+    with reqctx:
+        results = rescan_jira_issues('status = "Needs Triage" ORDER BY key')
+
+    assert results[issue.key].startswith("Error: No valid transition!")
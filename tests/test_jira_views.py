@@ -0,0 +1,137 @@
+"""Tests of the Jira webhook views, and the tasks they queue."""
+
+import pytest
+
+from openedx_webhooks.tasks.jira import (
+    jira_issue_created_task,
+    jira_issue_updated_task,
+    jira_webhook_key,
+)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def mock_tasks(mocker):
+    created = mocker.patch("openedx_webhooks.jira_views.jira_issue_created_task")
+    created.delay.return_value.id = "created-task-id"
+    updated = mocker.patch("openedx_webhooks.jira_views.jira_issue_updated_task")
+    updated.delay.return_value.id = "updated-task-id"
+    return created, updated
+
+
+def post_event(client, path, event):
+    return client.post(path, json=event, base_url="https://openedx-webhooks.herokuapp.com")
+
+
+def updated_event(issue, changelog_id="10101", **kwargs):
+    event = {
+        "issue": issue.as_json(),
+        "changelog": {
+            "id": changelog_id,
+            "items": [
+                {"field": "status", "fromString": "Needs Triage", "toString": "Waiting on Author"},
+            ],
+        },
+    }
+    event.update(kwargs)
+    return event
+
+
+def test_issue_created_is_queued(client, fake_jira, mock_tasks):
+    issue = fake_jira.make_issue()
+    event = {"issue": issue.as_json()}
+    resp = post_event(client, "/jira/issue/created", event)
+
+    assert resp.status_code == 202
+    assert resp.headers["Location"].endswith("/tasks/status/created-task-id")
+    created, _ = mock_tasks
+    created.delay.assert_called_once()
+    assert created.delay.call_args[0] == (event, f"jira-webhook:created:{issue.key}")
+
+
+def test_issue_updated_is_queued(client, fake_jira, mock_tasks):
+    issue = fake_jira.make_issue()
+    event = updated_event(issue)
+    resp = post_event(client, "/jira/issue/updated", event)
+
+    assert resp.status_code == 202
+    assert resp.headers["Location"].endswith("/tasks/status/updated-task-id")
+    _, updated = mock_tasks
+    updated.delay.assert_called_once()
+    assert updated.delay.call_args[0] == (event, f"jira-webhook:updated:{issue.key}:10101")
+
+
+@pytest.mark.parametrize("path", ["/jira/issue/created", "/jira/issue/updated"])
+def test_junk_is_rejected(client, mock_tasks, path):
+    event = {"baseUrl": "https://openedx.atlassian.net", "newVersion": 64005, "oldVersion": 64003}
+    resp = post_event(client, path, event)
+    assert resp.status_code == 400
+    for task in mock_tasks:
+        task.delay.assert_not_called()
+
+
+@pytest.mark.parametrize("changes, msg", [
+    ({"comment": {"body": "Hi"}}, "Ignoring new-comment events"),
+    ({"changelog": None}, "I don't care, just someone adding a comment"),
+    ({"changelog": {"id": "1", "items": [{"field": "labels"}]}}, "I don't care, not changing status"),
+])
+def test_uninteresting_updates_are_not_queued(client, fake_jira, mock_tasks, changes, msg):
+    event = updated_event(fake_jira.make_issue(), **changes)
+    resp = post_event(client, "/jira/issue/updated", event)
+    assert resp.status_code == 200
+    assert resp.get_data(as_text=True) == msg
+    _, updated = mock_tasks
+    updated.delay.assert_not_called()
+
+
+def test_duplicate_updates_are_dropped(reqctx, fake_jira, fake_redis, mocker):
+    mock_issue_updated = mocker.patch("openedx_webhooks.tasks.jira.issue_updated", return_value="done")
+    issue = fake_jira.make_issue()
+    event = updated_event(issue)
+    other_event = updated_event(issue, changelog_id="10102")
+
+    with reqctx:
+        assert jira_issue_updated_task(event, jira_webhook_key("updated", event)) == "done"
+        assert jira_issue_updated_task(event, jira_webhook_key("updated", event)) == "duplicate, ignored"
+        assert jira_issue_updated_task(other_event, jira_webhook_key("updated", other_event)) == "done"
+
+    assert mock_issue_updated.call_count == 2
+
+
+def test_duplicate_creates_are_dropped(reqctx, fake_jira, fake_redis, mocker):
+    mock_issue_opened = mocker.patch("openedx_webhooks.tasks.jira.issue_opened", return_value="ignored")
+    event = {"issue": fake_jira.make_issue().as_json()}
+
+    with reqctx:
+        assert jira_issue_created_task(event, jira_webhook_key("created", event)) == "ignored"
+        assert jira_issue_created_task(event, jira_webhook_key("created", event)) == "duplicate, ignored"
+
+    mock_issue_opened.assert_called_once()
+
+
+def test_created_key_ignores_the_delivery(fake_jira):
+    issue = fake_jira.make_issue()
+    event = {"issue": issue.as_json(), "timestamp": 1600000000000}
+    redelivered = dict(event, timestamp=1600000005000)
+    assert jira_webhook_key("created", event) == jira_webhook_key("created", redelivered)
+
+
+@pytest.mark.parametrize("kind, task, handler, make_event", [
+    ("created", jira_issue_created_task, "issue_opened", lambda issue: {"issue": issue.as_json()}),
+    ("updated", jira_issue_updated_task, "issue_updated", updated_event),
+])
+def test_failed_events_can_be_redelivered(reqctx, fake_jira, fake_redis, mocker, kind, task, handler, make_event):
+    mock_handler = mocker.patch(f"openedx_webhooks.tasks.jira.{handler}", side_effect=[RuntimeError("Oops"), "done"])
+    event = make_event(fake_jira.make_issue())
+
+    with reqctx:
+        with pytest.raises(RuntimeError):
+            task(event, jira_webhook_key(kind, event))
+        assert task(event, jira_webhook_key(kind, event)) == "done"
+        assert task(event, jira_webhook_key(kind, event)) == "duplicate, ignored"
+
+    assert mock_handler.call_count == 2
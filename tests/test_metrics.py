@@ -0,0 +1,141 @@
+"""Tests of metrics.py: outgoing HTTP request metrics."""
+
+import base64
+
+import pytest
+import requests
+from flask_dance.consumer.requests import OAuth2Session
+
+from openedx_webhooks import metrics
+from openedx_webhooks.lib.rq import InstrumentedJob
+from openedx_webhooks.metrics import (
+    http_metrics, instrument_session, instrumented_session_class,
+    record_response, reset_metrics, route_template, set_metrics_store, task_name,
+)
+from openedx_webhooks.oauth import get_github_session
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    reset_metrics()
+    yield
+    reset_metrics()
+
+
+@pytest.mark.parametrize("path, template", [
+    ("/repos/edx/edx-platform/pulls/1234/files", "/repos/{owner}/{repo}/pulls/{number}/files"),
+    ("/repos/edx/edx-platform/issues/17/labels/needs triage", "/repos/{owner}/{repo}/issues/{number}/labels/{name}"),
+    ("/repos/edx/edx-platform/labels/blocked", "/repos/{owner}/{repo}/labels/{name}"),
+    ("/repos/edx/edx-platform", "/repos/{owner}/{repo}"),
+    ("/users/nedbat", "/users/{login}"),
+    ("/orgs/edx/members", "/orgs/{org}/members"),
+    ("/rest/api/2/issue/OSPR-1234/transitions", "/rest/api/2/issue/{key}/transitions"),
+    ("/rest/api/2/issue/10023", "/rest/api/2/issue/{number}"),
+    ("/rest/api/2/search", "/rest/api/2/search"),
+])
+def test_route_template(path, template):
+    assert route_template(path) == template
+
+
+def test_github_requests_are_recorded(fake_github):
+    fake_github.make_user(login="nedbat")
+    fake_github.make_user(login="feanil")
+    session = instrument_session(get_github_session())
+    with task_name("some_task"):
+        session.get("/users/nedbat")
+        session.get("/users/feanil")
+    session.get("/users/nobody")
+
+    text = http_metrics()
+    labels = 'service="github",method="GET",route="/users/{login}"'
+    assert f'http_client_requests_total{{{labels},status="200",task="some_task"}} 2\n' in text
+    assert f'http_client_requests_total{{{labels},status="404",task=""}} 1\n' in text
+    assert f'http_client_request_seconds_count{{{labels},task="some_task"}} 2\n' in text
+    assert f'http_client_request_seconds_bucket{{{labels},task="some_task",le="+Inf"}} 2\n' in text
+
+
+def test_rate_limit_headers(requests_mocker):
+    requests_mocker.get(
+        "https://api.github.com/rate_limit",
+        json={},
+        headers={"X-RateLimit-Limit": "5000", "X-RateLimit-Remaining": "4321"},
+    )
+    instrument_session(requests.Session()).get("https://api.github.com/rate_limit")
+    text = http_metrics()
+    assert 'http_client_rate_limit{service="github",header="limit"} 5000\n' in text
+    assert 'http_client_rate_limit{service="github",header="remaining"} 4321\n' in text
+
+
+def test_instrument_twice(requests_mocker):
+    requests_mocker.get("https://openedx.atlassian.net/rest/api/2/myself", json={})
+    session = instrument_session(instrument_session(requests.Session()))
+    session.get("https://openedx.atlassian.net/rest/api/2/myself")
+    assert (
+        'http_client_requests_total{service="jira",method="GET",route="/rest/api/2/myself",status="200",task=""} 1\n'
+        in http_metrics()
+    )
+
+
+def test_instrumented_session_class():
+    session_class = instrumented_session_class(OAuth2Session)
+    assert issubclass(session_class, OAuth2Session)
+    session = session_class(base_url="https://api.github.com/", blueprint=None)
+    assert session.hooks["response"].count(record_response) == 1
+
+
+@pytest.fixture
+def shared_metrics(fake_redis):
+    set_metrics_store(fake_redis)
+    try:
+        yield fake_redis
+    finally:
+        reset_metrics()
+        set_metrics_store(None)
+
+
+def look_up_users(*logins):
+    session = instrument_session(requests.Session())
+    for login in logins:
+        session.get(f"https://api.github.com/users/{login}")
+
+
+def test_worker_job_requests_are_shared(app, monkeypatch, fake_github, shared_metrics):
+    fake_github.make_user(login="nedbat")
+    # Run the job as an RQ worker does.
+    job = InstrumentedJob.create(look_up_users, args=("nedbat", "nobody"), connection=shared_metrics)
+    job.perform()
+
+    # The job's process has added its numbers to the totals, and has nothing
+    # left of its own.
+    assert not metrics._request_counts
+    assert not metrics._latencies
+
+    # The web process serves the totals.
+    monkeypatch.setenv("HTTP_BASIC_AUTH_USERNAME", "admin")
+    monkeypatch.setenv("HTTP_BASIC_AUTH_PASSWORD", "s3cret")
+    resp = app.test_client().get(
+        "/metrics",
+        headers={"Authorization": "Basic " + base64.b64encode(b"admin:s3cret").decode()},
+        base_url="https://openedx-webhooks.herokuapp.com",
+    )
+    assert resp.status_code == 200
+    text = resp.get_data(as_text=True)
+    labels = 'service="github",method="GET",route="/users/{login}"'
+    task = "tests.test_metrics.look_up_users"
+    assert f'http_client_requests_total{{{labels},status="200",task="{task}"}} 1\n' in text
+    assert f'http_client_requests_total{{{labels},status="404",task="{task}"}} 1\n' in text
+    assert f'http_client_request_seconds_count{{{labels},task="{task}"}} 2\n' in text
+
+
+def test_shared_totals_add_up(requests_mocker, shared_metrics):
+    requests_mocker.get("https://openedx.atlassian.net/rest/api/2/myself", json={})
+    session = instrument_session(requests.Session())
+    for _ in range(2):
+        # Each time round is like another process adding to the totals.
+        session.get("https://openedx.atlassian.net/rest/api/2/myself")
+        metrics.share_metrics()
+    text = http_metrics()
+    labels = 'service="jira",method="GET",route="/rest/api/2/myself"'
+    assert f'http_client_requests_total{{{labels},status="200",task=""}} 2\n' in text
+    assert f'http_client_request_seconds_count{{{labels},task=""}} 2\n' in text
+    assert f'http_client_request_seconds_bucket{{{labels},task="",le="+Inf"}} 2\n' in text
@@ -91,6 +91,26 @@ def test_external_pr_opened_no_cla(reqctx, sync_labels_fn, fake_github, fake_jir
     assert pr.labels == {"community manager review", "open-source-contribution"}
 
 
+def test_external_pr_opened_when_github_users_fail(reqctx, sync_labels_fn, fake_github, fake_jira, mocker):
+    # GitHub can't tell us the user's name, so their login is used.
+    mocker.patch("openedx_webhooks.utils.retry_sleep", lambda x: None)
+    fake_github.make_user(login="new_contributor", name="Newb Contributor")
+    pr = fake_github.make_pull_request(owner="edx", repo="edx-platform", user="new_contributor")
+
+    def users_unavailable(request, context):
+        if request.path.startswith("/users/"):
+            context.status_code = 503
+            return {"message": "Service unavailable"}
+        return None
+
+    fake_github.add_middleware(users_unavailable)
+    with reqctx:
+        issue_id, anything_happened = pull_request_changed(pr.as_json())
+
+    assert anything_happened is True
+    assert fake_jira.issues[issue_id].contributor_name == "new_contributor"
+
+
 def test_external_pr_opened_with_cla(reqctx, sync_labels_fn, fake_github, fake_jira):
     pr = fake_github.make_pull_request(owner="edx", repo="some-code", user="tusbar", number=11235)
     prj = pr.as_json()
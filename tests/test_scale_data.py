@@ -0,0 +1,58 @@
+"""Tests of the scale-mode world generator."""
+
+from openedx_webhooks.info import get_jira_issue_key, is_internal_pull_request
+from openedx_webhooks.tasks.github import pull_request_changed
+
+from .fake_github import FakeGitHub
+from .fake_jira import FakeJira
+from .scale_data import generate_world
+
+
+SMALL = dict(repos=20, pull_requests=300, people=100, orgs=10, blended_projects=3)
+
+
+def _shape(world):
+    return [
+        (pr.repo.owner, pr.repo.repo, pr.number, pr.user.login, pr.title, pr.state, sorted(pr.labels), len(pr.comments))
+        for pr in world.pull_requests
+    ]
+
+
+def test_same_seed_same_world():
+    world1 = generate_world(FakeGitHub(), FakeJira(), seed=17, **SMALL)
+    world2 = generate_world(FakeGitHub(), FakeJira(), seed=17, **SMALL)
+    world3 = generate_world(FakeGitHub(), FakeJira(), seed=18, **SMALL)
+    assert _shape(world1) == _shape(world2)
+    assert world1.people == world2.people
+    assert _shape(world1) != _shape(world3)
+
+
+def test_world_contents(scale_world, fake_github, fake_jira):
+    world = scale_world(seed=1, **SMALL)
+    assert len(world.repos) == 20
+    assert len(world.pull_requests) == 300
+    assert len(world.people) == 100
+    # The people, and the bot that commented.
+    assert set(fake_github.users) == set(world.people) | {fake_github.login}
+    assert len(world.orgs) == 11
+    projects = {issue.key.partition("-")[0] for issue in world.issues.values()}
+    assert projects == {"OSPR", "BLENDED"}
+    for issue in world.issues.values():
+        assert fake_jira.issues[issue.key] is issue
+
+
+def test_tracked_prs_are_consistent(reqctx, scale_world, fake_jira):
+    # The generated world is what the bot would have made, so processing a
+    # tracked pull request finds its issue instead of making a new one.
+    world = scale_world(seed=2, **SMALL)
+    pr = next(
+        pr for pr in world.pull_requests
+        if pr.state == "open" and f"{pr.repo.owner}/{pr.repo.repo}#{pr.number}" in world.issues
+    )
+    issue = world.issues[f"{pr.repo.owner}/{pr.repo.repo}#{pr.number}"]
+    with reqctx:
+        assert not is_internal_pull_request(pr.as_json())
+        assert get_jira_issue_key(pr.as_json()) == issue.key
+        issue_id, _ = pull_request_changed(pr.as_json())
+    assert issue_id == issue.key
+    assert fake_jira.requests_made("/rest/api/2/issue", "POST") == []
@@ -2,6 +2,7 @@
 
 import pytest
 
+from openedx_webhooks.info import get_repo_labels
 from openedx_webhooks.tasks.github import synchronize_labels
 
 from .fake_github import Label
@@ -108,3 +109,26 @@ def test_delete_unneeded(reqctx, fake_github):
     assert len(fake_github.requests_made(method="POST")) == 0
     assert len(fake_github.requests_made(method="PATCH")) == 1
     assert len(fake_github.requests_made(method="DELETE")) == 1
+
+
+def test_changes_invalidate_label_cache(reqctx, fake_github):
+    repo = fake_github.make_repo("edx", "some-repo")
+    repo.set_labels([
+        {"name": "something", "color": "123456", "description": "Huh?"},
+        {"name": "basic label", "color": "bfe5bf"},
+    ])
+
+    with reqctx:
+        synchronize_labels("edx/some-repo")
+        labels_get_count = len(fake_github.requests_made("/repos/edx/some-repo/labels", "GET"))
+        # We added a label, so the cached labels were discarded.
+        assert "important-label" in get_repo_labels("edx/some-repo")
+        labels_gets = fake_github.requests_made("/repos/edx/some-repo/labels", "GET")
+        assert len(labels_gets) > labels_get_count
+
+        # Nothing changes this time, so the cached labels are still good.
+        labels_get_count = len(labels_gets)
+        synchronize_labels("edx/some-repo")
+        get_repo_labels("edx/some-repo")
+        labels_gets = fake_github.requests_made("/repos/edx/some-repo/labels", "GET")
+        assert len(labels_gets) == labels_get_count
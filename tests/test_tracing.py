@@ -0,0 +1,213 @@
+"""Tests of tracing.py, and the traces of webhook events."""
+
+import hashlib
+import hmac
+import json
+import threading
+import time
+
+import pytest
+import requests
+
+from openedx_webhooks import tracing
+from openedx_webhooks.metrics import instrument_session
+from openedx_webhooks.oauth import get_github_session
+from openedx_webhooks.tasks.github import pull_request_changed
+from openedx_webhooks.utils import parallel_map
+
+
+@pytest.fixture
+def exported():
+    """Collect exported spans in a list."""
+    spans = []
+    tracing.set_exporter(spans.extend)
+    yield spans
+    tracing.set_exporter(None)
+
+
+def spans_by_name(spans):
+    return {s["name"]: s for s in spans}
+
+
+def test_nothing_recorded_when_off():
+    with tracing.start_trace("root") as trace_id:
+        with tracing.span("inner"):
+            assert tracing.trace_context() is None
+    assert trace_id is None
+
+
+def test_spans_are_nested(exported):
+    @tracing.traced
+    def do_work():
+        with tracing.span("inner", detail=17):
+            pass
+
+    with tracing.start_trace("root") as trace_id:
+        do_work()
+
+    spans = spans_by_name(exported)
+    assert set(spans) == {"root", "test_spans_are_nested.<locals>.do_work", "inner"}
+    assert {s["traceId"] for s in exported} == {trace_id}
+    assert "parentId" not in spans["root"]
+    assert spans["test_spans_are_nested.<locals>.do_work"]["parentId"] == spans["root"]["id"]
+    assert spans["inner"]["parentId"] == spans["test_spans_are_nested.<locals>.do_work"]["id"]
+    assert spans["inner"]["tags"] == {"detail": "17"}
+
+
+def test_parallel_map_spans_are_in_the_trace(exported, app):
+    @tracing.traced
+    def do_work(num):
+        return num * 2
+
+    with app.app_context():
+        with tracing.start_trace("root") as trace_id:
+            results = dict(parallel_map(do_work, [1, 2, 3], max_workers=3))
+
+    assert results == {1: 2, 2: 4, 3: 6}
+    root = spans_by_name(exported)["root"]
+    work = [s for s in exported if s["name"].endswith("do_work")]
+    assert len(work) == 3
+    assert {s["traceId"] for s in work} == {trace_id}
+    assert {s["parentId"] for s in work} == {root["id"]}
+
+
+def test_errors_are_tagged(exported):
+    with pytest.raises(ValueError):
+        with tracing.start_trace("root"):
+            raise ValueError("oops")
+    assert exported[0]["tags"]["error"] == "ValueError('oops')"
+
+
+def test_continue_trace(exported):
+    with tracing.start_trace("root") as trace_id:
+        with tracing.span("enqueue"):
+            context = tracing.trace_context()
+    enqueue_id = spans_by_name(exported)["enqueue"]["id"]
+    exported.clear()
+
+    with tracing.continue_trace(context, "the_task"):
+        pass
+
+    spans = spans_by_name(exported)
+    assert set(spans) == {"queue wait", "the_task"}
+    assert {s["traceId"] for s in exported} == {trace_id}
+    assert spans["queue wait"]["parentId"] == enqueue_id
+    assert spans["the_task"]["parentId"] == enqueue_id
+
+
+def test_http_requests_are_spans(exported, fake_github):
+    fake_github.make_user(login="nedbat")
+    session = instrument_session(get_github_session())
+    with tracing.start_trace("root"):
+        session.get("/users/nedbat")
+    http_span = spans_by_name(exported)["GET api.github.com"]
+    assert http_span["kind"] == "CLIENT"
+    assert http_span["tags"] == {
+        "http.method": "GET",
+        "http.path": "/users/nedbat",
+        "http.status_code": "200",
+    }
+
+
+def test_pull_request_changed_spans(exported, reqctx, fake_github, fake_jira, mocker):
+    mocker.patch("openedx_webhooks.tasks.github.synchronize_labels")
+    fake_github.make_user(login="new_contributor", name="Newb Contributor")
+    pr = fake_github.make_pull_request(owner="edx", repo="edx-platform", user="new_contributor")
+    with reqctx, tracing.start_trace("root"):
+        pull_request_changed(pr.as_json())
+
+    names = {s["name"] for s in exported}
+    assert {
+        "pull_request_changed",
+        "desired_support_state",
+        "current_support_state",
+        "PrTrackingFixer.fix",
+        "create_ospr_issue",
+        "PrTrackingFixer._fix_bot_comments",
+        "add_comment_to_pull_request",
+    } <= names
+
+
+def test_file_exporter(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    tracing.set_exporter(tracing.exporter_for(str(path)))
+    try:
+        with tracing.start_trace("one"):
+            pass
+        with tracing.start_trace("two"):
+            pass
+    finally:
+        tracing.set_exporter(None)
+    batches = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [[s["name"] for s in batch] for batch in batches] == [["one"], ["two"]]
+
+
+def test_http_exporter(requests_mocker):
+    collector = requests_mocker.post("http://localhost:9411/api/v2/spans", status_code=202)
+    exporter = tracing.exporter_for("http://localhost:9411/api/v2/spans")
+    exporter([{"name": "one"}])
+    exporter.flush()
+    assert collector.last_request.json() == [{"name": "one"}]
+    # Collector failures are logged, not raised.
+    requests_mocker.post("http://localhost:9411/api/v2/spans", exc=requests.ConnectionError)
+    exporter([{"name": "two"}])
+    exporter.flush()
+
+
+def test_http_exporter_doesnt_wait_for_collector(requests_mocker):
+    posting = threading.Event()
+    release = threading.Event()
+    received = []
+
+    def slow_collector(request, context):
+        posting.set()
+        release.wait(5)
+        received.extend(s["name"] for s in request.json())
+        context.status_code = 202
+        return ""
+
+    requests_mocker.post("http://localhost:9411/api/v2/spans", text=slow_collector)
+    exporter = tracing.HttpExporter("http://localhost:9411/api/v2/spans", max_queued=2)
+    start = time.perf_counter()
+    exporter([{"name": "one"}])
+    assert posting.wait(5)
+    # While "one" is being sent, two more lists can wait, and the rest are dropped.
+    for name in ["two", "three", "four", "five"]:
+        exporter([{"name": name}])
+    assert time.perf_counter() - start < 1
+    assert exporter.dropped == 2
+
+    release.set()
+    exporter.flush()
+    assert received == ["one", "two", "three"]
+    assert exporter.dropped == 0
+
+
+def test_hook_receiver_passes_trace_along(exported, app, mocker):
+    app.config["GITHUB_WEBHOOKS_SECRET"] = "the-secret"
+    mock_q = mocker.patch("openedx_webhooks.github_views.q")
+    mock_task = mocker.patch("openedx_webhooks.github_views.pull_request_changed_task")
+    mock_task.delay.return_value.id = "task-id"
+    event = {
+        "action": "opened",
+        "repository": {"full_name": "edx/edx-platform"},
+        "pull_request": {"number": 1},
+    }
+    body = json.dumps(event).encode()
+    signature = "sha1=" + hmac.new(b"the-secret", msg=body, digestmod=hashlib.sha1).hexdigest()
+    resp = app.test_client().post(
+        "/github/hook-receiver",
+        data=body,
+        content_type="application/json",
+        headers={"X-Hub-Signature": signature, "X-Github-Event": "pull_request"},
+        base_url="https://openedx-webhooks.herokuapp.com",
+    )
+    assert resp.status_code == 202
+
+    root, = exported
+    assert root["name"] == "hook_receiver"
+    rq_trace = mock_q.enqueue.call_args[1]["meta"]["trace"]
+    celery_trace = mock_task.delay.call_args[1]["trace"]
+    for trace in [rq_trace, celery_trace]:
+        assert trace["trace_id"] == root["traceId"]
+        assert trace["parent_id"] == root["id"]
@@ -0,0 +1,62 @@
+"""Tests of the ui blueprint."""
+
+import base64
+
+import pytest
+
+from openedx_webhooks.utils import memoize
+
+
+@pytest.fixture
+def client(app, monkeypatch):
+    monkeypatch.setenv("HTTP_BASIC_AUTH_USERNAME", "admin")
+    monkeypatch.setenv("HTTP_BASIC_AUTH_PASSWORD", "s3cret")
+    return app.test_client()
+
+
+def get(client, path, password="s3cret"):
+    auth = base64.b64encode(f"admin:{password}".encode()).decode()
+    return client.get(
+        path,
+        headers={"Authorization": f"Basic {auth}"},
+        base_url="https://openedx-webhooks.herokuapp.com",
+    )
+
+
+@memoize
+def cached_square(x):
+    return x * x
+
+
+def test_cache_stats(client):
+    cached_square(3)
+    cached_square(3)
+    resp = get(client, "/cache")
+    assert resp.status_code == 200
+    info, = [f for f in resp.json["functions"] if f["name"] == "tests.test_ui.cached_square"]
+    assert info["hits"] == 1
+    assert info["misses"] == 1
+    assert info["hit_rate"] == 0.5
+
+
+def test_cache_metrics(client):
+    cached_square(4)
+    resp = get(client, "/cache/metrics")
+    assert resp.status_code == 200
+    assert resp.content_type.startswith("text/plain")
+    text = resp.get_data(as_text=True)
+    assert 'memoize_calls_total{function="tests.test_ui.cached_square",result="miss"} 1\n' in text
+
+
+def test_metrics(client):
+    cached_square(5)
+    resp = get(client, "/metrics")
+    assert resp.status_code == 200
+    text = resp.get_data(as_text=True)
+    assert "# TYPE http_client_requests_total counter\n" in text
+    assert 'memoize_calls_total{function="tests.test_ui.cached_square",result="miss"} 1\n' in text
+
+
+@pytest.mark.parametrize("path", ["/cache", "/cache/metrics", "/metrics"])
+def test_cache_needs_auth(client, path):
+    assert get(client, path, password="wrong").status_code == 401
@@ -0,0 +1,163 @@
+"""Tests of bin/update_ospr_with_github_activity.py."""
+
+import importlib.util
+import os.path
+import sys
+import threading
+import types
+import unittest.mock as mock
+
+import pytest
+import requests
+from click.testing import CliRunner
+
+
+SCRIPT = os.path.join(os.path.dirname(__file__), "..", "bin", "update_ospr_with_github_activity.py")
+
+
+@pytest.fixture
+def script(monkeypatch):
+    """
+    Load the script, with clients that don't need credentials.
+
+    The real client modules connect when they are imported.
+    """
+    github_client = types.ModuleType("openedx_webhooks.lib.github.client")
+    github_client.make_github_client = mock.Mock
+    github_client.github_client = mock.Mock()
+    jira_client = types.ModuleType("openedx_webhooks.lib.jira.client")
+    jira_client.make_jira_client = mock.Mock
+    jira_client.jira_client = mock.Mock()
+    monkeypatch.setitem(sys.modules, github_client.__name__, github_client)
+    monkeypatch.setitem(sys.modules, jira_client.__name__, jira_client)
+
+    spec = importlib.util.spec_from_file_location("update_ospr_with_github_activity", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class FakeUpdates:
+    """
+    Stands in for `update_issue`, recording the issues and clients it's given.
+    """
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.lock = threading.Lock()
+        self.keys = []
+        self.clients = {}
+
+    def __call__(self, gh, jira, issue, dry_run):
+        with self.lock:
+            self.keys.append(issue.key)
+            self.clients.setdefault(threading.get_ident(), set()).add((id(gh), id(jira)))
+        if issue.key in self.fail:
+            raise Exception("Jira is down")
+        return {"login": "nedbat"}
+
+
+def issues(*numbers):
+    return [types.SimpleNamespace(key=f"OSPR-{num}", id=num) for num in numbers]
+
+
+def run(script, mocker, updates, found, *args):
+    mocker.patch.object(script, "retrieve_osprs", return_value=iter(found))
+    mocker.patch.object(script, "update_issue", updates)
+    return CliRunner().invoke(script.cli, list(args))
+
+
+def test_resume_from_checkpoint(script, mocker, tmp_path):
+    checkpoint = tmp_path / "done.txt"
+    checkpoint.write_text("OSPR-1\nOSPR-3\n")
+    updates = FakeUpdates()
+    result = run(script, mocker, updates, issues(1, 2, 3, 4), "--checkpoint", str(checkpoint))
+    assert result.exit_code == 0
+    assert "Skipping 2 issues already done." in result.output
+    assert sorted(updates.keys) == ["OSPR-2", "OSPR-4"]
+    # Everything is done, so the next run starts from scratch.
+    assert not checkpoint.exists()
+
+
+def test_errors_in_worker_threads(script, mocker, tmp_path):
+    checkpoint = tmp_path / "done.txt"
+    updates = FakeUpdates(fail=["OSPR-2"])
+    result = run(script, mocker, updates, issues(1, 2, 3), "--checkpoint", str(checkpoint))
+    assert result.exit_code == 1
+    assert "Couldn't update OSPR-2: Exception('Jira is down')" in result.stderr
+    assert "1 issues couldn't be updated" in result.stderr
+    assert sorted(checkpoint.read_text().split()) == ["OSPR-1", "OSPR-3"]
+
+    # Running again only retries the failed issue.
+    updates = FakeUpdates()
+    result = run(script, mocker, updates, issues(1, 2, 3), "--checkpoint", str(checkpoint))
+    assert result.exit_code == 0
+    assert updates.keys == ["OSPR-2"]
+    assert not checkpoint.exists()
+
+
+def test_dry_run_ignores_checkpoint(script, mocker, tmp_path):
+    checkpoint = tmp_path / "done.txt"
+    checkpoint.write_text("OSPR-1\n")
+    updates = FakeUpdates()
+    result = run(script, mocker, updates, issues(1, 2), "--dry-run", "--checkpoint", str(checkpoint))
+    assert result.exit_code == 0
+    assert sorted(updates.keys) == ["OSPR-1", "OSPR-2"]
+    assert checkpoint.read_text() == "OSPR-1\n"
+
+
+def test_concurrency(script, mocker):
+    # Each update waits for two others to start, so this only finishes if
+    # three run at once.
+    started = threading.Barrier(3)
+    updates = FakeUpdates()
+
+    def update_issue(gh, jira, issue, dry_run):
+        started.wait(5)
+        return updates(gh, jira, issue, dry_run)
+
+    result = run(script, mocker, update_issue, issues(*range(1, 7)), "--concurrency", "3")
+    assert result.exit_code == 0
+    assert len(updates.keys) == 6
+    # Each thread has its own clients, and used only them.
+    assert len(updates.clients) == 3
+    assert all(len(clients) == 1 for clients in updates.clients.values())
+    assert len(set.union(*updates.clients.values())) == 3
+
+
+def make_pull_request(commits_count):
+    return types.SimpleNamespace(
+        commits_url="https://api.github.com/repos/edx/edx-platform/pulls/1234/commits",
+        commits_count=commits_count,
+        base=types.SimpleNamespace(repository=types.SimpleNamespace(url="https://api.github.com/repos/edx/edx-platform")),
+        head=types.SimpleNamespace(sha="abc123"),
+    )
+
+
+def test_newest_commit_is_listed(script, requests_mocker):
+    pull_request = make_pull_request(17)
+    requests_mocker.get(f"{pull_request.commits_url}?per_page=1&page=17", json=[{"sha": "def456"}])
+    gh = types.SimpleNamespace(session=requests.Session())
+    assert script._get_newest_pr_commit(gh, pull_request) == {"sha": "def456"}
+
+
+def test_newest_commit_past_listed_commits(script, requests_mocker):
+    # GitHub doesn't list more than 250 commits, so the head is fetched.
+    pull_request = make_pull_request(300)
+    requests_mocker.get(f"{pull_request.commits_url}?per_page=1&page=300", json=[], complete_qs=True)
+    requests_mocker.get("https://api.github.com/repos/edx/edx-platform/commits/abc123", json={"sha": "abc123"})
+    gh = types.SimpleNamespace(session=requests.Session())
+    assert script._get_newest_pr_commit(gh, pull_request) == {"sha": "abc123"}
+
+
+def test_newest_item_when_list_is_shorter(script, requests_mocker):
+    url = "https://api.github.com/repos/edx/edx-platform/issues/1234/comments"
+    requests_mocker.get(f"{url}?per_page=1&page=5", json=[], complete_qs=True)
+    requests_mocker.get(
+        f"{url}?per_page=1",
+        json=[{"id": 1}],
+        complete_qs=True,
+        headers={"Link": f'<{url}?per_page=1&page=4>; rel="last"'},
+    )
+    requests_mocker.get(f"{url}?per_page=1&page=4", json=[{"id": 4}], complete_qs=True)
+    gh = types.SimpleNamespace(session=requests.Session())
+    assert script._get_newest_item(gh, url, 5) == {"id": 4}